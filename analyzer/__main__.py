@@ -1,82 +1,150 @@
+import argparse
 import json
 import logging
 import os
 import sys
+import time
 
-from utils import (
-    get_os_info, get_hardware_info, get_running_services, get_network_info,
-    get_user_info, get_filtered_software_from_running_services,
-    get_environment_variables, get_cron_jobs, get_log_files,
-    )
+from utils.collectors import COLLECTORS, collect_to_store, enabled_collectors, run_collectors
 
+DEFAULT_SETTINGS = {
+    "export_config_directory": "./config_exports",
+    "output_directory" : "./output",
+    "log_file": "app.log",
+    "logs_directory":"./logs",
+    "log_level": "INFO",
+    "enable_service_monitoring": True,
+    "enable_network_monitoring": True,
+    "enable_user_monitoring": True,
+    "enable_software_monitoring": True,
+    "collector_timeout": 60,
+    "log_sample_lines": 1000,
+    "config_format": "sections",
+    "incremental": True
+}
 
-def load_config():
-    default_config = {
-        "export_config_directory": "./config_exports",
-        "output_directory" : "./output",
-        "log_file": "app.log",
-        "logs_directory":"./logs",
-        "log_level": "INFO",
-        "enable_service_monitoring": True,
-        "enable_network_monitoring": True,
-        "enable_user_monitoring": True,
-        "enable_software_monitoring": True
-    }
-    config_path = "settings.json"
-    if os.path.exists(config_path):
+
+def load_config(path="settings.json"):
+    """Settings from path layered over the defaults; a missing file just means the defaults."""
+    settings = dict(DEFAULT_SETTINGS)
+    if os.path.exists(path):
         try:
-            with open(config_path, "r") as f:
-                return json.load(f)
+            with open(path, "r") as f:
+                settings.update(json.load(f))
         except json.JSONDecodeError as e:
-            logging.error(f"Error parsing settings.json: {e}")
-    else:
-        try:
-            with open(config_path, "w") as f:
-                f.write(json.dumps(default_config))
-        except Exception as e:
-            logging.error(f"Error parsing settings.json: {e}")
-
-    return default_config
-
-config = load_config()
+            logging.error(f"Error parsing {path}: {e}")
+    return settings
 
-#create folder if not exist logs and output
-if not os.path.exists(config['output_directory']):
-    os.makedirs(config['output_directory'])
-if not os.path.exists(config['logs_directory']):
-    os.makedirs(config['logs_directory'])
 
+def configure_logging(settings):
+    """Log to <logs_directory>/<log_file>; done here rather than at import, so embedding the package is silent."""
+    os.makedirs(settings["logs_directory"], exist_ok=True)
+    logging.basicConfig(
+        filename=os.path.join(settings["logs_directory"], settings["log_file"]),
+        level=getattr(logging, str(settings["log_level"]).upper(), logging.INFO),
+        format="%(asctime)s - %(levelname)s - %(message)s",
+    )
 
 
-def save_config():
-    """Save collected data to a config file."""
-    config_data = {}
+config = dict(DEFAULT_SETTINGS)
 
-    if config.get("enable_service_monitoring", True):
-        config_data["services"] = get_running_services()
-    if config.get("enable_network_monitoring", True):
-        config_data["network"] = get_network_info()
-    if config.get("enable_user_monitoring", True):
-        config_data["users"] = get_user_info()
-    if config.get("enable_software_monitoring", True):
-        config_data["software"] = get_filtered_software_from_running_services()
 
-    config_data.update({
-        "hardware": get_hardware_info(),
-        "os": get_os_info(),
-        "env_vars": get_environment_variables(),
-        "cron_jobs": get_cron_jobs(),
-        "logs": get_log_files()
-    })
+def save_config(only=None):
+    """Save collected data to a config file.
 
+    only restricts the run to the named collectors; the other sections of an
+    existing export are kept as they are.
+    """
     export_path = config.get("export_config_directory", "./config_exports")
     os.makedirs(export_path, exist_ok=True)
-    filename = os.path.join(export_path, "config.json")
 
-    logging.info("Saving config to file")
-    with open(filename, "w") as f:
-        json.dump(config_data, f, indent=2)
+    # Log samples are written next to the config file and referenced from it
+    options = {
+        "logs": {
+            "artifact_dir": os.path.join(export_path, "artifacts"),
+            "max_lines": config.get("log_sample_lines", 1000),
+            "window": config.get("log_sample_window"),
+        },
+        # statvfs on a hung network mount gives up after mount_timeout seconds
+        "hardware": {
+            "seed": config.get("hardware_seed"),
+            "mount_timeout": config.get("mount_timeout", 2),
+        },
+    }
+
+    # Collectors run concurrently; a collector that fails or times out is left out of the config
+    collectors = enabled_collectors(config, only)
+    run_options = {
+        "timeout": config.get("collector_timeout", 60),
+        "max_workers": config.get("collector_workers"),
+        "options": options,
+    }
+    start = time.monotonic()
+
+    if config.get("config_format", "sections") == "json":
+        filename = os.path.join(export_path, "config.json")
+        config_data, timings = run_collectors(collectors, **run_options)
+        logging.info(f"Collected {len(config_data)}/{len(timings)} sections in {time.monotonic() - start:.2f}s")
+        if only and os.path.exists(filename):
+            with open(filename, "r") as f:
+                config_data = dict(json.load(f), **config_data)
+        logging.info("Saving config to file")
+        with open(filename, "w") as f:
+            json.dump(config_data, f, indent=2)
+        return filename
+
+    # Sectioned format: each section is written as soon as its collector finishes, and sections
+    # whose fingerprint is unchanged since the last export are reused
+    filename = os.path.join(export_path, "config.jsonl")
+    changed, unchanged, timings = collect_to_store(
+        collectors, filename,
+        incremental=config.get("incremental", True),
+        carry_over=bool(only),
+        **run_options,
+    )
+    logging.info(f"Collected {len(changed)}/{len(timings)} sections, reused {len(unchanged)}, "
+                 f"in {time.monotonic() - start:.2f}s")
+    logging.info(f"Saved config to {filename}")
+    return filename
+
+def analyze_fleet(inventory_path):
+    """Analyze every host in an inventory of rootfs snapshots into a per-host config store."""
+    from utils.fleet import load_inventory, print_report, run_fleet
+
+    store = config.get("fleet_store_directory",
+                       os.path.join(config.get("export_config_directory", "./config_exports"), "fleet"))
+    results = run_fleet(load_inventory(inventory_path), store,
+                        max_workers=config.get("fleet_workers"), settings=config)
+    print_report(results)
+    return all(r["ok"] for r in results)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Profile this host (or a fleet of rootfs snapshots) into a decoy config.")
+    parser.add_argument("--only", help="comma-separated collectors to run, e.g. os,hardware")
+    parser.add_argument("--fleet", metavar="INVENTORY", help="analyze the hosts listed in an inventory JSON file")
+    parser.add_argument("--settings", default="settings.json", help="settings file (default: settings.json)")
+    parser.add_argument("--full", action="store_true", help="recollect every section, ignoring fingerprints")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    only = [name.strip() for name in args.only.split(",") if name.strip()] if args.only else None
+    unknown = [name for name in only or [] if name not in COLLECTORS]
+    if unknown:
+        print(f"Unknown collector(s): {', '.join(unknown)}; available: {', '.join(COLLECTORS)}", file=sys.stderr)
+        return 2
+    config.update(load_config(args.settings))
+    if args.full:
+        config["incremental"] = False
+    configure_logging(config)
+
+    if args.fleet:
+        return 0 if analyze_fleet(args.fleet) else 1
+    save_config(only)
+    return 0
+
 
 if __name__ == "__main__":
-    # Collect configuration
-    save_config()
+    sys.exit(main())
@@ -1,46 +1,36 @@
-from .hw_info import *
-from .os_info import *
-from .net_info import *
-from .software_info import *
-
-import os
-import json
-import logging
-
-default_config = {
-    "export_config_directory": "./config_exports",
-    "output_directory" : "./output",
-    "log_file": "app.log",
-    "logs_directory":"./logs",
-    "log_level": "INFO",
-    "enable_service_monitoring": True,
-    "enable_network_monitoring": True,
-    "enable_user_monitoring": True,
-    "enable_software_monitoring": True
+import importlib
+
+# Public names -> the submodule defining them. Submodules are imported on first
+# attribute access, so importing the package has no side effects and costs
+# nothing until a collector is actually used.
+_EXPORTS = {
+    "get_hardware_info": "hw_info",
+    "get_os_info": "os_info",
+    "get_network_info": "net_info",
+    "get_user_info": "user_info",
+    "get_running_services": "software_info",
+    "get_filtered_software_from_running_services": "software_info",
+    "get_environment_variables": "software_info",
+    "get_cron_jobs": "software_info",
+    "get_log_files": "software_info",
+    "get_installed_software": "software_info",
+    "COLLECTORS": "collectors",
+    "Collector": "collectors",
+    "register_collector": "collectors",
+    "enabled_collectors": "collectors",
+    "run_collectors": "collectors",
+    "collect_to_store": "collectors",
+    "SectionReader": "config_store",
+    "SectionWriter": "config_store",
+    "load_sections": "config_store",
 }
-config_path = "settings.json"
-
-
-
-def load_config():
-    if os.path.exists(config_path):
-        try:
-            with open(config_path, "r") as f:
-                return json.load(f)
-        except json.JSONDecodeError as e:
-            logging.error(f"Error parsing settings.json: {e}")
-    else:
-        try:
-            with open(config_path, "w") as f:
-                f.write(json.dumps(default_config))
-        except Exception as e:
-            logging.error(f"Error parsing settings.json: {e}")
 
-    return default_config
+__all__ = list(_EXPORTS)
 
 
-#create folder if not exist logs and output
-if not os.path.exists(default_config['output_directory']):
-    os.makedirs(default_config['output_directory'])
-if not os.path.exists(default_config['logs_directory']):
-    os.makedirs(default_config['logs_directory'])
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
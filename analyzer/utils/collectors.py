@@ -0,0 +1,294 @@
+import hashlib
+import importlib
+import json
+import logging
+import queue
+import threading
+import time
+
+from .config_store import SectionWriter, open_previous
+
+DEFAULT_COLLECTOR_TIMEOUT = 60
+
+
+class Collector:
+    """A named config section, the function that collects it and the setting that enables it.
+
+    fingerprint, if given, is a cheap function whose result changes whenever
+    the section would; incremental runs skip sections whose fingerprint is
+    unchanged since the previous export.
+
+    func and fingerprint may be given as "module:function" strings naming a
+    module of this package, which is imported only when the collector runs,
+    so a run that needs one collector does not load the others' dependencies.
+    """
+
+    def __init__(self, name, func, setting=None, timeout=None, fingerprint=None):
+        self.name = name
+        self._func = func
+        self.setting = setting
+        self.timeout = timeout
+        self._fingerprint = fingerprint
+
+    @property
+    def func(self):
+        self._func = _resolve(self._func)
+        return self._func
+
+    @property
+    def fingerprint(self):
+        self._fingerprint = _resolve(self._fingerprint)
+        return self._fingerprint
+
+
+def _resolve(target):
+    if not isinstance(target, str):
+        return target
+    module, _, attr = target.partition(":")
+    return getattr(importlib.import_module(f".{module}", __package__), attr)
+
+
+# Registered collectors, in config.json section order
+COLLECTORS = {}
+
+
+def register_collector(name, func, setting=None, timeout=None, fingerprint=None):
+    COLLECTORS[name] = Collector(name, func, setting, timeout, fingerprint)
+
+
+register_collector("services", "software_info:get_running_services", "enable_service_monitoring",
+                   fingerprint="fingerprints:services_fingerprint")
+register_collector("network", "net_info:get_network_info", "enable_network_monitoring",
+                   fingerprint="fingerprints:network_fingerprint")
+register_collector("users", "user_info:get_user_info", "enable_user_monitoring",
+                   fingerprint="fingerprints:users_fingerprint")
+register_collector("software", "software_info:get_filtered_software_from_running_services",
+                   "enable_software_monitoring", fingerprint="fingerprints:software_fingerprint")
+register_collector("hardware", "hw_info:get_hardware_info", fingerprint="fingerprints:hardware_fingerprint")
+register_collector("os", "os_info:get_os_info", fingerprint="fingerprints:os_fingerprint")
+register_collector("env_vars", "software_info:get_environment_variables", fingerprint="fingerprints:env_vars_fingerprint")
+register_collector("cron_jobs", "software_info:get_cron_jobs", fingerprint="fingerprints:cron_jobs_fingerprint")
+register_collector("logs", "software_info:get_log_files", fingerprint="fingerprints:logs_fingerprint")
+
+
+def enabled_collectors(settings, only=None):
+    """Collectors whose enable_* setting is on (collectors without a setting always run).
+
+    only, if given, is a list of collector names to run instead, whatever the settings say.
+    """
+    if only:
+        unknown = [name for name in only if name not in COLLECTORS]
+        if unknown:
+            raise ValueError(f"Unknown collector(s): {', '.join(unknown)}; available: {', '.join(COLLECTORS)}")
+        return [c for c in COLLECTORS.values() if c.name in only]
+    return [c for c in COLLECTORS.values() if c.setting is None or settings.get(c.setting, True)]
+
+
+def run_collectors(collectors, timeout=DEFAULT_COLLECTOR_TIMEOUT, max_workers=None, options=None,
+                   on_result=None, label="Collector", log_timings=True):
+    """Run collectors on a pool of worker threads, each bounded by its own timeout.
+
+    options maps a collector name to keyword arguments for its function.
+
+    Returns (sections, timings): sections maps collector name to its result,
+    in registry order, leaving out collectors that failed or timed out;
+    timings maps every collector name to its wall time in seconds.
+
+    If on_result is given it is called as on_result(name, result) from the
+    calling thread as each collector finishes, and results are not kept, so
+    sections comes back empty and only one section is held at a time.
+
+    A worker stuck in a timed-out collector is abandoned and replaced, so
+    collectors still queued behind it start instead of waiting forever.
+    label names the jobs in log messages; log_timings logs each one's wall time.
+    """
+    options = options or {}
+    work = queue.SimpleQueue()
+    finished = queue.SimpleQueue()
+    started = {}
+    for collector in collectors:
+        work.put(collector)
+
+    def worker():
+        while True:
+            try:
+                collector = work.get_nowait()
+            except queue.Empty:
+                return
+            started[collector.name] = time.monotonic()
+            try:
+                finished.put((collector, collector.func(**options.get(collector.name, {})), None))
+            except Exception as e:
+                finished.put((collector, None, e))
+
+    threads = 0
+
+    def start_worker():
+        nonlocal threads
+        # Daemon threads, so a collector stuck on a hung mount or command cannot keep the analyzer alive
+        threading.Thread(target=worker, name=f"collector-{threads}", daemon=True).start()
+        threads += 1
+
+    for _ in range(min(max_workers or len(collectors), len(collectors))):
+        start_worker()
+
+    results = {}
+    timings = {}
+    outstanding = {c.name: c for c in collectors}
+    while outstanding:
+        now = time.monotonic()
+        deadlines = {name: started[name] + (c.timeout or timeout)
+                     for name, c in outstanding.items() if name in started}
+        for name in [n for n, deadline in deadlines.items() if deadline <= now]:
+            collector = outstanding.pop(name)
+            timings[name] = now - started[name]
+            logging.warning(f"{label} '{name}' timed out after {collector.timeout or timeout}s; skipping")
+            # Its worker is stuck; let another take the queued work
+            if not work.empty():
+                start_worker()
+        if not outstanding:
+            break
+        # Nothing running yet means a worker is about to pick up queued work; look again shortly
+        wait = min([d - now for d in deadlines.values() if d > now], default=0.1)
+        try:
+            collector, result, error = finished.get(timeout=max(wait, 0.01))
+        except queue.Empty:
+            continue
+        if outstanding.pop(collector.name, None) is None:
+            continue  # Already reported as timed out
+        timings[collector.name] = time.monotonic() - started[collector.name]
+        if error is not None:
+            logging.error(f"{label} '{collector.name}' failed: {error}")
+        elif on_result is not None:
+            on_result(collector.name, result)
+        else:
+            results[collector.name] = result
+
+    if log_timings:
+        for name, seconds in timings.items():
+            logging.info(f"{label} '{name}' took {seconds:.2f}s")
+    sections = {c.name: results[c.name] for c in collectors if c.name in results}
+    return sections, timings
+
+
+def _with_options(fingerprint, options):
+    """A fingerprint that also changes with the collector's options (hardware_seed, log_sample_lines, ...)."""
+    if fingerprint is None or not options:
+        return fingerprint
+    encoded = json.dumps([fingerprint, options], sort_keys=True, default=repr)
+    return hashlib.sha256(encoded.encode()).hexdigest()[:16]
+
+
+def fingerprint_collectors(collectors, options=None):
+    """Map collector name to its current fingerprint, or None when it has none or it fails.
+
+    options maps a collector name to the keyword arguments it will run with,
+    as for run_collectors; they are part of the fingerprint, since they shape
+    the section as much as the host does.
+    """
+    options = options or {}
+    fingerprints = {}
+    for collector in collectors:
+        fingerprints[collector.name] = None
+        if collector.fingerprint is None:
+            continue
+        try:
+            fingerprints[collector.name] = _with_options(collector.fingerprint(), options.get(collector.name))
+        except Exception as e:
+            logging.warning(f"Could not fingerprint '{collector.name}', recollecting it: {e}")
+    return fingerprints
+
+
+def collect_to_store(collectors, path, incremental=True, carry_over=False, **run_options):
+    """Run collectors into the sectioned config at path, reusing unchanged sections.
+
+    A section is copied from the previous export at path when its fingerprint
+    matches; everything else is recollected. Consumers tell what changed by
+    comparing the fingerprints in the export with the ones they last used. With
+    carry_over, sections of the previous export that none of the collectors
+    produce are kept, so a partial run updates the export in place.
+
+    Returns (changed, unchanged, timings).
+    """
+    previous = open_previous(path) if incremental or carry_over else None
+    fingerprints = fingerprint_collectors(collectors, run_options.get("options"))
+    unchanged = []
+    if previous is not None and incremental:
+        unchanged = [c.name for c in collectors
+                     if fingerprints[c.name] is not None and c.name in previous.index
+                     and previous.fingerprints.get(c.name) == fingerprints[c.name]]
+    stale = [c for c in collectors if c.name not in unchanged]
+    changed = []
+
+    writer = SectionWriter(path, {"generated_at": time.time()})
+
+    def on_result(name, result):
+        writer.write_section(name, result, fingerprints[name])
+        changed.append(name)
+
+    try:
+        for name in unchanged:
+            writer.copy_section(previous, name)
+        if carry_over and previous is not None:
+            selected = {c.name for c in collectors}
+            for name in previous.sections():
+                if name not in selected:
+                    writer.copy_section(previous, name)
+        _, timings = run_collectors(stale, on_result=on_result, **run_options)
+    except BaseException:
+        writer.abort()
+        raise
+
+    writer.close()
+    if unchanged:
+        logging.info(f"Reused unchanged sections: {', '.join(unchanged)}")
+    return changed, unchanged, timings
+
+
+def _import_time(command, cwd):
+    """Wall time of command and the total import time it reports under -X importtime, in seconds.
+
+    Raises RuntimeError with the last line of stderr if the command fails.
+    """
+    import subprocess
+    import sys
+
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", *command], cwd=cwd,
+                            capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    imports = sum(int(line.split("|")[0].split(":")[1]) for line in result.stderr.splitlines()
+                  if line.startswith("import time:") and line.split("|")[0].split(":")[1].strip().isdigit())
+    return wall, imports / 1e6
+
+
+def _benchmark():
+    """Startup cost of a single-collector run against importing every collector module up front."""
+    import json
+    import os
+    import tempfile
+
+    analyzer_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    modules = sorted({c._func.partition(":")[0] for c in COLLECTORS.values() if isinstance(c._func, str)})
+    with tempfile.TemporaryDirectory() as tmp:
+        settings = os.path.join(tmp, "settings.json")
+        with open(settings, "w") as f:
+            json.dump({"export_config_directory": os.path.join(tmp, "export"),
+                       "logs_directory": os.path.join(tmp, "logs")}, f)
+        runs = [
+            ("--only os run", ["__main__.py", "--only", "os", "--settings", settings, "--full"]),
+            ("import every collector module", ["-c", "import " + ", ".join(f"utils.{m}" for m in modules)]),
+        ]
+        for label, command in runs:
+            try:
+                wall, imports = _import_time(command, analyzer_dir)
+            except RuntimeError as e:
+                print(f"{label}: failed: {e}")
+                continue
+            print(f"{label}: {wall * 1000:.1f} ms wall, {imports * 1000:.1f} ms importing")
+
+
+if __name__ == "__main__":
+    _benchmark()
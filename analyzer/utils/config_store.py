@@ -0,0 +1,141 @@
+import json
+import os
+
+# Sectioned config: a header line, one JSON line per collector section, and a
+# trailing index line mapping each section to its byte offset and length, so
+# readers can load single sections without parsing the rest of the file.
+FORMAT_NAME = "decoyhive-sections"
+FORMAT_VERSION = 1
+TAIL_BLOCK = 64 * 1024
+
+
+def read_trailer(f):
+    """The last JSON line of a binary file object, read backwards from the end in blocks."""
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    block = min(size, TAIL_BLOCK)
+    while True:
+        f.seek(size - block)
+        tail = f.read(block).rstrip(b"\n")
+        newline = tail.rfind(b"\n")
+        if newline >= 0 or block == size:
+            break
+        block = min(size, block * 2)
+    return json.loads(tail[newline + 1:])
+
+
+class SectionWriter:
+    """Write config sections one at a time, atomically replacing path on close()."""
+
+    def __init__(self, path, meta=None):
+        self.path = path
+        self._tmp = path + ".tmp"
+        self._file = open(self._tmp, "wb")
+        self.index = {}
+        self.fingerprints = {}
+        self.meta = dict(meta or {})
+        self._write_line({"format": FORMAT_NAME, "version": FORMAT_VERSION})
+
+    def _write_line(self, record):
+        data = (json.dumps(record, separators=(",", ":")) + "\n").encode()
+        offset = self._file.tell()
+        self._file.write(data)
+        return offset, len(data)
+
+    def write_section(self, name, data, fingerprint=None):
+        self.index[name] = self._write_line({"section": name, "data": data})
+        if fingerprint is not None:
+            self.fingerprints[name] = fingerprint
+
+    def copy_section(self, reader, name):
+        """Copy a section and its fingerprint from another sectioned file without decoding it."""
+        offset = self._file.tell()
+        raw = reader.read_raw(name)
+        self._file.write(raw)
+        self.index[name] = (offset, len(raw))
+        if name in reader.fingerprints:
+            self.fingerprints[name] = reader.fingerprints[name]
+
+    def close(self):
+        self._write_line(dict(self.meta, index=self.index, fingerprints=self.fingerprints))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self._tmp, self.path)
+
+    def abort(self):
+        self._file.close()
+        os.remove(self._tmp)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class SectionReader:
+    """Read individual sections of a sectioned config by seeking through its index."""
+
+    def __init__(self, path):
+        self.path = path
+        self.meta = self._read_trailer()
+        self.index = {name: tuple(entry) for name, entry in self.meta.pop("index").items()}
+        self.fingerprints = self.meta.pop("fingerprints", {})
+
+    def _read_trailer(self):
+        with open(self.path, "rb") as f:
+            record = read_trailer(f)
+        if "index" not in record:
+            raise ValueError(f"{self.path} has no section index (incomplete write?)")
+        return record
+
+    def sections(self):
+        return list(self.index)
+
+    def read_raw(self, name):
+        offset, length = self.index[name]
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            return f.read(length)
+
+    def read(self, name, default=None):
+        if name not in self.index:
+            return default
+        return json.loads(self.read_raw(name))["data"]
+
+    def read_many(self, names):
+        return {name: self.read(name) for name in names if name in self.index}
+
+    def read_all(self):
+        return self.read_many(self.sections())
+
+
+def open_previous(path):
+    """SectionReader for an earlier export at path, or None if there is no usable one."""
+    try:
+        return SectionReader(path) if is_sectioned(path) else None
+    except (OSError, ValueError):
+        return None
+
+
+def is_sectioned(path):
+    with open(path, "rb") as f:
+        first = f.readline()
+    try:
+        return json.loads(first).get("format") == FORMAT_NAME
+    except (ValueError, AttributeError):
+        return False
+
+
+def load_sections(path, names=None):
+    """Load the named sections (or all) from a sectioned or plain JSON config."""
+    if is_sectioned(path):
+        reader = SectionReader(path)
+        return reader.read_many(names) if names is not None else reader.read_all()
+    with open(path, "r") as f:
+        config = json.load(f)
+    return {k: v for k, v in config.items() if names is None or k in names}
@@ -0,0 +1,24 @@
+import logging
+import os
+
+
+def rooted(root, path):
+    """path inside the target filesystem mounted at root."""
+    return os.path.join(root, path.lstrip("/"))
+
+
+def read_file(path, default=""):
+    """Text of path, or default if it is missing or unreadable."""
+    try:
+        with open(path, "r", errors="replace") as f:
+            return f.read()
+    except PermissionError:
+        logging.warning(f"No permission to read {path}")
+    except OSError:
+        pass
+    return default
+
+
+def read_text(root, path, default=""):
+    """Text of path inside the filesystem mounted at root ("/" for the live host)."""
+    return read_file(rooted(root, path), default)
@@ -0,0 +1,103 @@
+import glob
+import hashlib
+import os
+import platform
+
+from .files import read_text
+from .log_sampler import SAMPLED_LOGS, rotated_files
+
+# Files whose modification signals a change in installed packages
+PACKAGE_DATABASES = [
+    "/var/lib/dpkg/status",
+    "/var/lib/rpm/rpmdb.sqlite",
+    "/var/lib/rpm/Packages",
+    "/var/lib/pacman/local",
+    "/var/db/pkg",
+]
+CRON_PATHS = ["/etc/crontab", "/etc/cron.d", "/var/spool/cron", "/var/spool/cron/crontabs"]
+
+
+def _digest(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else repr(part).encode())
+        h.update(b"\0")
+    return h.hexdigest()[:16]
+
+
+def _file_hash(path):
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def _stat_key(path):
+    """(mtime_ns, size) of path, or None when it does not exist."""
+    try:
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+    except OSError:
+        return None
+
+
+def _listeners():
+    # Imported here so fingerprinting os or hardware does not load psutil
+    from .proc_snapshot import get_snapshot
+
+    snapshot = get_snapshot()
+    return sorted((port, (snapshot.process_for_port(port) or {}).get("name"))
+                  for port in snapshot.listening_ports())
+
+
+def services_fingerprint():
+    return _digest(_listeners())
+
+
+def software_fingerprint():
+    # Running software is matched against the package database, so either changing invalidates it
+    return _digest([_stat_key(p) for p in PACKAGE_DATABASES], _listeners())
+
+
+def users_fingerprint():
+    sudoers = ["/etc/sudoers"] + sorted(glob.glob("/etc/sudoers.d/*"))
+    return _digest(*[_file_hash(p) for p in ["/etc/passwd", "/etc/group"] + sudoers])
+
+
+def network_fingerprint():
+    # The nftables ruleset has no file to stat; /etc/nftables.conf covers the persisted one
+    files = ("/proc/net/route", "/proc/net/if_inet6", "/proc/net/fib_trie", "/etc/resolv.conf")
+    return _digest(*[_file_hash(p) for p in files], _stat_key("/etc/nftables.conf"))
+
+
+def os_fingerprint():
+    return _digest(_file_hash("/etc/os-release"), platform.release(), platform.version())
+
+
+def hardware_fingerprint():
+    # Randomized sizes and MACs are drawn from the host seed, so they only change when the hardware does
+    from .hw_info import host_seed, parse_meminfo, read_block_devices, read_mounts, read_net_devices
+
+    memory = parse_meminfo(read_text("/", "/proc/meminfo"))["MemTotal"]
+    return _digest(platform.machine(), platform.processor(), os.cpu_count(),
+                   _file_hash("/sys/devices/virtual/dmi/id/product_uuid"), host_seed(), memory,
+                   read_block_devices(), read_mounts(), read_net_devices())
+
+
+def env_vars_fingerprint():
+    return _digest(sorted(os.environ.items()))
+
+
+def cron_jobs_fingerprint():
+    paths = []
+    for path in CRON_PATHS:
+        paths.append(path)
+        if os.path.isdir(path):
+            paths.extend(sorted(glob.glob(os.path.join(path, "*"))))
+    return _digest([(p, _stat_key(p)) for p in paths])
+
+
+def logs_fingerprint():
+    return _digest([(p, _stat_key(p)) for path in SAMPLED_LOGS.values() for p in rotated_files(path)])
+
@@ -0,0 +1,160 @@
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .collectors import DEFAULT_COLLECTOR_TIMEOUT, collect_to_store
+from .log_sampler import DEFAULT_MAX_LINES
+from .rootfs import rootfs_collectors
+
+
+def load_inventory(path):
+    """Read a fleet inventory: a JSON list (or {"hosts": [...]}) of {"name", "root"} entries.
+
+    root is a mounted rootfs snapshot or a directory holding an exported
+    /proc (and /etc, /var/lib, ...) dump of the host.
+    """
+    with open(path, "r") as f:
+        inventory = json.load(f)
+    hosts = inventory.get("hosts", []) if isinstance(inventory, dict) else inventory
+    seen = set()
+    for host in hosts:
+        if "name" not in host or "root" not in host:
+            raise ValueError(f"Inventory entry needs a name and a root: {host}")
+        if host["name"] in seen:
+            raise ValueError(f"Duplicate host in inventory: {host['name']}")
+        seen.add(host["name"])
+    return hosts
+
+
+def analyze_host(name, root, store_dir, settings):
+    """Collect one host's rootfs into <store_dir>/<name>/config.jsonl; runs in a worker process."""
+    start = time.monotonic()
+    result = {"host": name, "root": root, "ok": False, "seconds": 0.0, "sections": [], "reused": [], "failed": []}
+    try:
+        if not os.path.isdir(root):
+            raise FileNotFoundError(f"rootfs not found: {root}")
+        host_dir = os.path.join(store_dir, name)
+        os.makedirs(host_dir, exist_ok=True)
+        collectors = rootfs_collectors(root, settings)
+        options = {
+            "logs": {
+                "artifact_dir": os.path.join(host_dir, "artifacts"),
+                "max_lines": settings.get("log_sample_lines", DEFAULT_MAX_LINES),
+                "window": settings.get("log_sample_window"),
+            },
+        }
+        changed, unchanged, timings = collect_to_store(
+            collectors, os.path.join(host_dir, "config.jsonl"),
+            incremental=settings.get("incremental", True),
+            timeout=settings.get("collector_timeout", DEFAULT_COLLECTOR_TIMEOUT),
+            # Hosts already run in parallel processes; one collector thread per host is enough
+            max_workers=1,
+            options=options,
+        )
+        result["sections"] = changed
+        result["reused"] = unchanged
+        result["failed"] = sorted(set(timings) - set(changed))
+        result["ok"] = True
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = time.monotonic() - start
+    return result
+
+
+def run_fleet(hosts, store_dir, max_workers=None, settings=None):
+    """Analyze every inventory host on a bounded process pool.
+
+    Each host gets its own sectioned config under store_dir, and a summary of
+    per-host timings and failures is written to <store_dir>/fleet.json.
+    Returns the per-host results in inventory order.
+    """
+    settings = settings or {}
+    os.makedirs(store_dir, exist_ok=True)
+    start = time.monotonic()
+    results = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(analyze_host, h["name"], h["root"], store_dir, settings): h["name"] for h in hosts}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                # The worker process itself died
+                result = {"host": name, "ok": False, "seconds": 0.0, "error": f"{type(e).__name__}: {e}"}
+            results[name] = result
+            if result["ok"]:
+                logging.info(f"Analyzed {name} in {result['seconds']:.2f}s "
+                             f"({len(result['sections'])} collected, {len(result['reused'])} reused)")
+            else:
+                logging.error(f"Analysis of {name} failed: {result['error']}")
+
+    ordered = [results[h["name"]] for h in hosts]
+    summary = {
+        "hosts": ordered,
+        "failed": [r["host"] for r in ordered if not r["ok"]],
+        "seconds": time.monotonic() - start,
+    }
+    tmp = os.path.join(store_dir, "fleet.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(summary, f, indent=2)
+    os.replace(tmp, os.path.join(store_dir, "fleet.json"))
+    return ordered
+
+
+def print_report(results):
+    for r in results:
+        status = "ok" if r["ok"] else f"FAILED ({r['error']})"
+        missing = f", missing {', '.join(r['failed'])}" if r.get("failed") else ""
+        print(f"{r['host']:<20} {r['seconds']:7.2f}s  {status}{missing}")
+
+
+def make_fake_rootfs(root, distro="ubuntu", cores=2, memory_kb=2048000, ports=(22,)):
+    """Lay out a minimal rootfs/proc dump for exercising the fleet locally."""
+    files = {
+        "etc/os-release": f'ID={distro}\nID_LIKE=debian\nPRETTY_NAME="{distro.title()}"\n',
+        "etc/passwd": "root:x:0:0:root:/root:/bin/bash\n",
+        "etc/group": "root:x:0:\n",
+        "proc/sys/kernel/osrelease": "5.15.0-fake\n",
+        "proc/meminfo": f"MemTotal: {memory_kb} kB\nMemAvailable: {memory_kb // 2} kB\n",
+        "proc/cpuinfo": "".join(f"processor\t: {i}\nmodel name\t: Fake CPU\ncore id\t: {i}\n\n" for i in range(cores)),
+        "proc/net/tcp": "  sl  local_address rem_address   st tx_queue rx_queue tr tm->when retrnsmt   uid  timeout inode\n"
+                        + "".join(f"   {i}: 00000000:{port:04X} 00000000:0000 0A 00000000:00000000 00:00000000 00000000     0        0 {1000 + i}\n"
+                                  for i, port in enumerate(ports)),
+        "proc/100/comm": "sshd\n",
+        "var/lib/dpkg/status": "Package: openssh-server\nStatus: install ok installed\nVersion: 1:8.9p1\nArchitecture: amd64\n",
+        "var/log/syslog": "Jan  1 00:00:00 host kernel: booted\n",
+    }
+    for path, content in files.items():
+        full = os.path.join(root, path)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        with open(full, "w") as f:
+            f.write(content)
+    os.makedirs(os.path.join(root, "proc/100/fd"), exist_ok=True)
+    for i in range(len(ports)):
+        os.symlink(f"socket:[{1000 + i}]", os.path.join(root, f"proc/100/fd/{i + 3}"))
+
+
+def _benchmark(count=16, workers=4):
+    """Analyze count fake rootfs directories, plus one missing host, then re-run incrementally."""
+    with tempfile.TemporaryDirectory() as tmp:
+        hosts = []
+        for i in range(count):
+            root = os.path.join(tmp, "roots", f"host{i:02d}")
+            make_fake_rootfs(root, cores=1 + i % 8, ports=(22, 80) if i % 2 else (22,))
+            hosts.append({"name": f"host{i:02d}", "root": root})
+        hosts.append({"name": "missing", "root": os.path.join(tmp, "roots", "missing")})
+        store = os.path.join(tmp, "store")
+
+        for label in ("full", "incremental"):
+            start = time.perf_counter()
+            results = run_fleet(hosts, store, max_workers=workers)
+            print(f"{label} run: {len(hosts)} hosts in {time.perf_counter() - start:.2f}s with {workers} workers")
+        print_report(results)
+
+
+if __name__ == "__main__":
+    _benchmark(*(int(a) for a in sys.argv[1:3]))
@@ -1,75 +1,204 @@
-import psutil
+import hashlib
+import os
 import platform
 import random
-import subprocess
+import re
+from functools import partial
 
-def get_hardware_info():
-    """Collect hardware information with some randomized elements."""
-    def randomize_size(size_gb):
-        return f"{size_gb * random.uniform(0.8, 1.2):.2f} GB"
+from .collectors import Collector, run_collectors
+from .files import read_text
 
-    def randomize_mac(original_mac):
-        if original_mac == "N/A" or len(original_mac.split(':')) != 6:
-            return original_mac
-        mac_parts = original_mac.split(':')
-        randomized_mac = mac_parts[:3] + [f"{random.randint(0, 255):02x}" for _ in range(3)]
-        return ':'.join(randomized_mac)
-
-    def get_essential_cpu_flags():
-        essential_flags = {"sse", "sse2", "sse4_1", "sse4_2", "avx", "avx2", "aes", "fma", "pclmulqdq", "popcnt"}
-        try:
-            result = subprocess.run(["lscpu"], capture_output=True, text=True)
-            for line in result.stdout.split("\n"):
-                if "Flags:" in line:
-                    return [flag for flag in line.split(":")[1].strip().split() if flag in essential_flags]
-        except Exception:
-            return []
-        return []
-
-    cpu_info = {
-        "model": platform.processor(),
-        "architecture": platform.machine(),
-        "cores": psutil.cpu_count(logical=False),
-        "threads": psutil.cpu_count(logical=True),
-        "frequency": f"{psutil.cpu_freq().max:.2f} MHz",
-        "flags": get_essential_cpu_flags()
-    }
+ESSENTIAL_CPU_FLAGS = {"sse", "sse2", "sse4_1", "sse4_2", "avx", "avx2", "aes", "fma", "pclmulqdq", "popcnt"}
+# Block devices that are not disks: loop files, RAM disks, compressed swap, optical drives, device mapper
+VIRTUAL_BLOCK_PREFIXES = ("loop", "ram", "zram", "sr", "dm-", "nbd")
+SECTOR_SIZE = 512
+DEFAULT_MOUNT_TIMEOUT = 2
+DEFAULT_MOUNT_WORKERS = 4
+
+
+def _gigabytes(size_bytes):
+    if size_bytes is None:
+        return None
+    return f"{size_bytes / (1024 ** 3):.2f} GB"
 
-    memory_info = {
-        "total": f"{psutil.virtual_memory().total / (1024 ** 3):.2f} GB",
-        "available": f"{psutil.virtual_memory().available / (1024 ** 3):.2f} GB"
-    }
 
-    disk_info = {
-        "total": randomize_size(psutil.disk_usage('/').total / (1024 ** 3)),
-        "partitions": [
-            {
-                "device": part.device,
-                "mountpoint": part.mountpoint,
-                "fstype": part.fstype,
-                "total_size": randomize_size(psutil.disk_usage(part.mountpoint).total / (1024 ** 3))
-            }
-            for part in psutil.disk_partitions()
-        ]
+def parse_key_values(text, sep="="):
+    """KEY=value lines (os-release, /etc/environment) or key: value lines (meminfo) into a dict."""
+    values = {}
+    for line in text.splitlines():
+        key, found, value = line.partition(sep)
+        if found and key.strip() and not key.startswith("#"):
+            values[key.strip()] = value.strip().strip('"')
+    return values
+
+
+def parse_cpuinfo(text):
+    """Model, thread/core counts and flags from /proc/cpuinfo; counts are None when it could not be read."""
+    processors = [parse_key_values(block, ":") for block in text.split("\n\n") if block.strip()]
+    processors = [p for p in processors if "processor" in p]
+    first = processors[0] if processors else {}
+    cores = {(p.get("physical id"), p.get("core id")) for p in processors}
+    return {
+        "model": first.get("model name", ""),
+        "cores": (len(cores) if first.get("core id") is not None else len(processors)) or None,
+        "threads": len(processors) or None,
+        "frequency": f"{float(first['cpu MHz']):.2f} MHz" if "cpu MHz" in first else None,
+        "flags": first.get("flags", "").split(),
     }
 
-    network_info = [
-        {
+
+def parse_meminfo(text):
+    """MemTotal and MemAvailable from /proc/meminfo, in bytes, or None where missing."""
+    values = parse_key_values(text, ":")
+    return {key: int(values[key].split()[0]) * 1024 if values.get(key) else None
+            for key in ("MemTotal", "MemAvailable")}
+
+
+def read_block_devices(root="/"):
+    """Physical disks from /sys/block: name, size in bytes, model and whether they spin."""
+    disks = []
+    try:
+        names = sorted(os.listdir(os.path.join(root, "sys/block")))
+    except OSError:
+        return disks
+    for name in names:
+        if name.startswith(VIRTUAL_BLOCK_PREFIXES):
+            continue
+        sectors = read_text(root, f"/sys/block/{name}/size", "0").strip()
+        disks.append({
             "name": name,
-            "ip": addr.address,
-            "mac": randomize_mac(addr.address) if addr.family == psutil.AF_LINK else "N/A"
-        }
-        for name, addrs in psutil.net_if_addrs().items()
-        for addr in addrs
-    ]
+            "size": int(sectors or 0) * SECTOR_SIZE,
+            "model": read_text(root, f"/sys/block/{name}/device/model").strip() or None,
+            "rotational": read_text(root, f"/sys/block/{name}/queue/rotational").strip() == "1",
+        })
+    return disks
+
+
+def read_net_devices(root="/"):
+    """Network interfaces from /sys/class/net: name, MAC, MTU and link state."""
+    interfaces = []
+    try:
+        names = sorted(os.listdir(os.path.join(root, "sys/class/net")))
+    except OSError:
+        return interfaces
+    for name in names:
+        base = f"/sys/class/net/{name}"
+        interfaces.append({
+            "name": name,
+            "mac": read_text(root, base + "/address").strip() or "N/A",
+            "mtu": int(read_text(root, base + "/mtu", "0").strip() or 0),
+            "state": read_text(root, base + "/operstate").strip() or "unknown",
+        })
+    return interfaces
+
+
+def unescape_mount_path(path):
+    """Undo the \\NNN octal escapes /proc/mounts uses for spaces, tabs, newlines and backslashes.
+
+    Anything else, including non-ASCII UTF-8 names, is left as it is.
+    """
+    return re.sub(r"\\([0-7]{3})", lambda m: chr(int(m.group(1), 8)), path)
+
+
+def read_mounts(root="/"):
+    """Mounted block-device filesystems from /proc/self/mounts, as (device, mountpoint, fstype)."""
+    nodev = {line.split()[1] for line in read_text(root, "/proc/filesystems").splitlines()
+             if line.startswith("nodev")}
+    mounts = []
+    seen = set()
+    for line in read_text(root, "/proc/self/mounts").splitlines():
+        fields = line.split()
+        if len(fields) < 3 or fields[2] in nodev or fields[1] in seen:
+            continue
+        seen.add(fields[1])
+        mounts.append((fields[0], unescape_mount_path(fields[1]), fields[2]))
+    return mounts
+
+
+def statvfs_mounts(mountpoints, timeout=DEFAULT_MOUNT_TIMEOUT, max_workers=DEFAULT_MOUNT_WORKERS):
+    """Total size in bytes of each mountpoint, skipping any whose statvfs does not return within timeout.
+
+    Calls run on a bounded pool of daemon threads, so a hung NFS or FUSE
+    mount costs at most timeout and a worker, never the whole analyzer.
+    """
+    jobs = [Collector(path, partial(os.statvfs, path), timeout=timeout) for path in mountpoints]
+    results, _ = run_collectors(jobs, timeout=timeout, max_workers=max_workers, label="statvfs of",
+                                log_timings=False)
+    return {path: st.f_blocks * st.f_frsize for path, st in results.items()}
+
+
+def host_seed(root="/"):
+    """Stable per-host seed, so randomized values are the same on every run of the same host."""
+    machine_id = read_text(root, "/etc/machine-id").strip() or read_text(root, "/var/lib/dbus/machine-id").strip()
+    return machine_id or platform.node()
+
+
+class Randomizer:
+    """Reproducible jitter: each value is drawn from a generator seeded by (seed, key).
+
+    Keying by item rather than drawing in sequence keeps a disk's randomized
+    size the same when another disk or interface is added or removed.
+    """
+
+    def __init__(self, seed):
+        self.seed = str(seed)
+
+    def _rng(self, key):
+        return random.Random(hashlib.sha256(f"{self.seed}:{key}".encode()).digest())
+
+    def size(self, key, size_bytes):
+        return _gigabytes(size_bytes * self._rng(key).uniform(0.8, 1.2))
+
+    def mac(self, key, original_mac):
+        if original_mac == "N/A" or len(original_mac.split(':')) != 6:
+            return original_mac
+        rng = self._rng(key)
+        return ':'.join(original_mac.split(':')[:3] + [f"{rng.randint(0, 255):02x}" for _ in range(3)])
+
+
+def get_hardware_info(root="/", seed=None, mount_timeout=DEFAULT_MOUNT_TIMEOUT, mount_workers=DEFAULT_MOUNT_WORKERS):
+    """Collect hardware information from procfs and sysfs under root, with reproducibly randomized elements.
+
+    seed defaults to the host's machine-id. Filesystem sizes are only
+    measured on the live host (root "/"), as a snapshot's mounts are not the host's.
+    """
+    randomizer = Randomizer(seed if seed is not None else host_seed(root))
+
+    cpu = parse_cpuinfo(read_text(root, "/proc/cpuinfo"))
+    cpu["architecture"] = platform.machine() if root == "/" else None
+    cpu["flags"] = [flag for flag in cpu["flags"] if flag in ESSENTIAL_CPU_FLAGS]
+    max_khz = read_text(root, "/sys/devices/system/cpu/cpu0/cpufreq/cpuinfo_max_freq").strip()
+    if max_khz.isdigit():
+        cpu["frequency"] = f"{int(max_khz) / 1000:.2f} MHz"
+
+    memory = parse_meminfo(read_text(root, "/proc/meminfo"))
+
+    disks = read_block_devices(root)
+    partitions = []
+    if root == "/":
+        mounts = read_mounts(root)
+        sizes = statvfs_mounts([m[1] for m in mounts], mount_timeout, mount_workers)
+        for device, mountpoint, fstype in mounts:
+            partitions.append({
+                "device": device,
+                "mountpoint": mountpoint,
+                "fstype": fstype,
+                "total_size": randomizer.size(mountpoint, sizes[mountpoint]) if mountpoint in sizes else None,
+            })
 
     return {
-        "cpu": cpu_info,
-        "memory": memory_info,
-        "disk": disk_info,
-        "network_interfaces": network_info
+        "cpu": cpu,
+        "memory": {"total": _gigabytes(memory["MemTotal"]), "available": _gigabytes(memory["MemAvailable"])},
+        "disk": {
+            "total": randomizer.size("disks", sum(d["size"] for d in disks)),
+            "disks": [dict(d, size=randomizer.size(d["name"], d["size"])) for d in disks],
+            "partitions": partitions,
+        },
+        "network_interfaces": [dict(i, mac=randomizer.mac(i["name"], i["mac"])) for i in read_net_devices(root)],
     }
 
+
+# Run from analyzer/ as: python -m utils.hw_info
 if __name__ == "__main__":
     import json
     print(json.dumps(get_hardware_info(), indent=4))
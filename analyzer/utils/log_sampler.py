@@ -0,0 +1,130 @@
+import glob
+import gzip
+import logging
+import os
+import re
+import time
+from collections import deque
+from datetime import datetime
+
+BLOCK_SIZE = 64 * 1024
+DEFAULT_MAX_LINES = 1000
+DEFAULT_ARTIFACT_DIR = "./config_exports/artifacts"
+
+# Logs sampled into artifacts: config.json key -> path of the live file
+SAMPLED_LOGS = {
+    "syslog": "/var/log/syslog",
+    "auth_log": "/var/log/auth.log",
+}
+
+ISO_TIME = re.compile(r"^(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2})")
+SYSLOG_TIME = re.compile(r"^([A-Z][a-z]{2} [ \d]\d \d{2}:\d{2}:\d{2})")
+
+
+def parse_log_time(line, now=None):
+    """Epoch seconds of an RFC 3164 ("Jan  5 12:34:56") or ISO 8601 syslog line, or None."""
+    match = ISO_TIME.match(line)
+    if match:
+        return time.mktime(time.strptime(match.group(1), "%Y-%m-%dT%H:%M:%S"))
+    match = SYSLOG_TIME.match(line)
+    if match:
+        now = now or time.time()
+        year = datetime.fromtimestamp(now).year
+        stamp = time.mktime(time.strptime(f"{year} {match.group(1)}", "%Y %b %d %H:%M:%S"))
+        # RFC 3164 has no year; a date in the future belongs to last year
+        if stamp > now + 86400:
+            stamp = time.mktime(time.strptime(f"{year - 1} {match.group(1)}", "%Y %b %d %H:%M:%S"))
+        return stamp
+    return None
+
+
+def _too_old(line, cutoff):
+    if cutoff is None:
+        return False
+    stamp = parse_log_time(line)
+    return stamp is not None and stamp < cutoff
+
+
+def tail_lines(path, max_lines, since=None):
+    """Last max_lines lines of a plain file newer than since, read backwards in fixed-size blocks."""
+    lines = []
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        partial = b""
+        while position > 0 and len(lines) < max_lines:
+            size = min(BLOCK_SIZE, position)
+            position -= size
+            f.seek(position)
+            parts = (f.read(size) + partial).split(b"\n")
+            # The first piece may continue in the previous block, unless we are at the start of the file
+            partial = parts.pop(0) if position > 0 else b""
+            for raw in reversed(parts):
+                if not raw:
+                    continue
+                line = raw.decode("utf-8", "replace")
+                if _too_old(line, since) or len(lines) >= max_lines:
+                    return lines[::-1]
+                lines.append(line)
+    return lines[::-1]
+
+
+def tail_gzip_lines(path, max_lines, since=None):
+    """Last max_lines lines of a gzip file; compressed data cannot be read backwards, so stream it."""
+    lines = deque(maxlen=max_lines)
+    with gzip.open(path, "rt", errors="replace") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line and not _too_old(line, since):
+                lines.append(line)
+    return list(lines)
+
+
+def rotated_files(path):
+    """The live log followed by its rotations, newest first (syslog, syslog.1, syslog.2.gz, ...)."""
+    def rotation(p):
+        suffix = p[len(path) + 1:].split(".")[0]
+        return int(suffix) if suffix.isdigit() else 0
+    rotations = [p for p in glob.glob(glob.escape(path) + ".*") if rotation(p) > 0]
+    return ([path] if os.path.exists(path) else []) + sorted(rotations, key=rotation)
+
+
+def sample_log(path, max_lines=DEFAULT_MAX_LINES, since=None):
+    """Newest max_lines lines (optionally only those after the epoch time since), across rotations.
+
+    Returns (lines, sources). Memory is bounded by max_lines, not by file size.
+    """
+    lines = []
+    sources = []
+    for source in rotated_files(path):
+        wanted = max_lines - len(lines)
+        if wanted <= 0:
+            break
+        reader = tail_gzip_lines if source.endswith(".gz") else tail_lines
+        try:
+            chunk = reader(source, wanted, since)
+        except OSError as e:
+            logging.warning(f"Could not read {source}: {e}")
+            continue
+        sources.append(source)
+        lines = chunk + lines
+        # An older file cannot hold newer lines; stop once the window is exhausted
+        if since is not None and len(chunk) < wanted:
+            break
+    return lines, sources
+
+
+def write_log_artifact(name, path, artifact_dir, max_lines=DEFAULT_MAX_LINES, since=None):
+    """Write a log sample to <artifact_dir>/<name>.log and return the reference stored in config.json."""
+    lines, sources = sample_log(path, max_lines, since)
+    os.makedirs(artifact_dir, exist_ok=True)
+    artifact = os.path.join(artifact_dir, f"{name}.log")
+    with open(artifact, "w") as f:
+        for line in lines:
+            f.write(line + "\n")
+    return {
+        # Relative to the export directory that holds config.json
+        "path": os.path.join(os.path.basename(os.path.normpath(artifact_dir)), f"{name}.log"),
+        "lines": len(lines),
+        "sources": sources,
+    }
@@ -1,17 +1,163 @@
+import ipaddress
+import json
+import logging
+import socket
+import struct
 import subprocess
-import platform
-
-def get_network_info():
-    os_name = platform.system()
-    """Collect network configuration information."""
-    if os_name == "Linux":
-        return {
-            "ip_address": subprocess.run(["hostname", "-I"], capture_output=True, text=True).stdout.strip(),
-            "routing_table": subprocess.run(["netstat", "-r"], capture_output=True, text=True).stdout,
-            "dns_servers": subprocess.run(["cat", "/etc/resolv.conf"], capture_output=True, text=True).stdout,
-            "firewall_rules": subprocess.run(["iptables", "-L"], capture_output=True, text=True).stdout
-        }
-    elif os_name == "Windows":
-        return {}
-    else:
-        return {}
+from collections import namedtuple
+
+from .files import read_text
+
+Route = namedtuple("Route", ["interface", "destination", "prefix", "gateway", "metric", "flags"])
+Address = namedtuple("Address", ["interface", "address", "prefix", "family", "scope"])
+FirewallChain = namedtuple("FirewallChain", ["family", "table", "name", "hook", "priority", "policy"])
+FirewallRule = namedtuple("FirewallRule", ["family", "table", "chain", "handle", "expr"])
+
+# /proc/net/if_inet6 scope values
+IPV6_SCOPES = {0x00: "global", 0x10: "host", 0x20: "link", 0x40: "site"}
+RTF_UP, RTF_GATEWAY = 0x1, 0x2
+
+
+def _hex_ipv4(value):
+    """Address from the little-endian hex form used by /proc/net/route."""
+    return socket.inet_ntoa(struct.pack("<I", int(value, 16)))
+
+
+def parse_routes(text):
+    """Parse /proc/net/route into Route records, skipping routes that are down."""
+    routes = []
+    for line in text.splitlines()[1:]:
+        fields = line.split()
+        if len(fields) < 8:
+            continue
+        flags = int(fields[3], 16)
+        if not flags & RTF_UP:
+            continue
+        routes.append(Route(
+            interface=fields[0],
+            destination=_hex_ipv4(fields[1]),
+            prefix=bin(int(fields[7], 16)).count("1"),
+            gateway=_hex_ipv4(fields[2]) if flags & RTF_GATEWAY else None,
+            metric=int(fields[6]),
+            flags=flags,
+        ))
+    return routes
+
+
+def parse_if_inet6(text):
+    """Parse /proc/net/if_inet6 into Address records."""
+    addresses = []
+    for line in text.splitlines():
+        fields = line.split()
+        if len(fields) != 6:
+            continue
+        scope = int(fields[3], 16)
+        addresses.append(Address(
+            interface=fields[5],
+            address=str(ipaddress.IPv6Address(bytes.fromhex(fields[0]))),
+            prefix=int(fields[2], 16),
+            family="inet6",
+            scope=IPV6_SCOPES.get(scope, str(scope)),
+        ))
+    return addresses
+
+
+def parse_fib_trie(text, routes):
+    """Local IPv4 addresses from /proc/net/fib_trie, attributed to interfaces via the connected routes."""
+    local = []
+    current = None
+    for line in text.splitlines():
+        stripped = line.strip()
+        if stripped.startswith("|--"):
+            current = stripped[3:].strip()
+        elif stripped.startswith("/32 host LOCAL") and current and current not in local:
+            local.append(current)
+
+    connected = [r for r in routes if r.gateway is None]
+    addresses = []
+    for ip in local:
+        address = ipaddress.IPv4Address(ip)
+        interface, prefix = ("lo", 8) if address.is_loopback else (None, 32)
+        for route in sorted(connected, key=lambda r: -r.prefix):
+            if address in ipaddress.IPv4Network(f"{route.destination}/{route.prefix}"):
+                interface, prefix = route.interface, route.prefix
+                break
+        scope = "host" if address.is_loopback else "global"
+        addresses.append(Address(interface, ip, prefix, "inet", scope))
+    return addresses
+
+
+def parse_resolv_conf(text):
+    dns = {"nameservers": [], "search": [], "options": []}
+    for line in text.splitlines():
+        fields = line.split("#")[0].split(";")[0].split()
+        if not fields:
+            continue
+        if fields[0] == "nameserver" and len(fields) > 1:
+            dns["nameservers"].append(fields[1])
+        elif fields[0] in ("search", "domain"):
+            dns["search"].extend(fields[1:])
+        elif fields[0] == "options":
+            dns["options"].extend(fields[1:])
+    return dns
+
+
+def parse_nft_ruleset(data):
+    """Chains and rules from `nft -j list ruleset` output."""
+    chains = []
+    rules = []
+    try:
+        items = json.loads(data).get("nftables", []) if data else []
+    except ValueError as e:
+        logging.error(f"Could not parse the nftables ruleset: {e}")
+        return [], []
+    for item in items:
+        if "chain" in item:
+            c = item["chain"]
+            chains.append(FirewallChain(c.get("family"), c.get("table"), c.get("name"),
+                                        c.get("hook"), c.get("prio"), c.get("policy")))
+        elif "rule" in item:
+            r = item["rule"]
+            rules.append(FirewallRule(r.get("family"), r.get("table"), r.get("chain"),
+                                      r.get("handle"), r.get("expr", [])))
+    return chains, rules
+
+
+def read_nft_ruleset():
+    """The live nftables ruleset as JSON text, or "" when nft is unavailable (no file holds it)."""
+    try:
+        result = subprocess.run(["nft", "-j", "list", "ruleset"], capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logging.warning(f"Could not read the nftables ruleset: {e}")
+        return ""
+    if result.returncode != 0:
+        logging.warning(f"nft failed: {result.stderr.strip()}")
+        return ""
+    return result.stdout
+
+
+def records(items):
+    return [item._asdict() for item in items]
+
+
+def format_rules(rules):
+    """One line per rule, the text form kept for readers of the old firewall_rules key."""
+    return "\n".join(f"{r.family} {r.table} {r.chain} handle {r.handle}: {json.dumps(r.expr)}" for r in rules)
+
+
+def get_network_info(root="/"):
+    """Addresses, routes, DNS and firewall configuration, read from procfs and /etc under root."""
+    routes = parse_routes(read_text(root, "/proc/net/route"))
+    addresses = parse_fib_trie(read_text(root, "/proc/net/fib_trie"), routes)
+    addresses += parse_if_inet6(read_text(root, "/proc/net/if_inet6"))
+    # The ruleset lives in the kernel, so only a live host has one to report
+    chains, rules = parse_nft_ruleset(read_nft_ruleset()) if root == "/" else ([], [])
+    return {
+        # ip_address and firewall_rules keep the old flat keys ("hostname -I" style and a text listing)
+        "ip_address": " ".join(a.address for a in addresses if a.scope == "global"),
+        "addresses": records(addresses),
+        "routes": records(routes),
+        "dns": parse_resolv_conf(read_text(root, "/etc/resolv.conf")),
+        "firewall": {"chains": records(chains), "rules": records(rules)},
+        "firewall_rules": format_rules(rules),
+    }
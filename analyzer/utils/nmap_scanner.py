@@ -1,83 +1,149 @@
+import os
 import subprocess
-import re
-import psutil
 import logging
 import sys
+import tempfile
+import xml.etree.ElementTree as ET
+from collections import namedtuple
 
-# Configure logging to log both to a file and the terminal
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler("honeypot.log"),  # Log to file
-        logging.StreamHandler()  # Log to terminal
-    ]
-)
+from .proc_snapshot import get_snapshot
 
-def run_nmap_scan(target="127.0.0.1"):
-    """Runs an Nmap scan and streams the output live."""
+logger = logging.getLogger(__name__)
 
-    # Enforce root privileges
-    if os.getuid() != 0:
-        print("This script must be run as root. Please Enter your sudo password")
+PortEvent = namedtuple("PortEvent", [
+    "host", "protocol", "port", "state", "reason",
+    "service", "product", "version", "extrainfo", "cpes", "scripts",
+])
 
+# nmap scan type per protocol; both need root, as the original sudo invocation had
+SCAN_FLAGS = {"tcp": "-sS", "udp": "-sU"}
 
-    try:
-        command = ["sudo", "nmap", "-Pn", "-sV", "-p-", "-vv", target]  # Nmap scan with service detection
-        logging.info(f"Running Nmap scan: {' '.join(command)}")
 
-        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+def nmap_command(target, ports="-", protocols=("tcp",), extra_args=()):
+    """nmap invocation that writes XML to stdout; sudo is added only when not already root."""
+    command = ["nmap", "-Pn", "-sV", *[SCAN_FLAGS[p] for p in protocols], f"-p{ports}", "-oX", "-",
+               *extra_args, target]
+    return command if os.getuid() == 0 else ["sudo"] + command
 
-        # Stream output in real-time
-        output_lines = []
-        for line in iter(process.stdout.readline, ''):
-            sys.stdout.write(line)  # Print to terminal in real-time
-            sys.stdout.flush()
-            logging.info(line.strip())  # Log to file
-            output_lines.append(line.strip())
 
-        process.stdout.close()
-        process.wait()
+def _port_event(host, element):
+    state = element.find("state")
+    service = element.find("service")
+    service = service if service is not None else ET.Element("service")
+    return PortEvent(
+        host=host,
+        protocol=element.get("protocol"),
+        port=int(element.get("portid")),
+        state=state.get("state") if state is not None else None,
+        reason=state.get("reason") if state is not None else None,
+        service=service.get("name"),
+        product=service.get("product"),
+        version=service.get("version"),
+        extrainfo=service.get("extrainfo"),
+        cpes=[cpe.text for cpe in service.findall("cpe")],
+        scripts={script.get("id"): script.get("output") for script in element.findall("script")},
+    )
 
-        return "\n".join(output_lines)
 
-    except FileNotFoundError:
-        logging.error("Nmap is not installed. Please install it first.")
-        return ""
+def parse_nmap_xml(source, on_progress=None):
+    """Yield a PortEvent for every <port> in nmap XML as soon as its element is complete.
 
-def parse_nmap_output(nmap_output):
-    """Parses Nmap output and extracts open ports with their services."""
+    source is a path or a binary file object, such as the stdout of a
+    running `nmap -oX -`. Finished elements are cleared, so memory does not
+    grow with the number of ports. on_progress, if given, receives each
+    <taskprogress> element's attributes (emitted with --stats-every).
+    """
+    host = None
+    root = None
+    for event, element in ET.iterparse(source, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = element
+            continue
+        if element.tag == "address" and element.get("addrtype") in ("ipv4", "ipv6") and host is None:
+            host = element.get("addr")
+        elif element.tag == "port":
+            yield _port_event(host, element)
+            element.clear()
+        elif element.tag == "taskprogress" and on_progress is not None:
+            on_progress(dict(element.attrib))
+        elif element.tag == "host":
+            host = None
+            root.clear()
+
+
+def run_nmap_scan(target="127.0.0.1", ports="-", protocols=("tcp",), extra_args=(), on_progress=None):
+    """Run nmap and yield a PortEvent per scanned port while the scan is still going.
+
+    nmap writes a host's ports when that host finishes, so events arrive host
+    by host; pass extra_args=["--stats-every", "10s"] with on_progress for
+    liveness during a long single-host scan.
+    """
+    command = nmap_command(target, ports, protocols, extra_args)
+    logger.info(f"Running Nmap scan: {' '.join(command)}")
+    # stderr goes to a file: a pipe nobody reads while stdout is parsed could fill and stall nmap
+    with tempfile.TemporaryFile() as errors:
+        try:
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=errors)
+        except FileNotFoundError:
+            logger.error("Nmap is not installed. Please install it first.")
+            return
+        try:
+            yield from parse_nmap_xml(process.stdout, on_progress)
+        except ET.ParseError as e:
+            logger.error(f"Could not parse nmap output: {e}")
+        finally:
+            process.stdout.close()
+            if process.wait() != 0:
+                errors.seek(0)
+                logger.error(f"nmap exited with {process.returncode}: {errors.read().decode('utf-8', 'replace').strip()}")
+
+
+def find_process_by_port(port, snapshot=None):
+    """Finds the process name listening on a given port using the shared socket snapshot."""
+    snapshot = snapshot or get_snapshot()
+    if port not in snapshot.listeners:
+        return "None"
+    info = snapshot.process_for_port(port)
+    return info["name"] if info else "Unknown"
+
+
+def get_services_from_nmap(target="127.0.0.1", protocols=("tcp",), on_event=None):
+    """Runs an Nmap scan and returns the open ports with their service details and process.
+
+    on_event, if given, is called with each open port's record as soon as
+    nmap reports it. Per-port detail is logged at DEBUG level.
+    """
     services = []
-    for line in nmap_output.split("\n"):
-        match = re.match(r"(\d+)/tcp\s+open\s+([\w-]+)", line)
-        if match:
-            port, service = match.groups()
-            process_name = find_process_by_port(int(port))
-            services.append({
-                "port": int(port),
-                "service": service,
-                "process_name": process_name
-            })
-            logging.info(f"Detected service: {service} on port {port}, process: {process_name}")
+    for event in run_nmap_scan(target, protocols=protocols):
+        if event.state != "open":
+            continue
+        service = {
+            "port": event.port,
+            "protocol": event.protocol,
+            "service": event.service,
+            "product": event.product,
+            "version": event.version,
+            "cpe": event.cpes,
+            "scripts": event.scripts,
+            "process_name": find_process_by_port(event.port) if event.protocol == "tcp" else None,
+        }
+        logger.debug(f"Detected service: {event.service} on {event.protocol}/{event.port}, "
+                     f"product: {event.product} {event.version or ''}, process: {service['process_name']}")
+        if on_event is not None:
+            on_event(service)
+        services.append(service)
+    logger.info(f"Nmap found {len(services)} open ports on {target}")
     return services
 
-def find_process_by_port(port):
-    """Finds the process name listening on a given port using psutil."""
-    for conn in psutil.net_connections(kind='inet'):
-        if conn.laddr.port == port and conn.status == psutil.CONN_LISTEN:
-            try:
-                return psutil.Process(conn.pid).name()
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                return "Unknown"
-    return "None"
-
-def get_services_from_nmap():
-    """Runs an Nmap scan and extracts service information."""
-    nmap_output = run_nmap_scan()
-    return parse_nmap_output(nmap_output)
 
 # Example usage
 if __name__ == "__main__":
-    detected_services = get_services_from_nmap()
-    for service in detected_services:
-        print(f"Port: {service['port']}, Service: {service['service']}, Process: {service['process_name']}")
+    # -v shows every port as it is reported; the default prints only the summary
+    logging.basicConfig(
+        level=logging.DEBUG if "-v" in sys.argv else logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+    )
+    detected_services = get_services_from_nmap(on_event=lambda s: print(
+        f"Port: {s['port']}/{s['protocol']}, Service: {s['service']}, "
+        f"Version: {s['product'] or ''} {s['version'] or ''}, Process: {s['process_name']}"))
@@ -0,0 +1,331 @@
+import bisect
+import glob
+import logging
+import os
+import re
+import sqlite3
+import struct
+import subprocess
+import sys
+import time
+from collections import namedtuple
+
+Package = namedtuple("Package", ["name", "version", "arch", "manager"])
+
+# Daemons whose process name shares nothing with their package name
+PROCESS_ALIASES = {
+    "sshd": ["openssh-server", "openssh"],
+    "httpd": ["httpd", "apache2"],
+    "apache2": ["apache2"],
+    "mysqld": ["mysql-server", "mariadb-server", "mysql", "mariadb"],
+    "mariadbd": ["mariadb-server", "mariadb"],
+    "postgres": ["postgresql", "postgresql-server"],
+    "named": ["bind9", "bind"],
+    "smbd": ["samba"],
+    "master": ["postfix"],
+    "dockerd": ["docker-ce", "docker.io", "docker"],
+    "containerd": ["containerd.io", "containerd"],
+    "systemd-resolve": ["systemd-resolved", "systemd"],
+}
+
+GENTOO_VERSION = re.compile(r"^(?P<name>.+?)-(?P<version>\d.*)$")
+
+
+def parse_dpkg_list(lines):
+    """Parse `dpkg --list` output, keeping installed (ii) packages."""
+    packages = []
+    for line in lines:
+        fields = line.split(None, 4)
+        if len(fields) < 4 or fields[0] != "ii":
+            continue
+        packages.append(Package(fields[1].split(":")[0], fields[2], fields[3], "dpkg"))
+    return packages
+
+
+def parse_rpm_qa(lines):
+    """Parse `rpm -qa` NEVRA lines such as openssh-server-8.7p1-34.el9.x86_64."""
+    packages = []
+    for line in lines:
+        line = line.strip()
+        nvr, _, arch = line.rpartition(".")
+        name_version, _, release = nvr.rpartition("-")
+        name, _, version = name_version.rpartition("-")
+        if not name:
+            continue
+        packages.append(Package(name, f"{version}-{release}", arch, "rpm"))
+    return packages
+
+
+def parse_pacman_q(lines):
+    """Parse `pacman -Q` lines: name version."""
+    packages = []
+    for line in lines:
+        fields = line.split()
+        if len(fields) == 2:
+            packages.append(Package(fields[0], fields[1], None, "pacman"))
+    return packages
+
+
+def parse_equery_list(lines):
+    """Parse `equery list '*'` lines such as net-misc/openssh-9.6_p1-r3."""
+    packages = []
+    for line in lines:
+        atom = line.strip().split()[-1] if line.strip() else ""
+        match = GENTOO_VERSION.match(atom.split("/")[-1])
+        if match:
+            packages.append(Package(match.group("name"), match.group("version"), None, "portage"))
+    return packages
+
+
+def packages_from_command_output(results):
+    """Turn get_installed_software_linux() output into Package records."""
+    parsers = {"debian": parse_dpkg_list, "rhl": parse_rpm_qa, "arch": parse_pacman_q, "gentoo": parse_equery_list}
+    packages = []
+    if isinstance(results, dict):
+        for family, lines in results.items():
+            packages.extend(parsers[family](lines))
+    return packages
+
+
+def read_dpkg_status(root="/"):
+    """Stream installed packages from <root>/var/lib/dpkg/status."""
+    path = os.path.join(root, "var/lib/dpkg/status")
+    if not os.path.exists(path):
+        return
+    fields = {}
+    with open(path, "r", errors="replace") as f:
+        for line in f:
+            if line == "\n":
+                if fields.get("Status", "").endswith(" installed") and "Package" in fields:
+                    yield Package(fields["Package"], fields.get("Version"), fields.get("Architecture"), "dpkg")
+                fields = {}
+            elif line[0] not in " \t":
+                key, _, value = line.partition(":")
+                if key in ("Package", "Status", "Version", "Architecture"):
+                    fields[key] = value.strip()
+    if fields.get("Status", "").endswith(" installed") and "Package" in fields:
+        yield Package(fields["Package"], fields.get("Version"), fields.get("Architecture"), "dpkg")
+
+
+def parse_pacman_desc(path):
+    """%NAME%, %VERSION% and %ARCH% from a pacman local database desc file."""
+    values = {}
+    key = None
+    with open(path, "r", errors="replace") as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("%") and line.endswith("%"):
+                key = line
+            elif line and key in ("%NAME%", "%VERSION%", "%ARCH%") and key not in values:
+                values[key] = line
+    return values
+
+
+def read_pacman_local(root="/"):
+    """Stream installed packages from <root>/var/lib/pacman/local/*/desc."""
+    for desc in glob.glob(os.path.join(root, "var/lib/pacman/local/*/desc")):
+        values = parse_pacman_desc(desc)
+        if "%NAME%" in values:
+            yield Package(values["%NAME%"], values.get("%VERSION%"), values.get("%ARCH%"), "pacman")
+
+
+def read_portage(root="/"):
+    """Stream installed packages from the <root>/var/db/pkg/<category>/<name>-<version> tree."""
+    for entry in glob.glob(os.path.join(root, "var/db/pkg/*/*")):
+        match = GENTOO_VERSION.match(os.path.basename(entry))
+        if match and os.path.isdir(entry):
+            yield Package(match.group("name"), match.group("version"), None, "portage")
+
+
+# rpm header tags and data types
+RPMTAG_NAME, RPMTAG_VERSION, RPMTAG_RELEASE, RPMTAG_EPOCH, RPMTAG_ARCH = 1000, 1001, 1002, 1003, 1022
+RPM_INT32_TYPE, RPM_STRING_TYPE = 4, 6
+RPM_HEADER_TAGS = {RPMTAG_NAME, RPMTAG_VERSION, RPMTAG_RELEASE, RPMTAG_EPOCH, RPMTAG_ARCH}
+
+
+def parse_rpm_header(blob):
+    """Extract name/version/release/epoch/arch from an rpm header blob (as stored in rpmdb.sqlite)."""
+    index_count = struct.unpack_from("!I", blob, 0)[0]
+    data_start = 8 + index_count * 16
+    values = {}
+    for i in range(index_count):
+        tag, kind, offset, _ = struct.unpack_from("!IIiI", blob, 8 + i * 16)
+        if tag not in RPM_HEADER_TAGS:
+            continue
+        position = data_start + offset
+        if kind == RPM_STRING_TYPE:
+            end = blob.index(b"\0", position)
+            values[tag] = blob[position:end].decode("utf-8", "replace")
+        elif kind == RPM_INT32_TYPE:
+            values[tag] = struct.unpack_from("!i", blob, position)[0]
+    return values
+
+
+def read_rpmdb(root="/"):
+    """Stream installed packages from <root>/var/lib/rpm/rpmdb.sqlite (rpm >= 4.16)."""
+    path = os.path.join(root, "var/lib/rpm/rpmdb.sqlite")
+    if not os.path.exists(path):
+        return
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        for (blob,) in connection.execute("SELECT blob FROM Packages"):
+            values = parse_rpm_header(bytes(blob))
+            if RPMTAG_NAME not in values:
+                continue
+            version = f"{values.get(RPMTAG_VERSION)}-{values.get(RPMTAG_RELEASE)}"
+            if values.get(RPMTAG_EPOCH):
+                version = f"{values[RPMTAG_EPOCH]}:{version}"
+            yield Package(values[RPMTAG_NAME], version, values.get(RPMTAG_ARCH), "rpm")
+    finally:
+        connection.close()
+
+
+PACKAGE_READERS = [read_dpkg_status, read_rpmdb, read_pacman_local, read_portage]
+
+
+def read_installed_packages(root="/"):
+    """Stream installed packages from every package database found under root.
+
+    root can be a mounted disk image or container rootfs, so a host can be
+    inventoried offline without running its package managers.
+    """
+    for reader in PACKAGE_READERS:
+        try:
+            yield from reader(root)
+        except (OSError, sqlite3.Error, struct.error, ValueError) as e:
+            logging.error(f"Error reading packages with {reader.__name__}: {e}")
+
+
+def file_owners(paths, root="/"):
+    """Map binary paths to the package that installed them, in one pass over the package file lists."""
+    wanted = {}
+    for path in paths:
+        if path:
+            wanted[path] = path
+            # usr-merged systems install /usr/sbin/sshd but list it as /sbin/sshd, and vice versa
+            alt = path[4:] if path.startswith("/usr/") else "/usr" + path
+            wanted.setdefault(alt, path)
+    owners = {}
+    if not wanted:
+        return owners
+
+    for list_file in glob.glob(os.path.join(root, "var/lib/dpkg/info/*.list")):
+        name = os.path.basename(list_file)[:-len(".list")].split(":")[0]
+        try:
+            with open(list_file, "r", errors="replace") as f:
+                for line in f:
+                    original = wanted.get(line.rstrip("\n"))
+                    if original is not None:
+                        owners.setdefault(original, name)
+        except OSError:
+            continue
+
+    for files in glob.glob(os.path.join(root, "var/lib/pacman/local/*/files")):
+        # The directory is <name>-<version>-<release>, which cannot be split reliably (python-3to2-1.1.1-1)
+        try:
+            name = None
+            with open(files, "r", errors="replace") as f:
+                for line in f:
+                    original = wanted.get("/" + line.rstrip("\n"))
+                    if original is not None:
+                        name = name or parse_pacman_desc(os.path.join(os.path.dirname(files), "desc")).get("%NAME%")
+                        if name:
+                            owners.setdefault(original, name)
+        except OSError:
+            continue
+
+    missing = [p for p in set(wanted.values()) if p not in owners]
+    if missing and root == "/" and os.path.exists("/bin/rpm"):
+        # One line per file of each owning package, so every owner is matched by path rather
+        # than by position (an unowned path prints only a message, a shared one several owners)
+        result = subprocess.run(["rpm", "-qf", "--queryformat", "[%{FILENAMES}\t%{NAME}\n]", *missing],
+                                capture_output=True, text=True)
+        for line in result.stdout.splitlines():
+            path, _, name = line.partition("\t")
+            original = wanted.get(path)
+            if name and original is not None and original not in owners:
+                owners[original] = name
+    return owners
+
+
+class PackageIndex:
+    """Index installed packages by exact name and sorted name for prefix lookups."""
+
+    def __init__(self, packages):
+        self.by_name = {}
+        for package in packages:
+            self.by_name.setdefault(package.name, package)
+        self.names = sorted(self.by_name)
+        self.owners = {}
+
+    def __len__(self):
+        return len(self.by_name)
+
+    def load_owners(self, paths, root="/"):
+        self.owners.update(file_owners(paths, root))
+
+    def _prefixed(self, prefix):
+        i = bisect.bisect_left(self.names, prefix)
+        matches = []
+        while i < len(self.names) and self.names[i].startswith(prefix):
+            matches.append(self.names[i])
+            i += 1
+        return matches
+
+    def match(self, process_name, exe=None):
+        """Return (package, how) for a running process, or (None, None).
+
+        how is "path" when the binary is owned by the package, "name" for an
+        exact or alias name match, and "prefix" for the shortest package whose
+        name starts with the process name.
+        """
+        if exe and self.owners.get(exe) in self.by_name:
+            return self.by_name[self.owners[exe]], "path"
+        name = process_name.lower()
+        for candidate in [name] + PROCESS_ALIASES.get(name, []):
+            if candidate in self.by_name:
+                return self.by_name[candidate], "name"
+        prefixed = self._prefixed(name)
+        if prefixed:
+            return self.by_name[min(prefixed, key=len)], "prefix"
+        return None, None
+
+
+def match_running_packages(index, processes, root="/"):
+    """Map running processes ({pid: {"name", "exe"}}) to their packages, one record per package."""
+    index.load_owners([info.get("exe") for info in processes.values() if info], root)
+    matched = {}
+    for info in processes.values():
+        if not info:
+            continue
+        package, how = index.match(info["name"], info.get("exe"))
+        if package is None:
+            logging.info(f"No package found for process {info['name']}")
+            continue
+        entry = matched.setdefault(package.name, {
+            "name": package.name, "version": package.version, "arch": package.arch,
+            "manager": package.manager, "processes": [], "match": how,
+        })
+        if info["name"] not in entry["processes"]:
+            entry["processes"].append(info["name"])
+    return sorted(matched.values(), key=lambda p: p["name"])
+
+
+def _benchmark(root="/"):
+    """Compare the native database readers against forking the package managers."""
+    from .software_info import get_installed_software_linux
+
+    start = time.perf_counter()
+    native = list(read_installed_packages(root))
+    native_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    forked = packages_from_command_output(get_installed_software_linux())
+    forked_time = time.perf_counter() - start
+
+    print(f"native readers: {len(native)} packages in {native_time:.3f}s")
+    print(f"package manager subprocesses: {len(forked)} packages in {forked_time:.3f}s")
+
+
+if __name__ == "__main__":
+    _benchmark(sys.argv[1] if len(sys.argv) > 1 else "/")
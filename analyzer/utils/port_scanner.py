@@ -0,0 +1,266 @@
+import asyncio
+import errno
+import logging
+import resource
+import shutil
+import socket
+import sys
+import time
+from collections import namedtuple
+
+from .proc_snapshot import get_snapshot
+
+ScanResult = namedtuple("ScanResult", ["port", "protocol", "state", "service", "banner"])
+
+ALL_PORTS = range(1, 65536)
+DEFAULT_CONCURRENCY = 1000
+DEFAULT_TIMEOUT = 1.0
+BANNER_TIMEOUT = 0.5
+BANNER_BYTES = 256
+
+# Sent to services that wait for the client to speak first
+HTTP_PROBE = b"HEAD / HTTP/1.0\r\n\r\n"
+# Banner prefix -> service, checked before falling back to the port's registered name
+BANNER_SIGNATURES = [
+    (b"SSH-", "ssh"),
+    (b"HTTP/", "http"),
+    (b"220", "ftp/smtp"),
+    (b"+OK", "pop3"),
+    (b"* OK", "imap"),
+    (b"RFB ", "vnc"),
+    (b"-ERR", "redis"),
+    (b"AMQP", "amqp"),
+]
+# Payloads that make common UDP services answer instead of staying silent
+UDP_PROBES = {
+    53: b"\x12\x34\x01\x00\x00\x01\x00\x00\x00\x00\x00\x00\x00\x00\x01\x00\x01",  # DNS root A query
+    123: b"\x1b" + 47 * b"\0",  # NTP client request
+    161: bytes.fromhex("302602010104067075626c6963a01902040000000102010002010030"
+                       "0b300906052b060102010500"),  # SNMP get sysDescr, community public
+}
+
+
+def identify_service(port, protocol, banner):
+    for prefix, service in BANNER_SIGNATURES:
+        if banner.startswith(prefix):
+            if service == "ftp/smtp":
+                return "smtp" if b"SMTP" in banner.upper() else "ftp"
+            return service
+    # MySQL/MariaDB greet with a length-prefixed handshake packet, protocol version 10
+    if len(banner) > 5 and banner[4] == 10:
+        return "mysql"
+    try:
+        return socket.getservbyport(port, protocol)
+    except OSError:
+        return "unknown"
+
+
+def default_concurrency():
+    """DEFAULT_CONCURRENCY, capped to leave file descriptors for the rest of the process."""
+    soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    return max(1, min(DEFAULT_CONCURRENCY, soft - 64))
+
+
+async def _read_banner(loop, sock):
+    try:
+        return await asyncio.wait_for(loop.sock_recv(sock, BANNER_BYTES), BANNER_TIMEOUT)
+    except asyncio.TimeoutError:
+        # Silent server: ask it something every HTTP server answers
+        await loop.sock_sendall(sock, HTTP_PROBE)
+        return await asyncio.wait_for(loop.sock_recv(sock, BANNER_BYTES), BANNER_TIMEOUT)
+
+
+async def probe_tcp(host, port, timeout=DEFAULT_TIMEOUT, grab_banner=True):
+    """Connect to host:port (an IP address) and grab what the service says first."""
+    loop = asyncio.get_running_loop()
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setblocking(False)
+    try:
+        # Most ports are refused at once (always, on loopback); settle those without
+        # scheduling anything on the event loop, and only wait on connects in progress
+        error = sock.connect_ex((host, port))
+        if error in (errno.ECONNREFUSED, errno.ECONNRESET):
+            return ScanResult(port, "tcp", "closed", None, None)
+        if error not in (0, errno.EINPROGRESS, errno.EAGAIN):
+            return ScanResult(port, "tcp", "filtered", None, None)
+        if error != 0:
+            try:
+                await asyncio.wait_for(loop.sock_connect(sock, (host, port)), timeout)
+            except (ConnectionRefusedError, ConnectionResetError):
+                return ScanResult(port, "tcp", "closed", None, None)
+            except (asyncio.TimeoutError, OSError):
+                return ScanResult(port, "tcp", "filtered", None, None)
+        # On loopback a connect can land on its own ephemeral port (TCP simultaneous open)
+        if sock.getsockname() == sock.getpeername():
+            return ScanResult(port, "tcp", "closed", None, None)
+
+        banner = b""
+        if grab_banner:
+            try:
+                banner = await _read_banner(loop, sock)
+            except (asyncio.TimeoutError, OSError):
+                pass
+        text = banner.decode("utf-8", "replace").strip() or None
+        return ScanResult(port, "tcp", "open", identify_service(port, "tcp", banner), text)
+    finally:
+        sock.close()
+
+
+class _UdpProbe(asyncio.DatagramProtocol):
+    def __init__(self):
+        self.done = asyncio.get_running_loop().create_future()
+
+    def datagram_received(self, data, addr):
+        if not self.done.done():
+            self.done.set_result(data)
+
+    def error_received(self, exc):
+        # ICMP port unreachable surfaces as ConnectionRefusedError on a connected socket
+        if not self.done.done():
+            self.done.set_exception(exc)
+
+
+async def probe_udp(host, port, timeout=DEFAULT_TIMEOUT):
+    loop = asyncio.get_running_loop()
+    transport, protocol = await loop.create_datagram_endpoint(_UdpProbe, remote_addr=(host, port))
+    try:
+        # asyncio drops empty datagrams, so silent-protocol ports get a bare newline
+        transport.sendto(UDP_PROBES.get(port, b"\r\n"))
+        data = await asyncio.wait_for(protocol.done, timeout)
+        text = data[:BANNER_BYTES].decode("utf-8", "replace").strip() or None
+        return ScanResult(port, "udp", "open", identify_service(port, "udp", data), text)
+    except ConnectionRefusedError:
+        return ScanResult(port, "udp", "closed", None, None)
+    except OSError:
+        # Any other ICMP error (host or network unreachable, administratively prohibited)
+        return ScanResult(port, "udp", "filtered", None, None)
+    except asyncio.TimeoutError:
+        # No answer and no ICMP error: open but silent, or dropped by a firewall
+        return ScanResult(port, "udp", "open|filtered", None, None)
+    finally:
+        transport.close()
+
+
+async def scan(host, ports=ALL_PORTS, protocols=("tcp",), concurrency=None, timeout=DEFAULT_TIMEOUT,
+               grab_banner=True):
+    """Probe every (protocol, port), yielding ScanResults as they complete.
+
+    At most concurrency probes are in flight, so memory and file
+    descriptors stay bounded however many ports are scanned.
+    """
+    concurrency = concurrency or default_concurrency()
+    # Resolve once up front; the probes connect to the address directly
+    host = socket.getaddrinfo(host, None, type=socket.SOCK_STREAM)[0][4][0]
+    work = iter([(protocol, port) for protocol in protocols for port in ports])
+    results = asyncio.Queue()
+
+    async def worker():
+        try:
+            for protocol, port in work:
+                try:
+                    if protocol == "udp":
+                        result = await probe_udp(host, port, timeout)
+                    else:
+                        result = await probe_tcp(host, port, timeout, grab_banner)
+                except Exception as e:
+                    # One bad probe (out of file descriptors, a socket error) must not end the scan
+                    logging.debug(f"Probing {protocol}/{port} failed: {e}")
+                    result = ScanResult(port, protocol, "error", None, None)
+                await results.put(result)
+        finally:
+            # scan() counts these to know when every worker is done, however the worker ended
+            results.put_nowait(None)
+
+    workers = [asyncio.ensure_future(worker()) for _ in range(concurrency)]
+    try:
+        remaining = len(workers)
+        while remaining:
+            result = await results.get()
+            if result is None:
+                remaining -= 1
+            else:
+                yield result
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+
+def cross_check(results, snapshot):
+    """Attach the listening process to each open port and compare the scan with the socket table.
+
+    Returns (services, unreachable, unexplained): unreachable are TCP
+    listeners the scan could not connect to (bound to another address or
+    firewalled), unexplained are open TCP ports with no local listener
+    (forwarded into a container or another network namespace).
+    """
+    services = []
+    open_tcp = set()
+    for result in results:
+        info = snapshot.process_for_port(result.port) if result.protocol == "tcp" else None
+        if result.protocol == "tcp":
+            open_tcp.add(result.port)
+        services.append({
+            "port": result.port,
+            "protocol": result.protocol,
+            "state": result.state,
+            "service": result.service,
+            "banner": result.banner,
+            "process_name": info["name"] if info else None,
+        })
+    listening = set(snapshot.listening_ports())
+    return services, sorted(listening - open_tcp), sorted(open_tcp - listening)
+
+
+def scan_ports(host="127.0.0.1", ports=ALL_PORTS, protocols=("tcp",), concurrency=None,
+               timeout=DEFAULT_TIMEOUT, on_result=None):
+    """Scan host and return the open ScanResults sorted by protocol and port.
+
+    on_result, if given, is called with each open result as soon as it is found.
+    """
+    async def collect():
+        found = []
+        async for result in scan(host, ports, protocols, concurrency, timeout):
+            # UDP "open|filtered" is indistinguishable from a firewall drop, so only answers count
+            if result.state == "open":
+                found.append(result)
+                if on_result is not None:
+                    on_result(result)
+        return found
+
+    return sorted(asyncio.run(collect()), key=lambda r: (r.protocol, r.port))
+
+
+def get_services_from_scan(host="127.0.0.1", ports=ALL_PORTS, protocols=("tcp",), snapshot=None):
+    """Scan host and return its open ports with the process listening on each."""
+    def report(result):
+        logging.info(f"Open {result.protocol}/{result.port}: {result.service}")
+
+    results = scan_ports(host, ports, protocols, on_result=report)
+    services, unreachable, unexplained = cross_check(results, snapshot or get_snapshot())
+    for port in unreachable:
+        logging.info(f"Port {port} has a listener but was not reachable on {host}")
+    for port in unexplained:
+        logging.warning(f"Port {port} is open on {host} but has no local listener")
+    return services
+
+
+def _benchmark(host="127.0.0.1"):
+    """Scan every TCP port on host with the async scanner, then with the nmap -p- path if nmap is installed."""
+    start = time.perf_counter()
+    results = scan_ports(host)
+    print(f"async scanner: {len(results)} open TCP ports of {len(ALL_PORTS)} in {time.perf_counter() - start:.2f}s")
+    for result in results:
+        print(f"  {result.port}/tcp {result.service} {result.banner or ''}"[:100])
+
+    if shutil.which("nmap") is None:
+        print("nmap not installed; skipping the nmap comparison")
+        return
+    from .nmap_scanner import get_services_from_nmap
+    start = time.perf_counter()
+    services = get_services_from_nmap()
+    print(f"nmap -sV -p-: {len(services)} open TCP ports in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    _benchmark(*sys.argv[1:2])
@@ -0,0 +1,76 @@
+import logging
+import threading
+
+import psutil
+
+
+class ProcessSnapshot:
+    """One pass over the socket table, indexed by listening port and pid.
+
+    Process metadata is looked up once per pid, however many sockets the
+    process holds, so collectors can share a snapshot instead of each
+    rescanning psutil.net_connections().
+    """
+
+    def __init__(self):
+        self.listeners = {}   # port -> [pid, ...]
+        self.processes = {}   # pid -> {"name", "exe", "cmdline", "username"}
+        self.connections = 0
+        for conn in psutil.net_connections(kind='inet'):
+            self.connections += 1
+            if conn.status != psutil.CONN_LISTEN or not conn.laddr:
+                continue
+            pids = self.listeners.setdefault(conn.laddr.port, [])
+            if conn.pid not in pids:
+                pids.append(conn.pid)
+            if conn.pid is not None and conn.pid not in self.processes:
+                self.processes[conn.pid] = self._describe(conn.pid)
+
+    @staticmethod
+    def _describe(pid):
+        try:
+            proc = psutil.Process(pid)
+            with proc.oneshot():
+                info = {"name": proc.name(), "exe": None, "cmdline": [], "username": None}
+                try:
+                    info["exe"] = proc.exe()
+                    info["cmdline"] = proc.cmdline()
+                    info["username"] = proc.username()
+                except (psutil.AccessDenied, psutil.ZombieProcess):
+                    pass
+                return info
+        except (psutil.NoSuchProcess, psutil.AccessDenied) as e:
+            logging.warning(f"Error fetching process info for pid {pid}: {e}")
+            return None
+
+    def process_for_port(self, port):
+        """Metadata of the first process listening on port, or None."""
+        for pid in self.listeners.get(port, []):
+            info = self.processes.get(pid)
+            if info is not None:
+                return info
+        return None
+
+    def listening_ports(self):
+        return sorted(self.listeners)
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def get_snapshot():
+    """Return the snapshot for this run, taking it on first use (thread-safe)."""
+    global _snapshot
+    with _snapshot_lock:
+        if _snapshot is None:
+            _snapshot = ProcessSnapshot()
+            logging.info(f"Indexed {_snapshot.connections} sockets, {len(_snapshot.listeners)} listening ports")
+        return _snapshot
+
+
+def reset_snapshot():
+    """Drop the cached snapshot so the next get_snapshot() rescans."""
+    global _snapshot
+    with _snapshot_lock:
+        _snapshot = None
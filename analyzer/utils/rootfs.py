@@ -0,0 +1,225 @@
+import glob
+import hashlib
+import logging
+import os
+import struct
+import threading
+import time
+from functools import partial
+
+from .collectors import COLLECTORS, Collector
+from .files import read_file, read_text, rooted
+from .hw_info import get_hardware_info, parse_key_values
+from .log_sampler import DEFAULT_MAX_LINES, SAMPLED_LOGS, write_log_artifact
+from .package_db import PackageIndex, match_running_packages, read_installed_packages
+from .net_info import get_network_info
+from .software_info import get_running_services
+from .user_info import get_user_info
+
+# TCP socket state for LISTEN in /proc/net/tcp
+TCP_LISTEN = "0A"
+
+# ELF e_machine values of the architectures decoys are built for
+ELF_MACHINES = {0x03: "i386", 0x28: "arm", 0x3e: "x86_64", 0xb7: "aarch64", 0xf3: "riscv64"}
+
+
+def elf_architecture(path):
+    try:
+        with open(path, "rb") as f:
+            header = f.read(20)
+    except OSError:
+        return "unknown"
+    if len(header) < 20 or header[:4] != b"\x7fELF":
+        return "unknown"
+    order = "<" if header[5] == 1 else ">"
+    return ELF_MACHINES.get(struct.unpack(order + "H", header[18:20])[0], "unknown")
+
+
+class RootfsSnapshot:
+    """Listening sockets and their processes from a /proc tree under root.
+
+    Offers the ProcessSnapshot interface, so the live collectors can run
+    against a mounted snapshot or an exported /proc dump.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.listeners = {}
+        self.processes = {}
+        self.connections = 0
+        inodes = {}
+        for table in ("proc/net/tcp", "proc/net/tcp6"):
+            for line in read_text(root, table).splitlines()[1:]:
+                fields = line.split()
+                if len(fields) < 10:
+                    continue
+                self.connections += 1
+                if fields[3] == TCP_LISTEN:
+                    port = int(fields[1].rsplit(":", 1)[1], 16)
+                    inodes[fields[9]] = port
+                    self.listeners.setdefault(port, [])
+
+        # Map socket inodes to pids through the fd symlinks, if the dump kept them
+        for fd in glob.glob(rooted(root, "proc/[0-9]*/fd/*")):
+            try:
+                target = os.readlink(fd)
+            except OSError:
+                continue
+            if target.startswith("socket:[") and target[8:-1] in inodes:
+                pid = int(fd.split(os.sep)[-3])
+                pids = self.listeners[inodes[target[8:-1]]]
+                if pid not in pids:
+                    pids.append(pid)
+                if pid not in self.processes:
+                    self.processes[pid] = self._describe(pid)
+
+    def _describe(self, pid):
+        base = f"proc/{pid}"
+        try:
+            exe = os.readlink(rooted(self.root, base + "/exe"))
+        except OSError:
+            exe = None
+        return {
+            "name": read_text(self.root, base + "/comm").strip() or str(pid),
+            "exe": exe,
+            "cmdline": [a for a in read_text(self.root, base + "/cmdline").split("\0") if a],
+            "username": None,
+        }
+
+    def process_for_port(self, port):
+        for pid in self.listeners.get(port, []):
+            info = self.processes.get(pid)
+            if info is not None:
+                return info
+        return None
+
+    def listening_ports(self):
+        return sorted(self.listeners)
+
+
+class SharedSnapshot:
+    """Builds a root's RootfsSnapshot on first use and hands the same one to every later caller.
+
+    The services and software sections both need the /proc walk; this way a
+    host pays for it once, and not at all when both sections are reused.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            if self._snapshot is None:
+                self._snapshot = RootfsSnapshot(self.root)
+            return self._snapshot
+
+
+def rootfs_os_info(root):
+    release = parse_key_values(read_text(root, "/etc/os-release"))
+    kernel = read_text(root, "/proc/sys/kernel/osrelease").strip()
+    return {
+        "os_type": "Linux",
+        "os_version": f"linux {kernel}" if kernel else release.get("PRETTY_NAME", "linux"),
+        "os_architecture": elf_architecture(rooted(root, "/bin/sh")),
+        "kernel_version": read_text(root, "/proc/sys/kernel/version").strip(),
+        "detected_distro": release.get("ID_LIKE", release.get("ID", "Unknown")),
+    }
+
+
+def rootfs_hardware_info(root):
+    info = get_hardware_info(root)
+    info["cpu"]["architecture"] = elf_architecture(rooted(root, "/bin/sh"))
+    return info
+
+
+def rootfs_running_services(root, snapshot=None):
+    """snapshot, if given, is a SharedSnapshot (or any callable returning a RootfsSnapshot) for root."""
+    return get_running_services(snapshot=snapshot() if snapshot else RootfsSnapshot(root))
+
+
+def rootfs_software(root, snapshot=None):
+    index = PackageIndex(read_installed_packages(root))
+    if not len(index):
+        return []
+    return match_running_packages(index, (snapshot() if snapshot else RootfsSnapshot(root)).processes, root)
+
+
+def rootfs_environment(root):
+    return {"system_env": parse_key_values(read_text(root, "/etc/environment"))}
+
+
+def rootfs_cron_jobs(root):
+    jobs = [read_text(root, "/etc/crontab").strip()]
+    for pattern in ("/var/spool/cron/crontabs/*", "/var/spool/cron/*", "/etc/cron.d/*"):
+        for path in sorted(glob.glob(rooted(root, pattern))):
+            if os.path.isfile(path):
+                jobs.append(read_file(path).strip())
+    return {"cron_jobs": "\n".join(j for j in jobs if j)}
+
+
+def rootfs_log_files(root, artifact_dir, max_lines=DEFAULT_MAX_LINES, window=None):
+    since = time.time() - window if window else None
+    logs = {}
+    for name, path in SAMPLED_LOGS.items():
+        try:
+            logs[name] = write_log_artifact(name, rooted(root, path), artifact_dir, max_lines, since)
+        except OSError as e:
+            logging.error(f"Error sampling {rooted(root, path)}: {e}")
+    try:
+        logs["application_logs"] = sorted(os.listdir(rooted(root, "/var/log")))
+    except OSError:
+        logs["application_logs"] = []
+    return logs
+
+
+def stat_fingerprint(root, patterns):
+    """Fingerprint of the (mtime, size) of every file matching patterns under root."""
+    h = hashlib.sha256()
+    for pattern in patterns:
+        for path in sorted(glob.glob(rooted(root, pattern))):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            h.update(f"{path}\0{st.st_mtime_ns}\0{st.st_size}\0".encode())
+    return h.hexdigest()[:16]
+
+
+PACKAGE_DB_PATTERNS = ["/var/lib/dpkg/status", "/var/lib/rpm/rpmdb.sqlite", "/var/lib/pacman/local", "/var/db/pkg"]
+LISTENER_PATTERNS = ["/proc/net/tcp", "/proc/net/tcp6"]
+
+# Section -> (collector taking root, files whose change invalidates the section)
+# The collectors of SNAPSHOT_SECTIONS also take a shared snapshot of root's /proc
+ROOTFS_SECTIONS = {
+    "services": (rootfs_running_services, LISTENER_PATTERNS),
+    "network": (get_network_info, ["/proc/net/route", "/proc/net/fib_trie", "/proc/net/if_inet6",
+                                   "/etc/resolv.conf"]),
+    "users": (get_user_info, ["/etc/passwd", "/etc/group", "/etc/sudoers", "/etc/sudoers.d/*"]),
+    "software": (rootfs_software, PACKAGE_DB_PATTERNS + LISTENER_PATTERNS),
+    "hardware": (rootfs_hardware_info, ["/proc/cpuinfo", "/proc/meminfo", "/sys/block/*/size",
+                                        "/sys/class/net/*/address", "/etc/machine-id"]),
+    "os": (rootfs_os_info, ["/etc/os-release", "/proc/sys/kernel/osrelease", "/proc/sys/kernel/version"]),
+    "env_vars": (rootfs_environment, ["/etc/environment"]),
+    "cron_jobs": (rootfs_cron_jobs, ["/etc/crontab", "/etc/cron.d/*", "/var/spool/cron/*",
+                                     "/var/spool/cron/crontabs/*"]),
+    "logs": (rootfs_log_files, [path + "*" for path in SAMPLED_LOGS.values()]),
+}
+SNAPSHOT_SECTIONS = {"services", "software"}
+
+
+def rootfs_collectors(root, settings=None):
+    """Collectors for the filesystem mounted at root, honouring the enable_* settings."""
+    settings = settings or {}
+    snapshot = SharedSnapshot(root)
+    collectors = []
+    for name, (func, patterns) in ROOTFS_SECTIONS.items():
+        setting = COLLECTORS[name].setting if name in COLLECTORS else None
+        if setting is not None and not settings.get(setting, True):
+            continue
+        if name in SNAPSHOT_SECTIONS:
+            func = partial(func, snapshot=snapshot)
+        collectors.append(Collector(name, partial(func, root), setting,
+                                    fingerprint=partial(stat_fingerprint, root, patterns)))
+    return collectors
@@ -1,51 +1,56 @@
 import socket
-import psutil
 import subprocess
 import logging
 import platform
 import os
+import time
 
-# Configure logging
-os_name=platform.system()
-
-
-if not os.path.exists("./logs"):
-    os.makedirs("./logs")
+from .log_sampler import DEFAULT_ARTIFACT_DIR, DEFAULT_MAX_LINES, SAMPLED_LOGS, write_log_artifact
 
+os_name=platform.system()
 
-logging.basicConfig(
-    filename='./logs/honeypot.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
-
-def get_running_services():
+def get_running_services(snapshot=None):
     """Collect running services and open ports."""
+    # Imported here so the env_vars, cron_jobs and logs collectors do not load psutil
+    from .proc_snapshot import get_snapshot
+
     services = []
     try:
-        for conn in psutil.net_connections(kind='inet'):
-            if conn.status == psutil.CONN_LISTEN:
-                try:
-                    service_name = socket.getservbyport(conn.laddr.port)
-                    process_name = psutil.Process(conn.pid).name()
-                    services.append({
-                        "port": conn.laddr.port,
-                        "service": service_name,
-                        "pid": conn.pid,
-                        "process_name": process_name
-                    })
-                    logging.info(f"Detected service: {service_name} on port {conn.laddr.port}, process: {process_name}")
-                except (OSError, psutil.NoSuchProcess, psutil.AccessDenied) as e:
-                    logging.warning(f"Error fetching service info: {e}")
+        snapshot = snapshot or get_snapshot()
+        for port in snapshot.listening_ports():
+            try:
+                service_name = socket.getservbyport(port)
+            except OSError as e:
+                logging.warning(f"Error fetching service info: {e}")
+                continue
+            for pid in snapshot.listeners[port]:
+                info = snapshot.processes.get(pid)
+                if info is None:
+                    continue
+                services.append({
+                    "port": port,
+                    "service": service_name,
+                    "pid": pid,
+                    "process_name": info["name"]
+                })
+                logging.info(f"Detected service: {service_name} on port {port}, process: {info['name']}")
     except Exception as e:
         logging.error(f"Failed to retrieve running services: {e}")
     return services
 
 def get_filtered_software_from_running_services():
-    """Get installed software based on running services."""
-    installed_software = get_installed_software()
-    running_services = [service["process_name"] for service in get_running_services()]
-    return [s for s in installed_software if any(rs in s for rs in running_services)]
+    """Get the installed packages (name, version, arch) that own the running services."""
+    from .package_db import PackageIndex, match_running_packages, packages_from_command_output, read_installed_packages
+    from .proc_snapshot import get_snapshot
+
+    index = PackageIndex(read_installed_packages())
+    if not len(index):
+        # No package database could be read directly; fall back to the package managers
+        index = PackageIndex(packages_from_command_output(get_installed_software()))
+    if not len(index):
+        return []
+    # The snapshot holds the listening processes; reuse it rather than scanning the socket table again
+    return match_running_packages(index, get_snapshot().processes)
 
 
 def run_command(command):
@@ -61,31 +66,6 @@ def run_command(command):
         logging.error(f"Unexpected error running command '{' '.join(command)}': {e}")
     return ""
 
-def get_network_info():
-    """Collect network configuration information."""
-    if os_name=="Linux":
-        return {
-            "ip_address": run_command(["hostname", "-I"]),
-            "routing_table": run_command(["netstat", "-r"]),
-            "dns_servers": run_command(["cat", "/etc/resolv.conf"]),
-            "firewall_rules": run_command(["iptables", "-L"])
-        }
-    elif os_name=="Windows":
-        return{
-
-        }
-
-def get_user_info():
-    """Collect user and permission information."""
-    if os_name=="Linux":
-        return {
-            "users": run_command(["cat", "/etc/passwd"]),
-            "groups": run_command(["cat", "/etc/group"]),
-            "sudoers": run_command(["cat", "/etc/sudoers"])
-        }
-    elif os_name=="Windows":
-        return {}
-
 def get_environment_variables():
     """Collect relevant environment variables while skipping unnecessary ones."""
     try:
@@ -116,14 +96,22 @@ def get_cron_jobs():
     elif os_name=="Windows":
         return
 
-def get_log_files():
-    """Collect system logs."""
+def get_log_files(artifact_dir=DEFAULT_ARTIFACT_DIR, max_lines=DEFAULT_MAX_LINES, window=None):
+    """Sample the newest system log lines into artifact files referenced from the config."""
     if os_name=="Linux":
-        return {
-            "syslog": run_command(["cat", "/var/log/syslog"]),
-            "auth_log": run_command(["cat", "/var/log/auth.log"]),
-            "application_logs": run_command(["ls", "/var/log"])
-        }
+        since = time.time() - window if window else None
+        logs = {}
+        for name, path in SAMPLED_LOGS.items():
+            try:
+                logs[name] = write_log_artifact(name, path, artifact_dir, max_lines, since)
+            except OSError as e:
+                logging.error(f"Error sampling {path}: {e}")
+        try:
+            logs["application_logs"] = sorted(os.listdir("/var/log"))
+        except OSError as e:
+            logging.error(f"Error listing /var/log: {e}")
+            logs["application_logs"] = []
+        return logs
     elif os_name=="Windows":
         return{}
 
@@ -0,0 +1,86 @@
+import os
+from collections import namedtuple
+
+from .files import read_text
+
+User = namedtuple("User", ["name", "uid", "gid", "gecos", "home", "shell"])
+Group = namedtuple("Group", ["name", "gid", "members"])
+
+# Groups whose members get root through the default sudoers of common distros
+ADMIN_GROUPS = ("sudo", "wheel", "admin")
+NOLOGIN_SHELLS = ("/usr/sbin/nologin", "/sbin/nologin", "/bin/false", "/usr/bin/false")
+
+
+def parse_passwd(text):
+    users = []
+    for line in text.splitlines():
+        fields = line.split(":")
+        if len(fields) != 7 or line.startswith("#"):
+            continue
+        try:
+            users.append(User(fields[0], int(fields[2]), int(fields[3]), fields[4], fields[5], fields[6]))
+        except ValueError:
+            continue
+    return users
+
+
+def parse_group(text):
+    groups = []
+    for line in text.splitlines():
+        fields = line.split(":")
+        if len(fields) != 4 or line.startswith("#"):
+            continue
+        try:
+            groups.append(Group(fields[0], int(fields[2]), [m for m in fields[3].split(",") if m]))
+        except ValueError:
+            continue
+    return groups
+
+
+def parse_sudoers(text):
+    """Sudoers entries without comments, with backslash continuations joined.
+
+    #include/#includedir (and @include) directives are kept: they look like
+    comments but are not.
+    """
+    entries = []
+    pending = ""
+    for line in text.splitlines():
+        line = pending + line.strip()
+        pending = ""
+        if line.endswith("\\"):
+            pending = line[:-1].rstrip() + " "
+            continue
+        if not line or (line.startswith("#") and not line.startswith(("#include", "#includedir"))):
+            continue
+        entries.append(line)
+    return entries
+
+
+def read_sudoers(root="/"):
+    """Entries from sudoers and the files in sudoers.d."""
+    entries = parse_sudoers(read_text(root, "/etc/sudoers"))
+    try:
+        names = sorted(os.listdir(os.path.join(root, "etc/sudoers.d")))
+    except OSError:
+        names = []
+    for name in names:
+        # sudo itself skips files with a dot or ending in ~
+        if "." not in name and not name.endswith("~"):
+            entries.extend(parse_sudoers(read_text(root, f"/etc/sudoers.d/{name}")))
+    return entries
+
+
+def get_user_info(root="/"):
+    """Users, groups and sudo rules, parsed from passwd, group and sudoers under root."""
+    users = parse_passwd(read_text(root, "/etc/passwd"))
+    groups = parse_group(read_text(root, "/etc/group"))
+    by_gid = {g.gid: g.name for g in groups}
+    admins = sorted({m for g in groups if g.name in ADMIN_GROUPS for m in g.members}
+                    | {u.name for u in users if by_gid.get(u.gid) in ADMIN_GROUPS})
+    return {
+        "users": [dict(u._asdict(), login=u.shell not in NOLOGIN_SHELLS) for u in users],
+        "groups": [g._asdict() for g in groups],
+        "sudoers": read_sudoers(root),
+        "admins": admins,
+    }
@@ -0,0 +1,195 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import time
+
+# inotify event masks (from <sys/inotify.h>)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0)
+
+READ_CHUNK = 1 << 16
+# Most bytes one read_lines() call returns; a larger backlog is drained over several calls
+MAX_READ = 4 << 20
+# Lines examined for a timestamp at each step of the history search
+HISTORY_PROBE_LINES = 16
+
+
+class AlertFollower:
+    """Follow an append-only alert file, returning only lines written since the last read.
+
+    The follower remembers the byte offset and inode of the file so each call
+    costs time proportional to the new data, not the total file size. Log
+    rotation (new inode) and truncation (size below offset) restart reading
+    from the beginning of the new file.
+
+    With from_start, history limits the initial read to lines written in
+    the last history seconds: line_time (e.g. alert_parser.line_epoch)
+    gives a line's epoch time, and the time-ordered file is bisected for
+    the first recent line instead of being read from byte 0.
+    """
+
+    def __init__(self, path, from_start=True, use_inotify=True, history=None, line_time=None):
+        self.path = path
+        self.from_start = from_start
+        self.history = history
+        self.line_time = line_time
+        self._file = None
+        self._inode = None
+        self._offset = 0
+        self._partial = b""
+        self._inotify_fd = self._init_inotify() if use_inotify else None
+
+    def _init_inotify(self):
+        """Watch the log directory so appends and rotations wake the caller."""
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd < 0:
+                return None
+            directory = os.path.dirname(os.path.abspath(self.path))
+            mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+            if libc.inotify_add_watch(fd, directory.encode(), mask) < 0:
+                os.close(fd)
+                return None
+            return fd
+        except (OSError, AttributeError, TypeError):
+            return None
+
+    def _open(self, seek_end=False, recent_only=False):
+        self._file = open(self.path, "rb")
+        st = os.fstat(self._file.fileno())
+        self._inode = (st.st_dev, st.st_ino)
+        self._offset = st.st_size if seek_end else 0
+        if recent_only and self.history is not None and self.line_time is not None:
+            self._offset = self._history_offset(st.st_size)
+        self._file.seek(self._offset)
+        self._partial = b""
+
+    def _first_line_time(self, pos):
+        """(offset, time) of the first timestamped complete line starting at or after pos.
+
+        time is None when no such line is found within HISTORY_PROBE_LINES.
+        """
+        if pos:
+            # Skip the rest of the line pos falls in (nothing, if pos starts a line)
+            self._file.seek(pos - 1)
+            self._file.readline()
+        else:
+            self._file.seek(0)
+        start = self._file.tell()
+        for _ in range(HISTORY_PROBE_LINES):
+            line = self._file.readline()
+            if not line.endswith(b"\n"):
+                break
+            when = self.line_time(line.decode("utf-8", "replace"))
+            if when is not None:
+                return start, when
+            start = self._file.tell()
+        return start, None
+
+    def _history_offset(self, size):
+        """Offset of the first line written within the last history seconds."""
+        cutoff = time.time() - self.history
+        lo, hi = 0, size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            _, when = self._first_line_time(mid)
+            # Lines without a readable time count as recent, so nothing recent is skipped
+            if when is None or when >= cutoff:
+                hi = mid
+            else:
+                lo = mid + 1
+        return self._first_line_time(lo)[0]
+
+    def _read_available(self, limit):
+        chunks = []
+        remaining = limit
+        while remaining > 0:
+            chunk = self._file.read(min(READ_CHUNK, remaining))
+            if not chunk:
+                break
+            chunks.append(chunk)
+            self._offset += len(chunk)
+            remaining -= len(chunk)
+        return b"".join(chunks)
+
+    def _split(self, data):
+        if not data:
+            return []
+        data = self._partial + data
+        lines = data.split(b"\n")
+        # The last element is an incomplete line (or b"" after a trailing newline)
+        self._partial = lines.pop()
+        return [line.decode("utf-8", "replace") for line in lines]
+
+    def read_lines(self, max_bytes=MAX_READ):
+        """Return complete lines appended since the previous call, reading at most max_bytes.
+
+        When more is waiting, backlog() is True and the next call continues.
+        """
+        if self._file is None:
+            if not os.path.exists(self.path):
+                return []
+            self._open(seek_end=not self.from_start, recent_only=self.from_start)
+
+        data = self._read_available(max_bytes)
+        lines = self._split(data)
+        if len(data) >= max_bytes:
+            # Rotation and truncation are checked once this file has been drained
+            return lines
+        max_bytes -= len(data)
+
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            # Rotated away and not yet recreated; keep the old handle until it is
+            return lines
+
+        if (st.st_dev, st.st_ino) != self._inode:
+            # Rotated: the old handle has been drained above, switch to the new file
+            self._file.close()
+            self._open()
+            lines.extend(self._split(self._read_available(max_bytes)))
+        elif st.st_size < self._offset:
+            # Truncated in place
+            self._file.seek(0)
+            self._offset = 0
+            self._partial = b""
+            lines.extend(self._split(self._read_available(max_bytes)))
+
+        return lines
+
+    def backlog(self):
+        """Whether the current file holds data read_lines() has not returned yet."""
+        if self._file is None:
+            return False
+        try:
+            return os.fstat(self._file.fileno()).st_size > self._offset
+        except OSError:
+            return False
+
+    def wait(self, timeout):
+        """Sleep until the log directory changes or the timeout expires."""
+        if self._inotify_fd is None:
+            time.sleep(timeout)
+            return
+        readable, _, _ = select.select([self._inotify_fd], [], [], timeout)
+        if readable:
+            try:
+                while os.read(self._inotify_fd, 4096):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._inotify_fd is not None:
+            os.close(self._inotify_fd)
+            self._inotify_fd = None
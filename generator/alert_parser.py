@@ -0,0 +1,202 @@
+import ipaddress
+import json
+import re
+import struct
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime
+
+# One structured IDS alert. timestamp is as reported by the IDS: the raw text
+# for Snort fast and Suricata EVE output, epoch seconds for unified2 records.
+Alert = namedtuple("Alert", [
+    "timestamp", "gid", "sid", "rev", "msg", "classification", "priority",
+    "protocol", "src_ip", "src_port", "dst_ip", "dst_port",
+])
+
+# Snort "fast" output, e.g.
+# 01/15-12:34:56.789012  [**] [1:1000001:0] Nmap SYN Scan detected [**] [Classification: Attempted Information Leak] [Priority: 2] {TCP} 10.0.0.5:4321 -> 10.0.0.1:80
+FAST_PATTERN = re.compile(
+    r"^(?P<ts>\S+)[ \t]+\[\*\*\][ \t]+\[(?P<gid>\d+):(?P<sid>\d+):(?P<rev>\d+)\][ \t]+(?P<msg>.*?)[ \t]+\[\*\*\]"
+    r"(?:[ \t]+\[Classification:[ \t]*(?P<cls>[^\]]*)\])?"
+    r"(?:[ \t]+\[Priority:[ \t]*(?P<prio>\d+)\])?"
+    r"[ \t]+\{(?P<proto>[^}]+)\}[ \t]+(?P<src>\S+)[ \t]+->[ \t]+(?P<dst>\S+)",
+    re.MULTILINE,
+)
+
+PORTED_PROTOCOLS = {"TCP", "UDP", "SCTP"}
+IP_PROTOCOLS = {1: "ICMP", 6: "TCP", 17: "UDP", 58: "IPV6-ICMP", 132: "SCTP"}
+
+
+def split_endpoint(endpoint, has_port=True):
+    """Split 'addr:port', '[v6addr]:port' or 'v6addr:port' into (addr, port)."""
+    if endpoint.startswith("["):
+        host, _, port = endpoint[1:].partition("]:")
+        return host.rstrip("]"), int(port) if port else None
+    if not has_port:
+        return endpoint, None
+    host, sep, port = endpoint.rpartition(":")
+    if not sep or not port.isdigit():
+        return endpoint, None
+    return host, int(port)
+
+
+def parse_fast_lines(lines):
+    """Parse Snort fast alert lines in one pass; lines that do not match are skipped."""
+    alerts = []
+    append = alerts.append
+    for m in FAST_PATTERN.finditer("\n".join(lines)):
+        ts, gid, sid, rev, msg, cls, prio, proto, src, dst = m.groups()
+        has_port = proto in PORTED_PROTOCOLS
+        src_ip, src_port = split_endpoint(src, has_port)
+        dst_ip, dst_port = split_endpoint(dst, has_port)
+        append(Alert(ts, int(gid), int(sid), int(rev), msg, cls, int(prio) if prio else None,
+                     proto, src_ip, src_port, dst_ip, dst_port))
+    return alerts
+
+
+def parse_eve_line(line):
+    """Parse one Suricata EVE JSON record; returns None for non-alert events."""
+    try:
+        event = json.loads(line)
+    except ValueError:
+        return None
+    if event.get("event_type") != "alert":
+        return None
+    alert = event.get("alert", {})
+    return Alert(
+        event.get("timestamp"), alert.get("gid"), alert.get("signature_id"), alert.get("rev"),
+        alert.get("signature"), alert.get("category"), alert.get("severity"),
+        event.get("proto"), event.get("src_ip"), event.get("src_port"),
+        event.get("dest_ip"), event.get("dest_port"),
+    )
+
+
+def parse_lines(lines):
+    """Parse a batch of text alert lines, accepting Snort fast and Suricata EVE JSON mixed."""
+    fast = []
+    alerts = []
+    for line in lines:
+        if line.startswith("{"):
+            alert = parse_eve_line(line)
+            if alert is not None:
+                alerts.append(alert)
+        else:
+            fast.append(line)
+    if fast:
+        alerts.extend(parse_fast_lines(fast))
+    return alerts
+
+
+# Snort fast timestamp, MM/DD-hh:mm:ss.us, or MM/DD/YY-hh:mm:ss.us when Snort runs with -y
+FAST_TIME = re.compile(r"^(\d{2})/(\d{2})(?:/(\d{2}))?-(\d{2}):(\d{2}):(\d{2}(?:\.\d+)?)")
+EVE_TIME = re.compile(r'"timestamp"\s*:\s*"([^"]+)"')
+
+
+def _local_epoch(year, month, day, hour, minute, second):
+    whole = int(second)
+    return time.mktime((year, month, day, hour, minute, whole, 0, 0, -1)) + (second - whole)
+
+
+def alert_epoch(timestamp, now=None):
+    """Epoch seconds for an Alert timestamp, or None if it cannot be parsed.
+
+    Snort fast timestamps carry no year unless Snort runs with -y; the
+    current year is assumed, or the previous one if that would be in the future.
+    """
+    if timestamp is None:
+        return None
+    if isinstance(timestamp, (int, float)):
+        return float(timestamp)
+    now = time.time() if now is None else now
+    m = FAST_TIME.match(timestamp)
+    if m:
+        month, day, year, hour, minute, second = m.groups()
+        fields = (int(month), int(day), int(hour), int(minute), float(second))
+        try:
+            if year:
+                return _local_epoch(2000 + int(year), *fields)
+            when = _local_epoch(time.localtime(now).tm_year, *fields)
+            if when > now + 86400:
+                when = _local_epoch(time.localtime(now).tm_year - 1, *fields)
+            return when
+        except (OverflowError, ValueError):
+            return None
+    try:
+        return datetime.strptime(timestamp, "%Y-%m-%dT%H:%M:%S.%f%z").timestamp()
+    except ValueError:
+        return None
+
+
+def line_epoch(line, now=None):
+    """Epoch seconds of a raw Snort fast or Suricata EVE line, without parsing the whole alert."""
+    if line.startswith("{"):
+        m = EVE_TIME.search(line)
+        return alert_epoch(m.group(1), now) if m else None
+    fields = line.split(None, 1)
+    return alert_epoch(fields[0], now) if fields else None
+
+
+# unified2 record types and event layouts (network byte order)
+UNIFIED2_HEADER = struct.Struct("!II")
+UNIFIED2_EVENTS = {
+    7: (struct.Struct("!9I4s4sHHBBBB"), 4),                # IDS event (IPv4)
+    72: (struct.Struct("!9I16s16sHHBBBB"), 16),             # IDS event (IPv6)
+    104: (struct.Struct("!9I4s4sHHBBBBIHH"), 4),           # IDS event v2 (IPv4)
+    105: (struct.Struct("!9I16s16sHHBBBBIHH"), 16),         # IDS event v2 (IPv6)
+}
+
+
+def read_unified2(f, classifications=None, messages=None):
+    """Yield alerts from a Snort unified2 binary file object, skipping packet and extra-data records.
+
+    classifications maps classification ids to names and messages maps
+    (gid, sid) to rule messages; unified2 only stores the ids.
+    """
+    classifications = classifications or {}
+    messages = messages or {}
+    read = f.read
+    while True:
+        header = read(UNIFIED2_HEADER.size)
+        if len(header) < UNIFIED2_HEADER.size:
+            return
+        record_type, length = UNIFIED2_HEADER.unpack(header)
+        body = read(length)
+        if len(body) < length:
+            return
+        layout = UNIFIED2_EVENTS.get(record_type)
+        if layout is None:
+            continue
+        fields = layout[0].unpack_from(body)
+        (_, _, second, microsecond, sid, gid, rev, class_id, priority,
+         src, dst, sport, dport, proto) = fields[:14]
+        protocol = IP_PROTOCOLS.get(proto, str(proto))
+        has_port = protocol in PORTED_PROTOCOLS
+        yield Alert(
+            second + microsecond / 1e6, gid, sid, rev, messages.get((gid, sid)),
+            classifications.get(class_id, class_id or None), priority, protocol,
+            str(ipaddress.ip_address(src)), sport if has_port else None,
+            str(ipaddress.ip_address(dst)), dport if has_port else None,
+        )
+
+
+def _benchmark(count=2_000_000, batch=10_000):
+    """Parse a synthetic multi-million-line Snort fast alert stream and report lines/second."""
+    template = ("01/15-12:34:56.{us:06d}  [**] [1:{sid}:0] Nmap SYN Scan detected [**] "
+                "[Classification: Attempted Information Leak] [Priority: 2] {{TCP}} {src}:{sport} -> 10.0.0.1:{dport}")
+    lines = [
+        template.format(us=i % 1_000_000, sid=1000001 + i % 13,
+                        src=f"192.168.{i // 256 % 256}.{i % 256}" if i % 10 else f"2001:db8::{i % 65536:x}",
+                        sport=1024 + i % 60000, dport=i % 65536)
+        for i in range(count)
+    ]
+    start = time.perf_counter()
+    parsed = 0
+    for i in range(0, count, batch):
+        parsed += len(parse_lines(lines[i:i + batch]))
+    elapsed = time.perf_counter() - start
+    print(f"Parsed {parsed}/{count} alerts in {elapsed:.2f}s ({count / elapsed:,.0f} lines/s)")
+
+
+if __name__ == "__main__":
+    _benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000)
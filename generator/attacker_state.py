@@ -0,0 +1,137 @@
+import sys
+import time
+from collections import OrderedDict, deque
+
+# Score added per alert, by Snort/Suricata priority (1 is most severe)
+PRIORITY_WEIGHTS = {1: 10, 2: 5, 3: 2, 4: 1}
+DEFAULT_WEIGHT = 5
+
+
+class AttackerState:
+    __slots__ = ("events", "score", "sid_counts", "last_seen")
+
+    def __init__(self):
+        self.events = deque()
+        self.score = 0
+        self.sid_counts = {}
+        self.last_seen = 0
+
+
+class AttackerTracker:
+    """Score source IPs over a sliding window of alerts and report when they should be diverted.
+
+    Each alert adds a weight taken from sid_weights (by signature id) or from
+    the alert priority. Alerts older than window seconds stop counting. State
+    is kept in LRU order by last alert, so entries idle for ttl seconds, and the
+    least recently seen entries beyond max_entries, are evicted in O(1)
+    amortized time per alert.
+    """
+
+    def __init__(self, threshold=10, window=60, ttl=600, max_entries=100_000,
+                 sid_weights=None, clock=time.monotonic):
+        self.threshold = threshold
+        self.window = window
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.sid_weights = sid_weights or {}
+        self.clock = clock
+        self._states = OrderedDict()
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self._states)
+
+    def __contains__(self, ip):
+        return ip in self._states
+
+    def clock_at(self, epoch):
+        """The tracker's clock reading when wall-clock time epoch occurred (now, if epoch is None).
+
+        Lets replayed alerts be scored at the time they happened rather than as new.
+        """
+        now = self.clock()
+        if epoch is None:
+            return now
+        return now - max(0.0, time.time() - epoch)
+
+    def weight(self, alert):
+        if alert.sid in self.sid_weights:
+            return self.sid_weights[alert.sid]
+        return PRIORITY_WEIGHTS.get(alert.priority, DEFAULT_WEIGHT)
+
+    def _expire_window(self, state, now):
+        events = state.events
+        cutoff = now - self.window
+        while events and events[0][0] <= cutoff:
+            _, weight, sid = events.popleft()
+            state.score -= weight
+            remaining = state.sid_counts[sid] - 1
+            if remaining:
+                state.sid_counts[sid] = remaining
+            else:
+                del state.sid_counts[sid]
+
+    def _evict(self, now):
+        states = self._states
+        cutoff = now - self.ttl
+        while states:
+            ip, state = next(iter(states.items()))
+            if state.last_seen > cutoff and len(states) <= self.max_entries:
+                break
+            states.popitem(last=False)
+            self.evicted += 1
+
+    def observe(self, alert, now=None):
+        """Record an alert for its source IP. Returns True if the IP's score is at or above the threshold."""
+        now = self.clock() if now is None else now
+        ip = alert.src_ip
+        state = self._states.get(ip)
+        if state is None:
+            state = self._states[ip] = AttackerState()
+        else:
+            self._states.move_to_end(ip)
+
+        weight = self.weight(alert)
+        state.events.append((now, weight, alert.sid))
+        state.score += weight
+        state.sid_counts[alert.sid] = state.sid_counts.get(alert.sid, 0) + 1
+        state.last_seen = now
+        self._expire_window(state, now)
+        self._evict(now)
+        return state.score >= self.threshold
+
+    def score(self, ip, now=None):
+        state = self._states.get(ip)
+        if state is None:
+            return 0
+        self._expire_window(state, self.clock() if now is None else now)
+        return state.score
+
+    def sid_counts(self, ip):
+        state = self._states.get(ip)
+        return dict(state.sid_counts) if state else {}
+
+    def forget(self, ip):
+        self._states.pop(ip, None)
+
+
+def _benchmark(sources=1_000_000):
+    """Score one alert from each of a million unique sources with bounded state."""
+    from alert_parser import Alert
+
+    tracker = AttackerTracker(max_entries=100_000)
+    alerts = [
+        Alert(None, 1, 1000001 + i % 13, 0, None, None, 2, "TCP", f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}", 1024, "10.255.0.1", 80)
+        for i in range(sources)
+    ]
+    start = time.perf_counter()
+    diverted = 0
+    for i, alert in enumerate(alerts):
+        diverted += tracker.observe(alert, now=i / 1000)
+    elapsed = time.perf_counter() - start
+    print(f"Scored {sources} unique sources in {elapsed:.2f}s ({sources / elapsed:,.0f} alerts/s); "
+          f"{len(tracker)} tracked, {tracker.evicted} evicted, {diverted} over threshold")
+
+
+if __name__ == "__main__":
+    _benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
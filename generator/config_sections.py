@@ -0,0 +1,62 @@
+import json
+import os
+import sys
+
+# The analyzer owns the sectioned config format (analyzer/utils/config_store.py);
+# the generator reads its exports with the same module rather than a copy of it
+ANALYZER_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "analyzer")
+if ANALYZER_DIR not in sys.path:
+    sys.path.append(ANALYZER_DIR)
+
+from utils.config_store import SectionReader, is_sectioned, load_sections
+
+__all__ = ["load_sections", "section_fingerprints", "stamp_path", "read_stamp", "write_stamp", "needs_rebuild"]
+
+
+def section_fingerprints(path, sections):
+    """Fingerprints of the given sections of an export, or None if any has none (e.g. a plain JSON config)."""
+    if not is_sectioned(path):
+        return None
+    fingerprints = SectionReader(path).fingerprints
+    if any(name not in fingerprints for name in sections):
+        return None
+    return {name: fingerprints[name] for name in sections}
+
+
+def stamp_path(output_path):
+    """Where the fingerprints an output file was rendered from are kept: .<name>.fingerprints.json beside it."""
+    directory, name = os.path.split(output_path)
+    return os.path.join(directory, f".{name}.fingerprints.json")
+
+
+def read_stamp(output_path):
+    try:
+        with open(stamp_path(output_path), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_stamp(output_path, fingerprints):
+    """Record the fingerprints output_path was rendered from; None removes the record."""
+    path = stamp_path(output_path)
+    if fingerprints is None:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    with open(path + ".tmp", "w") as f:
+        json.dump(fingerprints, f, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def needs_rebuild(config_path, sections, output_path):
+    """Whether output_path, rendered from the given sections of config_path, is stale.
+
+    It is current only if it exists and the sections' fingerprints in the
+    export match those recorded when it was last rendered, so any number of
+    analyzer runs in between are accounted for.
+    """
+    if not os.path.exists(output_path):
+        return True
+    current = section_fingerprints(config_path, sections)
+    return current is None or read_stamp(output_path) != current
@@ -0,0 +1,224 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from config_sections import load_sections, needs_rebuild, section_fingerprints, write_stamp
+from vagrant_gen import VAGRANT_SECTIONS, render_vagrantfile
+
+VAGRANT = os.environ.get("VAGRANT", "vagrant")
+DEFAULT_PARALLEL = 4
+DEFAULT_UP_TIMEOUT = 1800
+# Written to a workspace after a successful `vagrant up`, holding the digest of the Vagrantfile it brought up
+PROVISIONED_MARKER = ".provisioned"
+
+
+def find_configs(config_dir):
+    """Map decoy name to its config path, for every analyzer export under config_dir.
+
+    Accepts the fleet store layout (<name>/config.jsonl or <name>/config.json)
+    as well as flat <name>.jsonl / <name>.json files.
+    """
+    configs = {}
+    for path in sorted(glob.glob(os.path.join(config_dir, "*"))):
+        name = os.path.basename(path)
+        if os.path.isdir(path):
+            for candidate in ("config.jsonl", "config.json"):
+                if os.path.exists(os.path.join(path, candidate)):
+                    configs[name] = os.path.join(path, candidate)
+                    break
+        elif name.endswith((".jsonl", ".json")) and name != "fleet.json":
+            configs.setdefault(name.rsplit(".", 1)[0], path)
+    return configs
+
+
+def render_workspace(name, config_path, workspace_dir):
+    """Write <workspace_dir>/<name>/Vagrantfile; returns True if it changed.
+
+    The Vagrantfile is re-rendered only when the export's os or hardware
+    fingerprints differ from the ones it was last rendered from, and an
+    unchanged Vagrantfile is not rewritten, so Vagrant sees no change.
+    """
+    workspace = os.path.join(workspace_dir, name)
+    vagrantfile = os.path.join(workspace, "Vagrantfile")
+    if not needs_rebuild(config_path, VAGRANT_SECTIONS, vagrantfile):
+        return False
+    fingerprints = section_fingerprints(config_path, VAGRANT_SECTIONS)
+    content = render_vagrantfile(load_sections(config_path, VAGRANT_SECTIONS))
+    try:
+        with open(vagrantfile, "r") as f:
+            if f.read() == content:
+                write_stamp(vagrantfile, fingerprints)
+                return False
+    except OSError:
+        pass
+    os.makedirs(workspace, exist_ok=True)
+    with open(vagrantfile + ".tmp", "w") as f:
+        f.write(content)
+    os.replace(vagrantfile + ".tmp", vagrantfile)
+    write_stamp(vagrantfile, fingerprints)
+    return True
+
+
+def vagrantfile_digest(workspace):
+    with open(os.path.join(workspace, "Vagrantfile"), "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def is_provisioned(workspace):
+    """Whether the workspace's current Vagrantfile was brought up successfully."""
+    try:
+        with open(os.path.join(workspace, PROVISIONED_MARKER), "r") as f:
+            return f.read().strip() == vagrantfile_digest(workspace)
+    except OSError:
+        return False
+
+
+def mark_provisioned(workspace, ok):
+    marker = os.path.join(workspace, PROVISIONED_MARKER)
+    if ok:
+        with open(marker, "w") as f:
+            f.write(vagrantfile_digest(workspace) + "\n")
+    elif os.path.exists(marker):
+        os.remove(marker)
+
+
+class Provisioner:
+    """Runs `vagrant up` in many workspaces with at most parallel running at once.
+
+    Each workspace is marked provisioned on success and unmarked on failure,
+    so the next deploy retries exactly the decoys that are not up.
+    """
+
+    def __init__(self, vagrant=VAGRANT, parallel=DEFAULT_PARALLEL, timeout=DEFAULT_UP_TIMEOUT, on_progress=None):
+        self.vagrant = vagrant
+        self.parallel = parallel
+        self.timeout = timeout
+        self.on_progress = on_progress or self.print_progress
+        self._lock = threading.Lock()
+        self.results = []
+
+    @staticmethod
+    def print_progress(result, done, total):
+        status = "up" if result["ok"] else f"FAILED ({result['error']})"
+        print(f"[INFO] [{done}/{total}] {result['name']}: {status} in {result['seconds']:.1f}s")
+
+    def _up(self, name, workspace):
+        start = time.monotonic()
+        result = {"name": name, "workspace": workspace, "ok": False, "error": None}
+        # Vagrant's output goes to the workspace, not the terminal, so parallel runs stay readable
+        with open(os.path.join(workspace, "provision.log"), "w") as log:
+            try:
+                process = subprocess.run([self.vagrant, "up"], cwd=workspace, stdout=log,
+                                         stderr=subprocess.STDOUT, timeout=self.timeout)
+                result["ok"] = process.returncode == 0
+                if not result["ok"]:
+                    result["error"] = f"exit status {process.returncode}"
+            except subprocess.TimeoutExpired:
+                result["error"] = f"timed out after {self.timeout}s"
+            except OSError as e:
+                result["error"] = str(e)
+        mark_provisioned(workspace, result["ok"])
+        result["seconds"] = time.monotonic() - start
+        return result
+
+    def run(self, workspaces):
+        """Provision {name: workspace}; returns per-decoy results in completion order."""
+        with ThreadPoolExecutor(max_workers=self.parallel) as pool:
+            futures = [pool.submit(self._up, name, path) for name, path in workspaces.items()]
+            for future in as_completed(futures):
+                result = future.result()
+                with self._lock:
+                    self.results.append(result)
+                    self.on_progress(result, len(self.results), len(futures))
+        return self.results
+
+
+def deploy(config_dir, workspace_dir, parallel=DEFAULT_PARALLEL, vagrant=VAGRANT, render_only=False,
+           only_changed=True, timeout=DEFAULT_UP_TIMEOUT):
+    """Render a workspace per config in config_dir and bring the decoys up.
+
+    With only_changed, only decoys that are not up with their current
+    Vagrantfile are provisioned: those whose Vagrantfile changed, and those
+    whose last `vagrant up` failed or never ran. A summary is written to
+    <workspace_dir>/provision.json.
+    """
+    configs = find_configs(config_dir)
+    if not configs:
+        print(f"[ERROR] No analyzer configs found in {config_dir}")
+        return []
+
+    start = time.monotonic()
+    changed = 0
+    pending = {}
+    for name, path in configs.items():
+        workspace = os.path.join(workspace_dir, name)
+        try:
+            changed += render_workspace(name, path, workspace_dir)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[ERROR] Could not render {name} from {path}: {e}")
+            continue
+        if not only_changed or not is_provisioned(workspace):
+            pending[name] = workspace
+    print(f"[INFO] Rendered {len(configs)} workspaces ({changed} changed) in {time.monotonic() - start:.2f}s; "
+          f"{len(pending)} to provision")
+    if render_only or not pending:
+        return []
+
+    start = time.monotonic()
+    results = Provisioner(vagrant, parallel, timeout).run(pending)
+    failed = [r["name"] for r in results if not r["ok"]]
+    print(f"[INFO] Provisioned {len(results) - len(failed)}/{len(results)} decoys in {time.monotonic() - start:.1f}s"
+          + (f"; failed: {', '.join(failed)}" if failed else ""))
+    with open(os.path.join(workspace_dir, "provision.json"), "w") as f:
+        json.dump({"results": sorted(results, key=lambda r: r["name"]), "failed": failed}, f, indent=2)
+    return results
+
+
+def _benchmark(decoys=12, parallel=4, boot_seconds=0.5):
+    """Provision decoys with a stub vagrant that sleeps boot_seconds, serially and in parallel."""
+    with tempfile.TemporaryDirectory() as tmp:
+        stub = os.path.join(tmp, "vagrant")
+        with open(stub, "w") as f:
+            f.write(f"#!/bin/sh\necho \"Bringing machine up in $PWD\"\nsleep {boot_seconds}\n")
+        os.chmod(stub, 0o755)
+        configs = os.path.join(tmp, "configs")
+        os.makedirs(configs)
+        for i in range(decoys):
+            with open(os.path.join(configs, f"decoy{i:02d}.json"), "w") as f:
+                json.dump({"os": {"detected_distro": ["debian", "ubuntu", "fedora"][i % 3]},
+                           "hardware": {"cpu": {"cores": 1 + i % 8}, "memory": {"total": f"{2 + i % 6}.00 GB"}}}, f)
+
+        for workers in (1, parallel):
+            workspaces = os.path.join(tmp, f"workspaces-{workers}")
+            start = time.perf_counter()
+            deploy(configs, workspaces, parallel=workers, vagrant=stub)
+            print(f"{decoys} decoys with {workers} worker(s): {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render and provision one decoy per analyzer config.")
+    parser.add_argument("config_dir", nargs="?", help="directory of analyzer exports (e.g. config_exports/fleet)")
+    parser.add_argument("--workspaces", default="decoys", help="directory for the per-decoy workspaces")
+    parser.add_argument("--parallel", type=int, default=DEFAULT_PARALLEL, help="decoys provisioned at once")
+    parser.add_argument("--vagrant", default=VAGRANT, help="vagrant binary (or a stub for testing)")
+    parser.add_argument("--timeout", type=int, default=DEFAULT_UP_TIMEOUT, help="seconds allowed per vagrant up")
+    parser.add_argument("--render-only", action="store_true", help="write the workspaces without provisioning")
+    parser.add_argument("--all", action="store_true", help="provision every decoy, not only changed or failed ones")
+    parser.add_argument("--benchmark", action="store_true", help="time serial vs parallel provisioning with a stub")
+    args = parser.parse_args()
+    if args.benchmark:
+        _benchmark(parallel=args.parallel)
+        sys.exit(0)
+    if not args.config_dir:
+        parser.error("config_dir is required (or pass --benchmark)")
+    results = deploy(args.config_dir, args.workspaces, args.parallel, args.vagrant, args.render_only,
+                     only_changed=not args.all, timeout=args.timeout)
+    sys.exit(1 if any(not r["ok"] for r in results) else 0)
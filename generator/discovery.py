@@ -0,0 +1,220 @@
+import glob
+import json
+import os
+import pwd
+import socket
+import threading
+import time
+import xml.etree.ElementTree as ET
+
+import netifaces
+
+GENERATOR_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_PATH = os.path.join(GENERATOR_DIR, ".discovery_cache.json")
+
+# Vagrant's private network is the second NIC (eth1); the first is the provider's NAT
+PRIVATE_NIC = 1
+
+
+def load_cache(path=CACHE_PATH):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(data, path=CACHE_PATH):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+def get_ip_address(interface):
+    try:
+        return netifaces.ifaddresses(interface)[netifaces.AF_INET][0]['addr']
+    except (KeyError, IndexError, ValueError):
+        return None
+
+
+def default_route_interface():
+    """Interface of the IPv4 default route, read from /proc/net/route."""
+    try:
+        with open("/proc/net/route", "r") as f:
+            next(f)
+            for line in f:
+                fields = line.split()
+                if len(fields) > 2 and fields[1] == "00000000":
+                    return fields[0]
+    except (OSError, StopIteration):
+        pass
+    return None
+
+
+def resolve_host_interface(config, cache=None):
+    """Pick the monitored interface without prompting: config, then cache, then the default route."""
+    cache = cache or {}
+    for interface in (config.get("default_interface"), cache.get("interface"), default_route_interface()):
+        if interface and interface in netifaces.interfaces():
+            ip_address = get_ip_address(interface)
+            if ip_address:
+                return interface, ip_address
+    return None, None
+
+
+def _home_dirs():
+    homes = {os.path.expanduser("~")}
+    # The switcher runs under sudo, but Vagrant and VirtualBox state belongs to the invoking user
+    if os.environ.get("SUDO_USER"):
+        try:
+            homes.add(pwd.getpwnam(os.environ["SUDO_USER"]).pw_dir)
+        except KeyError:
+            pass
+    return homes
+
+
+def vagrant_machine(vagrant_dir=GENERATOR_DIR, name="default"):
+    """Return (provider, machine id) from Vagrant's .vagrant metadata, or (None, None)."""
+    for id_path in glob.glob(os.path.join(vagrant_dir, ".vagrant", "machines", name, "*", "id")):
+        with open(id_path, "r") as f:
+            return os.path.basename(os.path.dirname(id_path)), f.read().strip()
+    return None, None
+
+
+def virtualbox_ip(machine_id, nic=PRIVATE_NIC):
+    """Resolve a VirtualBox VM's address from its .vbox file and the host-only DHCP leases."""
+    mac = None
+    for home in _home_dirs():
+        for vbox in glob.glob(os.path.join(home, "VirtualBox VMs", "*", "*.vbox")):
+            try:
+                root = ET.parse(vbox).getroot()
+            except (OSError, ET.ParseError):
+                continue
+            machine = next((e for e in root.iter() if e.tag.endswith("Machine")), None)
+            if machine is None or machine.get("uuid", "").strip("{}") != machine_id:
+                continue
+            for adapter in root.iter():
+                if adapter.tag.endswith("Adapter") and adapter.get("slot") == str(nic):
+                    raw = adapter.get("MACAddress", "").lower()
+                    mac = ":".join(raw[i:i + 2] for i in range(0, len(raw), 2))
+    if not mac:
+        return None
+    for home in _home_dirs():
+        for leases in glob.glob(os.path.join(home, ".config", "VirtualBox", "*Dhcpd.leases")):
+            try:
+                root = ET.parse(leases).getroot()
+            except (OSError, ET.ParseError):
+                continue
+            for lease in root.iter("Lease"):
+                address = lease.find("Address")
+                if lease.get("mac", "").lower() == mac and address is not None:
+                    return address.get("value")
+    return None
+
+
+def libvirt_ip(domain_uuid, nic=PRIVATE_NIC):
+    """Resolve a libvirt domain's address from its XML definition and the dnsmasq lease status files."""
+    macs = []
+    domain_dirs = ["/etc/libvirt/qemu"] + [os.path.join(h, ".config", "libvirt", "qemu") for h in _home_dirs()]
+    for directory in domain_dirs:
+        for path in glob.glob(os.path.join(directory, "*.xml")):
+            try:
+                root = ET.parse(path).getroot()
+            except (OSError, ET.ParseError):
+                continue
+            if root.findtext("uuid") != domain_uuid:
+                continue
+            macs = [m.get("address", "").lower() for m in root.findall("./devices/interface/mac")]
+    if len(macs) <= nic:
+        return None
+    for status in glob.glob("/var/lib/libvirt/dnsmasq/*.status"):
+        try:
+            with open(status, "r") as f:
+                leases = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for lease in leases:
+            if lease.get("mac-address", "").lower() == macs[nic]:
+                return lease.get("ip-address")
+    return None
+
+
+def resolve_honeypot_ip(vagrant_dir=GENERATOR_DIR):
+    """Find the Vagrant decoy's private address from provider metadata files, without SSH."""
+    provider, machine_id = vagrant_machine(vagrant_dir)
+    if provider == "virtualbox":
+        return virtualbox_ip(machine_id)
+    if provider == "libvirt":
+        return libvirt_ip(machine_id)
+    return None
+
+
+def honeypot_reachable(ip, port=22, timeout=1.0):
+    try:
+        with socket.create_connection((ip, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+class Discovery:
+    """Resolve the honeypot address and host interface quickly, refreshing them in the background.
+
+    honeypot_ip() returns the cached address straight away when there is
+    one; revalidate() checks it, re-resolves through metadata files and then
+    the slow fallback (e.g. vagrant ssh), and reports a change through
+    on_change(old, new).
+    """
+
+    def __init__(self, vagrant_dir=GENERATOR_DIR, cache_path=CACHE_PATH, fallback=None):
+        self.vagrant_dir = vagrant_dir
+        self.cache_path = cache_path
+        self.fallback = fallback
+        self.cache = load_cache(cache_path)
+
+    def _store(self, **values):
+        self.cache.update(values, updated=time.time())
+        try:
+            save_cache(self.cache, self.cache_path)
+        except OSError as e:
+            print(f"[WARNING] Could not write discovery cache {self.cache_path}: {e}")
+
+    def _resolve(self):
+        ip = resolve_honeypot_ip(self.vagrant_dir)
+        if ip is None and self.fallback is not None:
+            ip = self.fallback()
+        return ip
+
+    def honeypot_ip(self):
+        cached = self.cache.get("honeypot_ip")
+        if cached:
+            print(f"[INFO] Using cached honeypot IP {cached}; re-validating in the background.")
+            return cached
+        ip = self._resolve()
+        if ip:
+            self._store(honeypot_ip=ip)
+        return ip
+
+    def host_interface(self, config):
+        interface, ip_address = resolve_host_interface(config, self.cache)
+        if interface and (interface, ip_address) != (self.cache.get("interface"), self.cache.get("host_ip")):
+            self._store(interface=interface, host_ip=ip_address)
+        return interface, ip_address
+
+    def revalidate(self, on_change=None):
+        cached = self.cache.get("honeypot_ip")
+        fresh = resolve_honeypot_ip(self.vagrant_dir)
+        if fresh is None and cached and honeypot_reachable(cached):
+            return cached
+        if fresh is None:
+            fresh = self._resolve()
+        if fresh and fresh != cached:
+            self._store(honeypot_ip=fresh)
+            print(f"[INFO] Honeypot IP changed from {cached} to {fresh}.")
+            if on_change is not None:
+                on_change(cached, fresh)
+        return fresh or cached
+
+    def start_revalidation(self, on_change=None):
+        threading.Thread(target=self.revalidate, args=(on_change,), name="discovery", daemon=True).start()
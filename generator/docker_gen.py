@@ -0,0 +1,268 @@
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from collections import namedtuple
+
+from config_sections import load_sections
+
+# The config sections a container decoy depends on
+DOCKER_SECTIONS = ["os", "software", "services"]
+DOCKER = os.environ.get("DOCKER", "docker")
+LAYER_REPOSITORY = "decoyhive/layer"
+DECOY_REPOSITORY = "decoyhive/decoy"
+
+# Same distributions as vagrant_gen's BOX_NAME_MAP, as (base image, package manager)
+BASE_IMAGE_MAP = {
+    "arch": ("archlinux:latest", "pacman"),
+    "ubuntu": ("ubuntu:20.04", "apt"),
+    "debian": ("debian:bullseye", "apt"),
+    "centos": ("centos:7", "yum"),
+    "rhel": ("centos:7", "yum"),
+    "fedora": ("fedora:34", "dnf"),
+    "opensuse": ("opensuse/leap:15", "zypper"),
+    "suse": ("opensuse/leap:15", "zypper"),
+    "alpine": ("alpine:3", "apk"),
+    "oracle": ("oraclelinux:7", "yum"),
+}
+DEFAULT_BASE = "ubuntu"
+
+INSTALL_COMMANDS = {
+    "apt": "apt-get update && DEBIAN_FRONTEND=noninteractive apt-get install -y --no-install-recommends "
+           "{packages} && rm -rf /var/lib/apt/lists/*",
+    "yum": "yum install -y {packages} && yum clean all",
+    "dnf": "dnf install -y {packages} && dnf clean all",
+    "pacman": "pacman -Syu --noconfirm {packages} && pacman -Scc --noconfirm",
+    "zypper": "zypper --non-interactive install {packages} && zypper clean -a",
+    "apk": "apk add --no-cache {packages}",
+}
+
+# Commands that start a detected service's process inside the decoy container
+SERVICE_COMMANDS = {
+    "sshd": "mkdir -p /run/sshd && /usr/sbin/sshd",
+    "nginx": "nginx",
+    "apache2": "apache2ctl start",
+    "httpd": "httpd -k start",
+    "mysqld": "mysqld_safe &",
+    "mariadbd": "mysqld_safe &",
+    "redis-server": "redis-server --daemonize yes",
+    "vsftpd": "vsftpd &",
+    "proftpd": "proftpd",
+    "postfix": "postfix start",
+    "master": "postfix start",
+    "named": "named",
+    "dnsmasq": "dnsmasq",
+    "cupsd": "cupsd",
+}
+
+# Package names end up in a RUN line, so anything a package manager would not accept is dropped
+PACKAGE_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9.+_:@-]*$")
+# Docker's tag grammar: a word character followed by up to 127 word characters, dots and dashes
+TAG = re.compile(r"^[A-Za-z0-9_][A-Za-z0-9_.-]{0,127}$")
+
+ContainerSpec = namedtuple("ContainerSpec", ["base_image", "manager", "packages", "ports", "commands", "layer_key"])
+
+
+def detect_base(distro):
+    """Base image and package manager for an os-release ID or ID_LIKE value such as "rhel fedora"."""
+    for name in (distro or "").lower().split():
+        if name in BASE_IMAGE_MAP:
+            return BASE_IMAGE_MAP[name]
+    return BASE_IMAGE_MAP[DEFAULT_BASE]  # Fallback, as for the Vagrant box
+
+
+def layer_key(base_image, packages):
+    """Content address of a package layer: the same base and package set always give the same key."""
+    content = json.dumps([base_image, sorted(set(packages))])
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def container_spec(config):
+    """What a container decoy is built from: base image, sorted package set, exposed ports and start commands."""
+    base_image, manager = detect_base(config.get("os", {}).get("detected_distro"))
+    packages = sorted({p["name"] for p in config.get("software") or [] if PACKAGE_NAME.match(p.get("name", ""))})
+    services = config.get("services") or []
+    ports = sorted({s["port"] for s in services if isinstance(s.get("port"), int)})
+    commands = []
+    for service in services:
+        command = SERVICE_COMMANDS.get(service.get("process_name"))
+        if command and command not in commands:
+            commands.append(command)
+    return ContainerSpec(base_image, manager, packages, ports, commands, layer_key(base_image, packages))
+
+
+def layer_tag(spec):
+    return f"{LAYER_REPOSITORY}:{spec.layer_key[:16]}"
+
+
+def decoy_tag(name):
+    """DECOY_REPOSITORY image tag for a decoy; raises ValueError if name is not a valid Docker tag."""
+    if not TAG.match(name.lower()):
+        raise ValueError(f"decoy name {name!r} is not a valid Docker image tag")
+    return f"{DECOY_REPOSITORY}:{name.lower()}"
+
+
+def render_layer_dockerfile(spec):
+    """Dockerfile for the shared package layer; decoys with the same layer_key share this image."""
+    lines = [f"FROM {spec.base_image}", f'LABEL decoyhive.layer-key="{spec.layer_key}"']
+    if spec.packages:
+        lines.append("RUN " + INSTALL_COMMANDS[spec.manager].format(packages=" ".join(spec.packages)))
+    return "\n".join(lines) + "\n"
+
+
+def render_entrypoint(spec):
+    lines = ["#!/bin/sh"] + spec.commands + ["exec tail -f /dev/null"]
+    return "\n".join(lines) + "\n"
+
+
+def render_decoy_dockerfile(spec, name):
+    """Dockerfile for one decoy, layered on its package layer; only the start script and ports differ."""
+    lines = [
+        f"FROM {layer_tag(spec)}",
+        f'LABEL decoyhive.decoy="{name}"',
+        "COPY entrypoint.sh /usr/local/bin/decoy-entrypoint",
+        "RUN chmod 755 /usr/local/bin/decoy-entrypoint",
+    ]
+    if spec.ports:
+        lines.append("EXPOSE " + " ".join(str(port) for port in spec.ports))
+    lines.append('CMD ["/usr/local/bin/decoy-entrypoint"]')
+    return "\n".join(lines) + "\n"
+
+
+def render_context(config, name):
+    """Build context for a decoy image as {filename: content}, plus the spec it was rendered from."""
+    spec = container_spec(config)
+    return spec, {"Dockerfile": render_decoy_dockerfile(spec, name), "entrypoint.sh": render_entrypoint(spec)}
+
+
+def generate_dockerfile_from_file(path, name="decoy"):
+    """Render from a config file, loading only the os, software and services sections."""
+    spec, files = render_context(load_sections(path, DOCKER_SECTIONS), name)
+    return render_layer_dockerfile(spec), files
+
+
+class ImageBuilder:
+    """Build decoy images, building each distinct package layer once.
+
+    Layers are tagged by their content key, so a layer already present in
+    the local image store (from an earlier run or another decoy) is reused
+    without invoking `docker build` for it at all.
+    """
+
+    def __init__(self, docker=DOCKER, context_dir="containers"):
+        self.docker = docker
+        self.context_dir = context_dir
+        self._present = set()
+        self.layers_built = 0
+        self.layers_reused = 0
+
+    def image_exists(self, tag):
+        if tag in self._present:
+            return True
+        result = subprocess.run([self.docker, "image", "inspect", tag], stdout=subprocess.DEVNULL,
+                                stderr=subprocess.DEVNULL)
+        if result.returncode == 0:
+            self._present.add(tag)
+        return result.returncode == 0
+
+    def _build(self, tag, path, dockerfile_text=None):
+        command = [self.docker, "build", "-t", tag, "-" if dockerfile_text is not None else path]
+        subprocess.run(command, input=dockerfile_text or "", text=True, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        self._present.add(tag)
+
+    def ensure_layer(self, spec):
+        tag = layer_tag(spec)
+        if self.image_exists(tag):
+            self.layers_reused += 1
+            return tag
+        print(f"[INFO] Building layer {tag} ({spec.base_image}, {len(spec.packages)} packages)")
+        self._build(tag, None, render_layer_dockerfile(spec))
+        self.layers_built += 1
+        return tag
+
+    def write_context(self, name, files):
+        path = os.path.join(self.context_dir, name)
+        os.makedirs(path, exist_ok=True)
+        for filename, content in files.items():
+            with open(os.path.join(path, filename), "w") as f:
+                f.write(content)
+        return path
+
+    def build(self, name, config):
+        """Build and tag DECOY_REPOSITORY:<name> from a config; returns the image tag."""
+        tag = decoy_tag(name)
+        spec, files = render_context(config, name)
+        self.ensure_layer(spec)
+        self._build(tag, self.write_context(name, files))
+        return tag
+
+    def build_all(self, configs):
+        """Build an image per {name: config path}; returns {name: tag or None if the build failed}."""
+        images = {}
+        for name, path in configs.items():
+            start = time.monotonic()
+            try:
+                images[name] = self.build(name, load_sections(path, DOCKER_SECTIONS))
+                print(f"[INFO] Built {images[name]} in {time.monotonic() - start:.1f}s")
+            except subprocess.CalledProcessError as e:
+                images[name] = None
+                print(f"[ERROR] Building {name} failed: {(e.stderr or '').strip()[-500:]}")
+            except (OSError, ValueError, KeyError) as e:
+                images[name] = None
+                print(f"[ERROR] Could not build {name} from {path}: {e}")
+        print(f"[INFO] {sum(1 for t in images.values() if t)}/{len(images)} decoy images built; "
+              f"{self.layers_built} package layers built, {self.layers_reused} reused")
+        return images
+
+
+def _benchmark(decoys=30):
+    """Build decoys from a few overlapping package sets with a stub docker that sleeps per build."""
+    package_sets = [["openssh-server"], ["nginx", "openssh-server"], ["mariadb-server", "nginx", "openssh-server"]]
+    with tempfile.TemporaryDirectory() as tmp:
+        stub = os.path.join(tmp, "docker")
+        with open(stub, "w") as f:
+            # image inspect finds nothing; build takes 50ms
+            f.write('#!/bin/sh\n[ "$1" = image ] && exit 1\ncat > /dev/null\nsleep 0.05\n')
+        os.chmod(stub, 0o755)
+        configs = {}
+        for i in range(decoys):
+            path = os.path.join(tmp, f"decoy{i:02d}.json")
+            with open(path, "w") as f:
+                json.dump({
+                    "os": {"detected_distro": ["debian", "rhel fedora"][i % 2]},
+                    "software": [{"name": name} for name in reversed(package_sets[i % 3])],
+                    "services": [{"port": 22, "process_name": "sshd"}],
+                }, f)
+            configs[f"decoy{i:02d}"] = path
+
+        start = time.perf_counter()
+        builder = ImageBuilder(stub, os.path.join(tmp, "contexts"))
+        builder.build_all(configs)
+        print(f"{decoys} decoys: {builder.layers_built} layer builds instead of {decoys} "
+              f"in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] == "--build" and len(sys.argv) < 3:
+        print("Provide path to the configuration file eg. python3 docker_gen.py /path/to/config.jsonl [name]\n"
+              "or build every config in a directory: python3 docker_gen.py --build /path/to/configs\n"
+              "or demonstrate layer reuse with a stub docker: python3 docker_gen.py --benchmark", file=sys.stderr)
+        sys.exit(2)
+    if sys.argv[1] == "--benchmark":
+        _benchmark()
+        sys.exit(0)
+    if sys.argv[1] == "--build":
+        from decoy_batch import find_configs
+        images = ImageBuilder().build_all(find_configs(sys.argv[2]))
+        sys.exit(0 if all(images.values()) else 1)
+
+    name = sys.argv[2] if len(sys.argv) > 2 else "decoy"
+    layer, files = generate_dockerfile_from_file(sys.argv[1], name)
+    print(f"# {LAYER_REPOSITORY} layer\n{layer}")
+    for filename, content in files.items():
+        print(f"# {filename}\n{content}")
@@ -0,0 +1,180 @@
+import bisect
+import hashlib
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+VIRTUAL_NODES = 100
+
+
+class Backend:
+    """A decoy endpoint; check_port None disables health checks for it."""
+
+    __slots__ = ("ip", "check_port", "healthy", "draining", "active", "last_checked")
+
+    def __init__(self, ip, check_port=22):
+        self.ip = ip
+        self.check_port = check_port
+        self.healthy = True
+        self.draining = False
+        self.active = 0
+        self.last_checked = None
+
+    def available(self):
+        return self.healthy and not self.draining
+
+
+def _hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HoneypotPool:
+    """Assign attackers to a pool of decoys, sticky per attacker.
+
+    strategy "hash" places attackers on a consistent-hash ring, so adding or
+    removing a decoy only moves the attackers that hashed to it; "least_conn"
+    picks the decoy with the fewest active attackers. Decoys are health
+    checked with a TCP connect to check_port, and draining decoys keep their
+    current attackers but receive no new ones.
+    """
+
+    def __init__(self, backends, strategy="hash", check_timeout=1.0):
+        self.strategy = strategy
+        self.check_timeout = check_timeout
+        self.backends = {}
+        self.assignments = {}
+        self._ring = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        for backend in backends:
+            self.add_backend(backend)
+
+    def _rebuild_ring(self):
+        self._ring = sorted(
+            (_hash(f"{ip}#{i}"), ip) for ip in self.backends for i in range(VIRTUAL_NODES)
+        )
+
+    def add_backend(self, backend):
+        if isinstance(backend, str):
+            backend = Backend(backend)
+        with self._lock:
+            self.backends[backend.ip] = backend
+            self._rebuild_ring()
+
+    def remove_backend(self, ip):
+        """Remove a decoy; its attackers are reassigned on their next assign()."""
+        with self._lock:
+            self.backends.pop(ip, None)
+            self._rebuild_ring()
+
+    def drain(self, ip):
+        with self._lock:
+            if ip in self.backends:
+                self.backends[ip].draining = True
+
+    def undrain(self, ip):
+        with self._lock:
+            if ip in self.backends:
+                self.backends[ip].draining = False
+
+    def drained(self, ip):
+        """True once a draining decoy has no attackers left and can be taken down."""
+        backend = self.backends.get(ip)
+        return backend is not None and backend.draining and backend.active == 0
+
+    def _pick(self, attacker_ip):
+        candidates = [b for b in self.backends.values() if b.available()]
+        if not candidates:
+            return None
+        if self.strategy == "least_conn":
+            return min(candidates, key=lambda b: (b.active, b.ip))
+        # Walk the ring clockwise from the attacker's hash to the first available decoy
+        start = bisect.bisect(self._ring, (_hash(attacker_ip),))
+        for i in range(len(self._ring)):
+            backend = self.backends[self._ring[(start + i) % len(self._ring)][1]]
+            if backend.available():
+                return backend
+        return None
+
+    def assign(self, attacker_ip):
+        """Return the decoy IP for an attacker, reusing its previous decoy while that is healthy."""
+        with self._lock:
+            current = self.assignments.get(attacker_ip)
+            backend = self.backends.get(current)
+            if backend is not None and backend.healthy:
+                return backend.ip
+            if backend is not None:
+                backend.active -= 1
+            backend = self._pick(attacker_ip)
+            if backend is None:
+                self.assignments.pop(attacker_ip, None)
+                return None
+            backend.active += 1
+            self.assignments[attacker_ip] = backend.ip
+            return backend.ip
+
+    def pin(self, attacker_ip, ip):
+        """Record an existing assignment (e.g. replayed from the journal). Returns False if ip is not in the pool."""
+        with self._lock:
+            if ip not in self.backends:
+                return False
+            if self.assignments.get(attacker_ip) != ip:
+                if self.assignments.get(attacker_ip) in self.backends:
+                    self.backends[self.assignments[attacker_ip]].active -= 1
+                self.backends[ip].active += 1
+                self.assignments[attacker_ip] = ip
+            return True
+
+    def release(self, attacker_ip):
+        with self._lock:
+            ip = self.assignments.pop(attacker_ip, None)
+            if ip in self.backends:
+                self.backends[ip].active -= 1
+
+    def orphaned(self):
+        """Attackers assigned to decoys that are now unhealthy or removed."""
+        with self._lock:
+            return [a for a, ip in self.assignments.items()
+                    if ip not in self.backends or not self.backends[ip].healthy]
+
+    def _probe(self, backend):
+        if backend.check_port is None:
+            return True
+        try:
+            with socket.create_connection((backend.ip, backend.check_port), timeout=self.check_timeout):
+                return True
+        except OSError:
+            return False
+
+    def check_health(self):
+        """Probe every decoy concurrently; returns {ip: healthy}."""
+        backends = list(self.backends.values())
+        if not backends:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(32, len(backends))) as pool:
+            results = list(pool.map(self._probe, backends))
+        now = time.monotonic()
+        with self._lock:
+            for backend, healthy in zip(backends, results):
+                if backend.healthy != healthy:
+                    print(f"[INFO] Honeypot {backend.ip} is now {'up' if healthy else 'down'}.")
+                backend.healthy = healthy
+                backend.last_checked = now
+        return {b.ip: b.healthy for b in backends}
+
+    def start_health_checks(self, interval=10):
+        """Run check_health() every interval seconds on a daemon thread."""
+        def loop():
+            while not self._stop.is_set():
+                self.check_health()
+                self._stop.wait(interval)
+        threading.Thread(target=loop, name="honeypot-health", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        with self._lock:
+            return {ip: {"healthy": b.healthy, "draining": b.draining, "active": b.active}
+                    for ip, b in self.backends.items()}
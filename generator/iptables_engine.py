@@ -0,0 +1,215 @@
+import subprocess
+import sys
+import time
+
+IPTABLES = ["sudo", "iptables"]
+IPTABLES_RESTORE = ["sudo", "iptables-restore", "--noflush"]
+IPSET = ["sudo", "ipset"]
+
+
+def rule(table, chain, *args):
+    """Build a hashable rule: (table, chain, (match/target args...))."""
+    return (table, chain, tuple(args))
+
+
+def render_rule(action, r):
+    _, chain, args = r
+    return " ".join([action, chain, *args])
+
+
+class RuleEngine:
+    """Batch iptables changes into a single iptables-restore --noflush transaction.
+
+    Additions and deletions are queued with add()/delete() and written out by
+    commit(). The engine keeps an in-memory mirror of the rules it installed,
+    so duplicate adds and deletes of missing rules are dropped without
+    probing iptables with -C.
+    """
+
+    ADD = "-A"
+    DELETE = "-D"
+
+    def __init__(self, command=None, probe_command=None):
+        self.command = list(command or IPTABLES_RESTORE)
+        self.probe_command = list(probe_command or IPTABLES)
+        self.installed = set()
+        self._pending = []
+
+    def exists(self, r):
+        return r in self.installed
+
+    def probe(self, r):
+        """Ask iptables whether a rule is present (one process per rule; used at startup only)."""
+        table, chain, args = r
+        result = subprocess.run(self.probe_command + ["-t", table, "-C", chain, *args], capture_output=True)
+        return result.returncode == 0
+
+    def adopt(self, rules):
+        """Add rules installed by an earlier run to the mirror if they are still present."""
+        adopted = [r for r in rules if r not in self.installed and self.probe(r)]
+        self.installed.update(adopted)
+        return adopted
+
+    def add(self, r):
+        self._pending.append((self.ADD, r))
+
+    def delete(self, r):
+        self._pending.append((self.DELETE, r))
+
+    def pending(self):
+        return len(self._pending)
+
+    def _plan(self):
+        """Resolve queued operations against the mirror; return (ops, resulting rule set)."""
+        state = set(self.installed)
+        ops = []
+        for action, r in self._pending:
+            if action == self.ADD and r not in state:
+                state.add(r)
+                ops.append((action, r))
+            elif action == self.DELETE and r in state:
+                state.discard(r)
+                ops.append((action, r))
+        return ops, state
+
+    def render(self, ops):
+        """Render operations as iptables-restore input, grouped by table."""
+        tables = {}
+        for action, r in ops:
+            tables.setdefault(r[0], []).append(render_rule(action, r))
+        lines = []
+        for table, rules in tables.items():
+            lines.append(f"*{table}")
+            lines.extend(rules)
+            lines.append("COMMIT")
+        return "\n".join(lines) + "\n"
+
+    def _restore(self, data):
+        subprocess.run(self.command, input=data, text=True, check=True)
+
+    def commit(self):
+        """Apply all queued operations atomically. Returns the number of rules changed."""
+        ops, state = self._plan()
+        self._pending = []
+        if not ops:
+            return 0
+        self._restore(self.render(ops))
+        self._committed(ops)
+        self.installed = state
+        return len(ops)
+
+    def _committed(self, ops):
+        pass
+
+
+def set_member(set_name, ip, timeout=0):
+    """Build a hashable ipset member; a timeout of 0 never expires."""
+    return (set_name, ip, timeout)
+
+
+class IpsetEngine(RuleEngine):
+    """Batch ipset membership changes into a single ipset restore transaction.
+
+    Members take the place of rules, so redirection can be driven by a
+    constant rule group that matches a hash:ip set. Members with a timeout
+    expire in the kernel on their own and are dropped from the mirror when
+    their deadline passes.
+    """
+
+    ADD = "add"
+    DELETE = "del"
+
+    def __init__(self, command=None, clock=time.monotonic):
+        super().__init__(command or IPSET, command or IPSET)
+        self.clock = clock
+        self._expiry = {}
+
+    def probe(self, m):
+        set_name, ip, _ = m
+        result = subprocess.run(self.probe_command + ["test", set_name, ip], capture_output=True)
+        return result.returncode == 0
+
+    def create_set(self, set_name):
+        """Create a hash:ip set that supports per-member timeouts, if it does not exist."""
+        subprocess.run(self.command + ["create", set_name, "hash:ip", "timeout", "0", "-exist"], check=True)
+
+    def destroy_set(self, set_name):
+        subprocess.run(self.command + ["destroy", set_name], check=True)
+        self.installed = {m for m in self.installed if m[0] != set_name}
+
+    def _prune(self):
+        now = self.clock()
+        for m in [m for m, deadline in self._expiry.items() if deadline <= now]:
+            del self._expiry[m]
+            self.installed.discard(m)
+
+    def exists(self, m):
+        self._prune()
+        return m in self.installed
+
+    def _plan(self):
+        self._prune()
+        return super()._plan()
+
+    def render(self, ops):
+        lines = []
+        for action, (set_name, ip, timeout) in ops:
+            if action == self.ADD and timeout:
+                lines.append(f"add {set_name} {ip} timeout {timeout} -exist")
+            else:
+                lines.append(f"{action} {set_name} {ip} -exist")
+        return "\n".join(lines) + "\n"
+
+    def _restore(self, data):
+        subprocess.run(self.command + ["restore"], input=data, text=True, check=True)
+
+    def _committed(self, ops):
+        now = self.clock()
+        for action, m in ops:
+            if action == self.ADD and m[2]:
+                self._expiry[m] = now + m[2]
+            else:
+                self._expiry.pop(m, None)
+
+
+def _benchmark(attackers=200, honeypot_ip="192.168.56.10"):
+    """Compare per-rule iptables forks with batched iptables-restore using fake binaries."""
+    import os
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in ("iptables", "iptables-restore"):
+            path = os.path.join(tmp, name)
+            with open(path, "w") as f:
+                f.write("#!/bin/sh\ncat > /dev/null\nexit 0\n")
+            os.chmod(path, 0o755)
+        iptables = os.path.join(tmp, "iptables")
+        ips = [f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}" for i in range(attackers)]
+
+        start = time.perf_counter()
+        for ip in ips:
+            subprocess.run([iptables, "-A", "INPUT", "-s", ip, "-j", "DROP"], stdin=subprocess.DEVNULL, check=True)
+            subprocess.run([iptables, "-D", "INPUT", "-s", ip, "-j", "DROP"], stdin=subprocess.DEVNULL, check=True)
+            subprocess.run([iptables, "-t", "nat", "-A", "PREROUTING", "-s", ip, "-j", "DNAT", "--to-destination", honeypot_ip], stdin=subprocess.DEVNULL, check=True)
+            subprocess.run([iptables, "-A", "FORWARD", "-s", ip, "-d", honeypot_ip, "-j", "ACCEPT"], stdin=subprocess.DEVNULL, check=True)
+            subprocess.run([iptables, "-t", "nat", "-A", "POSTROUTING", "-s", honeypot_ip, "-j", "MASQUERADE"], stdin=subprocess.DEVNULL, check=True)
+        legacy = time.perf_counter() - start
+
+        engine = RuleEngine([os.path.join(tmp, "iptables-restore"), "--noflush"])
+        start = time.perf_counter()
+        for ip in ips:
+            engine.add(rule("filter", "INPUT", "-s", ip, "-j", "DROP"))
+        engine.commit()
+        for ip in ips:
+            engine.delete(rule("filter", "INPUT", "-s", ip, "-j", "DROP"))
+            engine.add(rule("nat", "PREROUTING", "-s", ip, "-j", "DNAT", "--to-destination", honeypot_ip))
+            engine.add(rule("filter", "FORWARD", "-s", ip, "-d", honeypot_ip, "-j", "ACCEPT"))
+            engine.add(rule("nat", "POSTROUTING", "-s", honeypot_ip, "-j", "MASQUERADE"))
+        engine.commit()
+        batched = time.perf_counter() - start
+
+    print(f"{attackers} attackers: per-rule iptables {legacy:.3f}s, batched iptables-restore {batched:.3f}s")
+
+
+if __name__ == "__main__":
+    _benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
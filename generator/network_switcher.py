@@ -1,26 +1,89 @@
 import subprocess
 import re
-import time
 import os
 import signal
 import sys
 import json
+import queue
+import itertools
 import netifaces
+
+from alert_follower import AlertFollower
+from alert_parser import alert_epoch, line_epoch, parse_lines
+from attacker_state import AttackerTracker
+from discovery import GENERATOR_DIR, Discovery
+from honeypot_pool import Backend, HoneypotPool
+from iptables_engine import IpsetEngine, RuleEngine, rule, set_member
+from redirect_scheduler import RETRY_DELAY, RedirectScheduler
+from rule_journal import RuleJournal
+from warm_pool import DEFAULT_POOL_SIZE, WarmPool, make_provider
+
 # Snort alert log file path
 SNORT_LOG_PATH = "./snort_config/logs/alert"
 
-# Regex pattern to extract source → destination mapping
-LOG_REGEX = r"\b(\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}):\d{1,5}\s*->\s*(\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}):\d{1,5}\b"
+# Persistent reader that only returns alerts appended since the last poll; at startup
+# it replays only the alerts still inside the scoring window (set from config.json)
+alert_follower = AlertFollower(SNORT_LOG_PATH, line_time=line_epoch)
 
 active_rules = {}
 
+# Per-source alert scores; an IP is diverted once its score reaches the threshold
+attacker_tracker = AttackerTracker()
+
+# Batches iptables changes and mirrors the rules DecoyHive has installed
+rule_engine = RuleEngine()
+
+# Drops, then redirects, attackers concurrently without blocking the poll loop
+redirect_scheduler = RedirectScheduler(rule_engine)
+
+# Seconds an attacker's traffic is dropped before it is redirected
+DROP_DELAY = 5
+
+# "rules" installs iptables rules per attacker; "set" adds attackers to ipsets
+# matched by one constant rule group, so per-packet cost does not grow with them
+REDIRECT_MODE = "rules"
+DROP_SET = "decoyhive_drop"
+# One redirect set per honeypot, named REDIRECT_SET followed by a number never reused in a run
+REDIRECT_SET = "decoyhive_redirect"
+redirect_sets = {}
+redirect_set_ids = itertools.count()
+# Seconds before a member of the redirect set expires on its own (0 = never)
+SET_TIMEOUT = 0
+
+set_engine = IpsetEngine()
+# Engine that holds per-attacker state for the active redirect mode
+redirect_engine = rule_engine
+
+# Seconds a redirection stays installed before it is removed (0 = never)
+REDIRECT_TTL = 60
+
+# Crash-safe record of installed redirections and their expiry times
+JOURNAL_PATH = "./redirections.journal"
+rule_journal = RuleJournal(JOURNAL_PATH)
+
+# Decoys attackers are balanced across; built from config.json or Vagrant at startup
+honeypot_pool = HoneypotPool([])
+# Set by SIGHUP; the main loop re-reads the honeypots and draining lists from config.json
+reload_requested = False
+
+# With "warm_pool" in config.json, each attacker gets its own decoy from a pool of
+# booted clones, reset from a clean snapshot once the attacker is done with it
+warm_pool = None
+
+# Read next to this script, so the switcher can be started from any directory
+CONFIG_PATH = os.path.join(GENERATOR_DIR, "config.json")
+
+def read_config(path=CONFIG_PATH):
+    with open(path, 'r') as f:
+        return json.load(f)
+
 # Function to fetch honeypot IP dynamically from Vagrant
 def get_honeypot_ip():
     print("[INFO] Fetching honeypot IP from Vagrant...")
 
     try:
         result = subprocess.run(["vagrant", "ssh", "-c", "ip a | grep eth1 | grep inet"],
-                                capture_output=True, text=True)
+                                capture_output=True, text=True, cwd=GENERATOR_DIR)
         print("[DEBUG] Vagrant SSH Output:\n", result.stdout)
 
         match = re.search(r"inet (\d+\.\d+\.\d+\.\d+)/", result.stdout)
@@ -35,82 +98,266 @@ def get_honeypot_ip():
         print(f"[ERROR] Exception while fetching honeypot IP: {e}")
         return None
 
+# Cached honeypot/interface lookup; vagrant ssh is only the last resort
+discovery = Discovery(fallback=get_honeypot_ip)
 
-
-
-def get_network_interfaces():
-    return netifaces.interfaces()
-
-# Function to get IP address of the chosen interface
-def get_ip_address(interface):
-    try:
-        return netifaces.ifaddresses(interface)[netifaces.AF_INET][0]['addr']
-    except (KeyError, IndexError):
-        return None
+# Honeypot address changes found by background re-validation, applied by the main loop
+honeypot_changes = queue.SimpleQueue()
 
 def get_host_ip():
-    # Ask the user for the network interface
-    available_interfaces = get_network_interfaces()
-    print("Available network interfaces:", ", ".join(available_interfaces))
-
-    # read default_interface from config.json
-    with open('./config.json', 'r') as f:
-        config = json.load(f)
-    interface = config.get('default_interface', None)
-
-
+    # Pick the network interface from config.json, the discovery cache or the default route
+    config = read_config()
+    interface, ip_address = discovery.host_interface(config)
     if interface is None:
-        while True:
-            interface = input("Enter the network interface to monitor (e.g., eth0, wlan0, lo): ").strip()
-            if interface in available_interfaces:
-                ip_address = get_ip_address(interface)
-                if ip_address:
-                    break
-                else:
-                    print(f"Error: No IPv4 address found for {interface}. Try another one.")
-            else:
-                print("Invalid interface. Please select from the available ones.")
-    else:
-        ip_address  = get_ip_address(interface)
+        print("[ERROR] No usable network interface found. Available:", ", ".join(netifaces.interfaces()))
+        print("[ERROR] Set default_interface in config.json.")
+        return None
 
     print(f"Monitoring interface: {interface} (IP: {ip_address})")
     return ip_address
 
-def redirect_traffic(attacker_ip, honeypot_ip, cooldown=60):
-    print(f"[INFO] Temporarily dropping traffic from {attacker_ip}...")
-
-    try:
-        # Drop all packets from the attacker temporarily
-        drop_command = ["sudo", "iptables", "-A", "INPUT", "-s", attacker_ip, "-j", "DROP"]
-        subprocess.run(drop_command, check=True)
-
-        print(f"[INFO] Traffic from {attacker_ip} is temporarily dropped. Waiting before redirection...")
-        time.sleep(5)  # Wait before redirection
-
-        # Remove the drop rule before redirection
-        subprocess.run(["sudo", "iptables", "-D", "INPUT", "-s", attacker_ip, "-j", "DROP"], check=True)
-
+def redirect_rules(attacker_ip, honeypot_ip):
+    """Rules (or set members) that divert an attacker to the honeypot."""
+    if REDIRECT_MODE == "set":
+        return [set_member(redirect_sets[honeypot_ip], attacker_ip, SET_TIMEOUT)]
+    return [
         # Redirect all incoming traffic from the attacker to the honeypot
-        subprocess.run(["sudo", "iptables", "-t", "nat", "-A", "PREROUTING", "-s", attacker_ip, "-j", "DNAT", "--to-destination", honeypot_ip], check=True)
-
+        rule("nat", "PREROUTING", "-s", attacker_ip, "-j", "DNAT", "--to-destination", honeypot_ip),
         # Allow forwarding from attacker to honeypot
-        subprocess.run(["sudo", "iptables", "-A", "FORWARD", "-s", attacker_ip, "-d", honeypot_ip, "-j", "ACCEPT"], check=True)
-
-        # Enable SNAT (Source NAT) so honeypot's responses go back correctly
-        subprocess.run(["sudo", "iptables", "-t", "nat", "-A", "POSTROUTING", "-s", honeypot_ip, "-j", "MASQUERADE"], check=True)
-
-
-        print(f"[SUCCESS] Traffic from {attacker_ip} is now redirected to the honeypot.")
-
-        # Store rules for cleanup
-        #active_rules[attacker_ip] = [nat_command, forward_command]
+        rule("filter", "FORWARD", "-s", attacker_ip, "-d", honeypot_ip, "-j", "ACCEPT"),
+        masquerade_rule(honeypot_ip),
+    ]
+
+def masquerade_rule(honeypot_ip):
+    # Enable SNAT (Source NAT) so honeypot's responses go back correctly
+    return rule("nat", "POSTROUTING", "-s", honeypot_ip, "-j", "MASQUERADE")
+
+def drop_rule(attacker_ip):
+    if REDIRECT_MODE == "set":
+        return set_member(DROP_SET, attacker_ip)
+    return rule("filter", "INPUT", "-s", attacker_ip, "-j", "DROP")
+
+def redirect_set_rules(honeypot_ip):
+    """Constant rules that divert members of a honeypot's redirect set to it."""
+    set_name = redirect_sets[honeypot_ip]
+    return [
+        rule("nat", "PREROUTING", "-m", "set", "--match-set", set_name, "src", "-j", "DNAT", "--to-destination", honeypot_ip),
+        rule("filter", "FORWARD", "-m", "set", "--match-set", set_name, "src", "-d", honeypot_ip, "-j", "ACCEPT"),
+        masquerade_rule(honeypot_ip),
+    ]
+
+def install_rules(rules):
+    # The rules may still be installed if a previous run did not exit cleanly
+    rule_engine.adopt(rules)
+    for r in rules:
+        rule_engine.add(r)
+    rule_engine.commit()
+
+def add_set_honeypot(honeypot_ip):
+    """Create a redirect set for a honeypot and install the rule group that matches it."""
+    redirect_sets[honeypot_ip] = f"{REDIRECT_SET}{next(redirect_set_ids)}"
+    set_engine.create_set(redirect_sets[honeypot_ip])
+    install_rules(redirect_set_rules(honeypot_ip))
+
+def enable_set_mode(honeypot_ips):
+    """Create the attacker sets and install the rule groups that match them, once at startup."""
+    global REDIRECT_MODE, redirect_engine
+    set_engine.create_set(DROP_SET)
+    install_rules([rule("filter", "INPUT", "-m", "set", "--match-set", DROP_SET, "src", "-j", "DROP")])
+    for honeypot_ip in honeypot_ips:
+        add_set_honeypot(honeypot_ip)
+    REDIRECT_MODE = "set"
+    redirect_engine = set_engine
+    redirect_scheduler.engine = set_engine
+    print(f"[INFO] Set-based redirection enabled ({DROP_SET}, {', '.join(redirect_sets.values())}).")
+
+def replace_honeypot(old_ip, new_ip):
+    """Swap the Vagrant decoy in the pool after discovery finds it at a new address."""
+    if REDIRECT_MODE == "set" and new_ip not in redirect_sets:
+        try:
+            add_set_honeypot(new_ip)
+        except subprocess.CalledProcessError as e:
+            print(f"[ERROR] Could not set up redirection to {new_ip}: {e}")
+            return
+    honeypot_pool.add_backend(Backend(new_ip, check_port=None))
+    if old_ip and old_ip != new_ip:
+        # Its attackers become orphaned and are re-diverted on their next alert
+        honeypot_pool.remove_backend(old_ip)
+
+def retire_honeypot(ip):
+    """Take a decoy with no attackers left out of the pool, with its MASQUERADE rule or redirect set."""
+    honeypot_pool.remove_backend(ip)
+    try:
+        if REDIRECT_MODE == "set":
+            if ip not in redirect_sets:
+                return
+            for r in redirect_set_rules(ip):
+                rule_engine.delete(r)
+            rule_engine.commit()
+            set_engine.destroy_set(redirect_sets.pop(ip))
+        else:
+            rule_engine.delete(masquerade_rule(ip))
+            rule_engine.commit()
+    except subprocess.CalledProcessError as e:
+        print(f"[ERROR] Failed to remove the rules for honeypot {ip}: {e}")
+
+def honeypot_backends(honeypots):
+    return [Backend(h) if isinstance(h, str) else Backend(h["ip"], h.get("check_port", 22))
+            for h in honeypots]
+
+def apply_honeypot_config(config):
+    """Add newly listed honeypots not marked draining, and drain those in "draining" or no longer listed.
+
+    Draining honeypots keep their attackers but get no new ones, and are
+    taken out of the pool by retire_drained() once their attackers are gone.
+    """
+    listed = honeypot_backends(config.get("honeypots") or [])
+    requested = set(config.get("draining") or [])
+    for backend in listed:
+        if backend.ip in honeypot_pool.backends or backend.ip in requested:
+            continue
+        if REDIRECT_MODE == "set":
+            try:
+                add_set_honeypot(backend.ip)
+            except subprocess.CalledProcessError as e:
+                print(f"[ERROR] Could not set up redirection to {backend.ip}: {e}")
+                continue
+        honeypot_pool.add_backend(backend)
+    draining = requested | (set(honeypot_pool.backends) - {b.ip for b in listed})
+    for ip, backend in list(honeypot_pool.backends.items()):
+        if ip in draining and not backend.draining:
+            print(f"[INFO] Draining honeypot {ip} ({backend.active} attacker(s) left).")
+            honeypot_pool.drain(ip)
+        elif ip not in draining and backend.draining:
+            print(f"[INFO] Honeypot {ip} is no longer draining.")
+            honeypot_pool.undrain(ip)
+
+def retire_drained():
+    for ip in [ip for ip in list(honeypot_pool.backends) if honeypot_pool.drained(ip)]:
+        retire_honeypot(ip)
+        print(f"[INFO] Honeypot {ip} drained and removed from the pool.")
+
+def request_reload(signal_received=None, frame=None):
+    global reload_requested
+    reload_requested = True
+
+def divert_target(attacker_ip):
+    """Decoy for a newly detected attacker: a fresh warm decoy if the pool is enabled, else a shared one."""
+    if warm_pool is None:
+        return honeypot_pool.assign(attacker_ip)
+    decoy_ip = warm_pool.acquire(attacker_ip)
+    if decoy_ip is None:
+        return None
+    if decoy_ip not in honeypot_pool.backends:
+        replace_honeypot(None, decoy_ip)
+    if not honeypot_pool.pin(attacker_ip, decoy_ip):
+        # Redirection to it could not be set up; reset it and let the attacker retry on its next alert
+        warm_pool.release(attacker_ip)
+        return None
+    stats = warm_pool.stats()
+    print(f"[INFO] Warm decoy {decoy_ip} handed to {attacker_ip}; "
+          f"{stats['states']['ready']}/{stats['size']} still warm, {stats['occupancy']:.0%} in use.")
+    return decoy_ip
+
+def release_decoy(attacker_ip):
+    """Free an attacker's decoy; a warm decoy leaves the pool, with its rules, and is reset from its snapshot."""
+    honeypot_pool.release(attacker_ip)
+    if warm_pool is not None:
+        decoy_ip = warm_pool.release(attacker_ip)
+        if decoy_ip is not None:
+            retire_honeypot(decoy_ip)
+
+def redirectable(attacker_ip):
+    if ":" in attacker_ip:
+        # The honeypot is reached over IPv4 and the rules are programmed with iptables
+        print(f"[WARNING] Not redirecting IPv6 attacker {attacker_ip}; only IPv4 redirection is supported.")
+        return False
+    return True
 
-        # Schedule removal after cooldown
-        #time.sleep(cooldown)
-        #remove_redirection(attacker_ip)
+def redirect_traffic(attacker_ip, honeypot_ip, cooldown=None, drop_delay=DROP_DELAY):
+    """Queue an attacker for redirection; the drop is applied on the next scheduler tick.
 
+    Returns whether the attacker was queued.
+    """
+    if not redirectable(attacker_ip):
+        return False
+    ttl = REDIRECT_TTL if cooldown is None else cooldown
+    if not redirect_scheduler.submit(attacker_ip, [drop_rule(attacker_ip)],
+                                     redirect_rules(attacker_ip, honeypot_ip), delay=drop_delay, ttl=ttl):
+        return False
+    rule_journal.record_drop(attacker_ip, [drop_rule(attacker_ip)])
+    print(f"[INFO] Temporarily dropping traffic from {attacker_ip} for {drop_delay}s before redirection...")
+    return True
+
+def process_redirections():
+    """Apply pending drops and due redirections in one iptables-restore transaction."""
+    for entry in redirect_scheduler.tick():
+        # Store rules for cleanup; MASQUERADE is shared between attackers
+        active_rules[entry.ip] = entry.redirect[:2]
+        target = honeypot_pool.assignments.get(entry.ip)
+        rule_journal.record_add(entry.ip, active_rules[entry.ip], entry.ttl, target)
+        print(f"[SUCCESS] Traffic from {entry.ip} is now redirected to honeypot {target} "
+              f"({entry.latency:.2f}s after detection, {redirect_scheduler.queue_depth()} still queued).")
+
+def expire_redirections():
+    """Remove every redirection whose TTL has run out in a single transaction."""
+    expired = rule_journal.due()
+    if not expired:
+        return
+    for ip in expired:
+        for r in active_rules.get(ip, []):
+            redirect_engine.delete(r)
+    try:
+        redirect_engine.commit()
     except subprocess.CalledProcessError as e:
-        print(f"[ERROR] iptables command failed: {e}")
+        # Like a failed redirection commit, try again shortly rather than leaking the rules
+        print(f"[ERROR] Failed to remove expired redirections, retrying in {RETRY_DELAY}s: {e}")
+        rule_journal.retry(expired, RETRY_DELAY)
+        return
+    for ip in expired:
+        active_rules.pop(ip, None)
+        attacker_tracker.forget(ip)
+        release_decoy(ip)
+    rule_journal.record_remove(expired)
+    print(f"[INFO] Expired {len(expired)} redirection(s).")
+
+def restore_redirections():
+    """Replay the journal so redirections from a previous run are tracked, not leaked."""
+    entries = rule_journal.replay()
+    drops = rule_journal.drops
+    if not entries and not drops:
+        return
+    if REDIRECT_MODE == "rules":
+        rule_engine.adopt([masquerade_rule(ip) for ip in honeypot_pool.backends])
+    stale = []
+    gone = set()
+    for ip, (rules, expires, target) in entries.items():
+        adopted = redirect_engine.adopt(rules)
+        if len(adopted) == len(rules) and honeypot_pool.pin(ip, target):
+            active_rules[ip] = list(rules)
+        else:
+            # Partially or fully gone (e.g. after a reboot), or the honeypot left the pool
+            for r in adopted:
+                redirect_engine.delete(r)
+            stale.append(ip)
+            if target and target not in honeypot_pool.backends:
+                gone.add(target)
+    # Decoys no longer in the pool, such as the previous run's warm decoys, leave a MASQUERADE rule behind
+    if REDIRECT_MODE == "rules":
+        for r in rule_engine.adopt([masquerade_rule(target) for target in gone]):
+            rule_engine.delete(r)
+    # Drops of attackers that were never redirected; they are diverted again on their next alerts
+    for ip, rules in drops.items():
+        for r in redirect_engine.adopt(rules):
+            redirect_engine.delete(r)
+    try:
+        redirect_engine.commit()
+    except subprocess.CalledProcessError as e:
+        print(f"[ERROR] Failed to remove stale redirections: {e}")
+        return
+    rule_journal.record_remove(stale + list(drops))
+    print(f"[INFO] Restored {len(active_rules)} redirection(s) from {JOURNAL_PATH}, discarded {len(stale)}"
+          f" and {len(drops)} pending drop(s).")
 
 # Function to parse Snort alerts and extract attacker IPs
 def extract_attacker_ips(host_ip):
@@ -120,24 +367,20 @@ def extract_attacker_ips(host_ip):
         print(f"[WARNING] Snort log file {SNORT_LOG_PATH} not found!")
         return attacker_ips
 
-    print(f"[INFO] Reading Snort alerts from {SNORT_LOG_PATH}...")
-
     try:
-        with open(SNORT_LOG_PATH, "r") as f:
-            lines = f.readlines()
-
-        for line in lines:
-            match = re.search(LOG_REGEX, line)
-            if match:
-                source_ip = match.group(1)
-                dest_ip = match.group(2)
-
-                # Ignore traffic from host machine
-                if source_ip == host_ip:
-                    print(f"[INFO] Ignoring traffic from host machine: {source_ip}")
-                    continue
-
-                print(f"[ALERT] Attacker Detected: {source_ip} → {dest_ip}")
+        # Snort fast and Suricata EVE lines, IPv4 and IPv6
+        for alert in parse_lines(alert_follower.read_lines()):
+            source_ip = alert.src_ip
+            dest_ip = alert.dst_ip
+
+            # Ignore traffic from host machine
+            if source_ip == host_ip:
+                print(f"[INFO] Ignoring traffic from host machine: {source_ip}")
+                continue
+
+            # Replayed alerts are scored at the time they were raised, not as new ones
+            if attacker_tracker.observe(alert, now=attacker_tracker.clock_at(alert_epoch(alert.timestamp))):
+                print(f"[ALERT] Attacker Detected: {source_ip} → {dest_ip} ({alert.msg}, sid {alert.sid})")
                 attacker_ips.add(source_ip)
 
         return attacker_ips
@@ -147,39 +390,25 @@ def extract_attacker_ips(host_ip):
         return set()
 
 
-def rule_exists(rule):
-    """Check if an iptables rule exists before deleting."""
-    try:
-        result = subprocess.run(["sudo", "iptables", "-C"] + rule, capture_output=True, text=True)
-        return result.returncode == 0  # If return code is 0, rule exists
-    except subprocess.CalledProcessError:
-        return False
+def rule_exists(r):
+    """Check if DecoyHive has installed a rule, without querying iptables."""
+    return redirect_engine.exists(r)
 
 def remove_redirection(attacker_ip):
     if attacker_ip in active_rules:
         print(f"[INFO] Removing redirection for {attacker_ip}...")
 
         try:
-            delete_nat_command = ["-t", "nat", "-D", "PREROUTING", "-s", attacker_ip, "-j", "DNAT", "--to-destination", honeypot_ip]
-            delete_forward_command = ["-D", "FORWARD", "-s", attacker_ip, "-d", honeypot_ip, "-j", "ACCEPT"]
-            delete_drop_command = ["-D", "INPUT", "-s", attacker_ip, "-j", "DROP"]
-            # Check and remove NAT rule
-            if rule_exists(delete_nat_command):
-                subprocess.run(["sudo", "iptables"] + delete_nat_command, check=True)
-                print(f"[INFO] NAT rule for {attacker_ip} removed.")
-
-            # Check and remove FORWARD rule
-            if rule_exists(delete_forward_command):
-                subprocess.run(["sudo", "iptables"] + delete_forward_command, check=True)
-                print(f"[INFO] FORWARD rule for {attacker_ip} removed.")
-
-            # Check and remove DROP rule
-            if rule_exists(delete_drop_command):
-                subprocess.run(["sudo", "iptables"] + delete_drop_command, check=True)
-                print(f"[INFO] DROP rule for {attacker_ip} removed.")
+            for r in active_rules[attacker_ip] + [drop_rule(attacker_ip)]:
+                if rule_exists(r):
+                    redirect_engine.delete(r)
+            removed = redirect_engine.commit()
+            print(f"[INFO] {removed} rule(s) for {attacker_ip} removed.")
 
             # Remove from active tracking
             del active_rules[attacker_ip]
+            rule_journal.record_remove([attacker_ip])
+            release_decoy(attacker_ip)
 
         except subprocess.CalledProcessError as e:
             print(f"[ERROR] Failed to remove iptables rule for {attacker_ip}: {e}")
@@ -190,19 +419,29 @@ def cleanup_and_exit(signal_received=None, frame=None):
 
     for attacker_ip in list(active_rules.keys()):
         remove_redirection(attacker_ip)
-
-    # Flush all NAT, forwarding, and input rules
+    # Remove anything else DecoyHive installed (pending drops, MASQUERADE, the set rule group);
+    # rules owned by other software are left alone
     try:
-        subprocess.run(["sudo", "iptables", "-F", "FORWARD"], check=True)
-        subprocess.run(["sudo", "iptables", "-t", "nat", "-F", "PREROUTING"], check=True)
-        subprocess.run(["sudo", "iptables", "-t", "nat", "-F", "POSTROUTING"], check=True)
-        subprocess.run(["sudo", "iptables", "-F", "INPUT"], check=True)  # Clear any lingering DROP rules
-
-        print("[INFO] Flushed all forwarding, NAT, and input rules.")
-
+        for r in list(redirect_engine.installed):
+            redirect_engine.delete(r)
+        redirect_engine.commit()
+        if redirect_engine is not rule_engine:
+            for r in list(rule_engine.installed):
+                rule_engine.delete(r)
+            rule_engine.commit()
+        if REDIRECT_MODE == "set":
+            set_engine.destroy_set(DROP_SET)
+            for set_name in redirect_sets.values():
+                set_engine.destroy_set(set_name)
+        rule_journal.record_remove(list(rule_journal.drops))
+        print("[INFO] Removed all DecoyHive rules.")
     except subprocess.CalledProcessError as e:
-        print(f"[ERROR] Failed to flush iptables rules: {e}")
+        print(f"[ERROR] Failed to remove DecoyHive rules: {e}")
 
+    alert_follower.close()
+    honeypot_pool.stop()
+    if warm_pool is not None:
+        warm_pool.stop()
     print("[INFO] Cleanup complete. Exiting.")
     sys.exit(0)
 
@@ -214,27 +453,98 @@ if __name__ == "__main__":
     # Handle graceful exit
     signal.signal(signal.SIGINT, cleanup_and_exit)
     signal.signal(signal.SIGTERM, cleanup_and_exit)
-
-    honeypot_ip = get_honeypot_ip()
-    if not honeypot_ip:
-        print("[FATAL] Could not retrieve honeypot IP. Exiting.")
-        exit(1)
+    signal.signal(signal.SIGHUP, request_reload)
+
+    config = read_config()
+    honeypots = config.get("honeypots")
+    warm_settings = config.get("warm_pool")
+    if warm_settings:
+        # Decoys join the pool as they are handed out to attackers
+        warm_pool = WarmPool(make_provider(warm_settings), warm_settings.get("size", DEFAULT_POOL_SIZE))
+        warm_pool.start()
+        backends = []
+    elif honeypots:
+        backends = honeypot_backends(honeypots)
+    else:
+        honeypot_ip = discovery.honeypot_ip()
+        if not honeypot_ip:
+            print("[FATAL] Could not retrieve honeypot IP. Exiting.")
+            exit(1)
+        # A single Vagrant decoy is always used; there is nothing to fail over to
+        backends = [Backend(honeypot_ip, check_port=None)]
+    for backend in backends:
+        honeypot_pool.add_backend(backend)
+    if honeypots and warm_pool is None:
+        apply_honeypot_config(config)
+    honeypot_pool.strategy = config.get("balance_strategy", honeypot_pool.strategy)
+    honeypot_pool.start_health_checks(config.get("health_interval", 10))
 
     host_ip = get_host_ip()
     if not host_ip:
         print("[FATAL] Could not determine host machine IP. Exiting.")
         exit(1)
 
-    print(f"[INFO] Honeypot IP is {honeypot_ip}. Monitoring Snort alerts...")
+    attacker_tracker.threshold = config.get("divert_score", attacker_tracker.threshold)
+    attacker_tracker.window = config.get("score_window", attacker_tracker.window)
+    attacker_tracker.ttl = config.get("state_ttl", attacker_tracker.ttl)
+    # JSON object keys are strings; alerts carry integer signature ids
+    attacker_tracker.sid_weights = {int(sid): weight for sid, weight in config.get("sid_weights", {}).items()}
+    alert_follower.history = attacker_tracker.window
+    REDIRECT_TTL = config.get("redirect_ttl", REDIRECT_TTL)
+    SET_TIMEOUT = config.get("set_timeout", SET_TIMEOUT)
+    if config.get("redirect_mode", REDIRECT_MODE) == "set":
+        try:
+            enable_set_mode(list(honeypot_pool.backends))
+        except subprocess.CalledProcessError as e:
+            print(f"[FATAL] Could not set up ipset redirection: {e}")
+            exit(1)
+
+    restore_redirections()
+
+    if not honeypots and warm_pool is None:
+        discovery.start_revalidation(lambda old, new: honeypot_changes.put((old, new)))
 
-    seen_ips = set()
+    if warm_pool is not None:
+        print(f"[INFO] Booting {len(warm_pool.slots)} warm decoys in the background.")
+    print(f"[INFO] Honeypots: {', '.join(honeypot_pool.backends)}. Monitoring Snort alerts from {SNORT_LOG_PATH}...")
 
     while True:
         attacker_ips = extract_attacker_ips(host_ip)
 
         for ip in attacker_ips:
-            if ip not in seen_ips:
-                seen_ips.add(ip)
-                redirect_traffic(ip, honeypot_ip)
-
-        time.sleep(1)  # Check logs every 10 seconds
+            if ip not in active_rules and not redirect_scheduler.is_pending(ip) and redirectable(ip):
+                target = divert_target(ip)
+                if target is None:
+                    print(f"[WARNING] No healthy honeypot available for {ip}.")
+                    continue
+                if not redirect_traffic(ip, target):
+                    # Do not hold a decoy for an attacker that is not being redirected to it
+                    release_decoy(ip)
+
+        # Attackers on a honeypot that went down are re-diverted on their next alert
+        for ip in honeypot_pool.orphaned():
+            remove_redirection(ip)
+
+        while not honeypot_changes.empty():
+            replace_honeypot(*honeypot_changes.get())
+
+        if reload_requested:
+            reload_requested = False
+            if honeypots and warm_pool is None:
+                try:
+                    apply_honeypot_config(read_config())
+                except (OSError, ValueError) as e:
+                    print(f"[ERROR] Could not reload {CONFIG_PATH}: {e}")
+        retire_drained()
+
+        process_redirections()
+        expire_redirections()
+
+        # Wake on new alerts, when the next redirection or expiry is due, or every second;
+        # an alert backlog left by a bounded read is read on the next pass without waiting
+        timeout = 1
+        for next_due in (redirect_scheduler.next_due(), rule_journal.next_due()):
+            if next_due is not None:
+                timeout = min(timeout, next_due)
+        if not alert_follower.backlog():
+            alert_follower.wait(timeout)
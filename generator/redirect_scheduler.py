@@ -0,0 +1,94 @@
+import heapq
+import itertools
+import subprocess
+import time
+
+RETRY_DELAY = 1
+
+
+class PendingRedirect:
+    __slots__ = ("ip", "drop", "redirect", "detected_at", "due", "ttl", "latency")
+
+    def __init__(self, ip, drop, redirect, detected_at, due, ttl=None):
+        self.ip = ip
+        self.ttl = ttl
+        self.drop = drop
+        self.redirect = redirect
+        self.detected_at = detected_at
+        self.due = due
+        # Seconds from detection until the redirection went live, set by tick()
+        self.latency = None
+
+
+class RedirectScheduler:
+    """Move attackers through drop -> wait -> DNAT without blocking the caller.
+
+    submit() queues the drop rules and schedules the redirection; tick()
+    commits every queued change in one RuleEngine transaction and returns
+    the attackers whose redirection went live. Any number of attackers can
+    be waiting at once, each with its own drop delay.
+    """
+
+    def __init__(self, engine, clock=time.monotonic):
+        self.engine = engine
+        self.clock = clock
+        self._heap = []
+        self._pending = {}
+        self._seq = itertools.count()
+
+    def submit(self, ip, drop, redirect, delay=5, detected_at=None, ttl=None):
+        """Drop traffic from ip now and redirect it after delay seconds; ttl is carried for the caller."""
+        if ip in self._pending:
+            return False
+        now = self.clock()
+        entry = PendingRedirect(ip, list(drop), list(redirect), detected_at or now, now + delay, ttl)
+        for r in entry.drop:
+            self.engine.add(r)
+        self._pending[ip] = entry
+        heapq.heappush(self._heap, (entry.due, next(self._seq), ip))
+        return True
+
+    def queue_depth(self):
+        return len(self._pending)
+
+    def is_pending(self, ip):
+        return ip in self._pending
+
+    def next_due(self):
+        """Seconds until the next redirection is due, or None if nothing is queued."""
+        if not self._heap:
+            return None
+        return max(0, self._heap[0][0] - self.clock())
+
+    def tick(self):
+        """Commit queued drops and every redirection that is due. Returns the redirected entries."""
+        now = self.clock()
+        ready = []
+        while self._heap and self._heap[0][0] <= now:
+            _, _, ip = heapq.heappop(self._heap)
+            ready.append(self._pending[ip])
+
+        for entry in ready:
+            for r in entry.drop:
+                self.engine.delete(r)
+            for r in entry.redirect:
+                self.engine.add(r)
+
+        try:
+            self.engine.commit()
+        except subprocess.CalledProcessError as e:
+            print(f"[ERROR] iptables-restore failed, retrying {len(ready)} redirection(s): {e}")
+            # Re-queue the drops that the failed transaction would have installed
+            for entry in self._pending.values():
+                for r in entry.drop:
+                    self.engine.add(r)
+            for entry in ready:
+                entry.due = now + RETRY_DELAY
+                heapq.heappush(self._heap, (entry.due, next(self._seq), entry.ip))
+            return []
+
+        done = self.clock()
+        for entry in ready:
+            del self._pending[entry.ip]
+            entry.latency = done - entry.detected_at
+        return ready
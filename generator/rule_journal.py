@@ -0,0 +1,143 @@
+import heapq
+import json
+import os
+import time
+
+# Rewrite the journal once it holds this many more records than live entries
+COMPACT_SLACK = 1000
+
+
+def _to_tuple(value):
+    if isinstance(value, list):
+        return tuple(_to_tuple(v) for v in value)
+    return value
+
+
+class RuleJournal:
+    """Append-only, fsynced journal of installed redirections with their expiry times.
+
+    Each line is a JSON record: {"op": "add", "ip", "rules", "expires", "target"}
+    or {"op": "del", "ip"}, where target is the honeypot the IP was sent to.
+    Expiry times are wall-clock epoch seconds so they survive restarts. replay() rebuilds the live entries after a crash, and
+    due() returns the IPs whose TTL has run out, oldest first.
+
+    {"op": "drop", "ip", "rules"} records the drop installed while an IP
+    waits to be redirected; it is superseded by the IP's "add" or "del", and
+    any still left after a crash are in drops for the caller to clean up.
+    """
+
+    def __init__(self, path, clock=time.time):
+        self.path = path
+        self.clock = clock
+        self.entries = {}
+        # Pending drops, {ip: rules}
+        self.drops = {}
+        self._heap = []
+        self._records = 0
+
+    def replay(self):
+        """Load live entries from the journal, then compact it. Returns {ip: (rules, expires, target)}.
+
+        Drops that never became redirections are loaded into self.drops.
+        """
+        self.entries = {}
+        self.drops = {}
+        self._records = 0
+        if os.path.exists(self.path):
+            with open(self.path, "r") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A torn final write from a crash; everything before it is intact
+                        continue
+                    if record.get("op") == "add":
+                        self.drops.pop(record["ip"], None)
+                        self.entries[record["ip"]] = (_to_tuple(record["rules"]), record.get("expires"),
+                                                      record.get("target"))
+                    elif record.get("op") == "drop":
+                        self.drops[record["ip"]] = _to_tuple(record["rules"])
+                    elif record.get("op") == "del":
+                        self.drops.pop(record["ip"], None)
+                        self.entries.pop(record["ip"], None)
+        self._heap = [(entry[1], ip, entry[1]) for ip, entry in self.entries.items() if entry[1] is not None]
+        heapq.heapify(self._heap)
+        self.compact()
+        return dict(self.entries)
+
+    def _append(self, records):
+        if not records:
+            return
+        with open(self.path, "a") as f:
+            f.write("".join(json.dumps(r) + "\n" for r in records))
+            f.flush()
+            os.fsync(f.fileno())
+        self._records += len(records)
+        if self._records > len(self.entries) + len(self.drops) + COMPACT_SLACK:
+            self.compact()
+
+    def record_drop(self, ip, rules):
+        """Record a drop before it is installed, so a crash before the redirection cannot leak it."""
+        self.drops[ip] = tuple(rules)
+        self._append([{"op": "drop", "ip": ip, "rules": list(rules)}])
+
+    def record_add(self, ip, rules, ttl=None, target=None):
+        # The redirection replaces the IP's drop in the same transaction
+        self.drops.pop(ip, None)
+        expires = self.clock() + ttl if ttl else None
+        self.entries[ip] = (tuple(rules), expires, target)
+        if expires is not None:
+            heapq.heappush(self._heap, (expires, ip, expires))
+        self._append([{"op": "add", "ip": ip, "rules": list(rules), "expires": expires, "target": target}])
+
+    def record_remove(self, ips):
+        removed = [ip for ip in ips
+                   if (self.entries.pop(ip, None) is not None) | (self.drops.pop(ip, None) is not None)]
+        self._append([{"op": "del", "ip": ip} for ip in removed])
+
+    def due(self, now=None):
+        """Pop and return IPs whose redirection has expired (still recorded until record_remove).
+
+        An IP that could not be removed must be handed back with retry(), or due() will not return it again.
+        """
+        now = self.clock() if now is None else now
+        expired = []
+        while self._heap and self._heap[0][0] <= now:
+            _, ip, expires = heapq.heappop(self._heap)
+            entry = self.entries.get(ip)
+            # Skip stale heap items for IPs removed or re-added with a new expiry
+            if entry is not None and entry[1] == expires:
+                expired.append(ip)
+        return expired
+
+    def retry(self, ips, delay):
+        """Return IPs from due() whose removal failed, to be due again after delay seconds."""
+        when = self.clock() + delay
+        for ip in ips:
+            entry = self.entries.get(ip)
+            if entry is not None and entry[1] is not None:
+                heapq.heappush(self._heap, (when, ip, entry[1]))
+
+    def next_due(self):
+        """Seconds until the next expiry, or None."""
+        while self._heap:
+            when, ip, expires = self._heap[0]
+            entry = self.entries.get(ip)
+            if entry is not None and entry[1] == expires:
+                return max(0, when - self.clock())
+            heapq.heappop(self._heap)
+        return None
+
+    def compact(self):
+        """Atomically rewrite the journal with only the live entries."""
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            for ip, (rules, expires, target) in self.entries.items():
+                f.write(json.dumps({"op": "add", "ip": ip, "rules": rules, "expires": expires,
+                                    "target": target}) + "\n")
+            for ip, rules in self.drops.items():
+                f.write(json.dumps({"op": "drop", "ip": ip, "rules": rules}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self._records = len(self.entries) + len(self.drops)
@@ -1,41 +1,16 @@
 import os
 import subprocess
-import netifaces
 import json
-# Function to get available network interfaces
-def get_network_interfaces():
-    return netifaces.interfaces()
-
-# Function to get IP address of the chosen interface
-def get_ip_address(interface):
-    try:
-        return netifaces.ifaddresses(interface)[netifaces.AF_INET][0]['addr']
-    except (KeyError, IndexError):
-        return None
-
-# Ask the user for the network interface
-available_interfaces = get_network_interfaces()
-print("Available network interfaces:", ", ".join(available_interfaces))
-
-# read default_interface from config.json
-with open('./config.json', 'r') as f:
-    config = json.load(f)
-interface = config.get('default_interface', None)
 
+from discovery import GENERATOR_DIR, Discovery
 
+# Pick the interface from config.json, the discovery cache or the default route, without prompting
+with open(os.path.join(GENERATOR_DIR, 'config.json'), 'r') as f:
+    config = json.load(f)
+interface, ip_address = Discovery().host_interface(config)
 if interface is None:
-    while True:
-        interface = input("Enter the network interface to monitor (e.g., eth0, wlan0, lo): ").strip()
-        if interface in available_interfaces:
-            ip_address = get_ip_address(interface)
-            if ip_address:
-                break
-            else:
-                print(f"Error: No IPv4 address found for {interface}. Try another one.")
-        else:
-            print("Invalid interface. Please select from the available ones.")
-else:
-    ip_address  = get_ip_address(interface)
+    print("No usable network interface found. Set default_interface in config.json.")
+    raise SystemExit(1)
 print(f"Monitoring interface: {interface} (IP: {ip_address})")
 
 # Configuration directory
@@ -1,68 +1,96 @@
 import json
 import sys
+from string import Template
+
+from config_sections import load_sections, needs_rebuild, section_fingerprints, write_stamp
+
+# The only config sections the Vagrantfile depends on
+VAGRANT_SECTIONS = ["os", "hardware"]
+
 
 def generate_vagrantfile(config_json):
+    return render_vagrantfile(json.loads(config_json))
 
-    box_name_map = {
-        "arch": "archlinux/archlinux",
-        "ubuntu": "ubuntu/focal64",
-        "debian": "debian/bullseye64",
-        "centos": "centos/7",
-        "fedora": "fedora/34-cloud-base",
-        "opensuse": "opensuse/openSUSE-42.3-x86_64",
-        "alpine": "alpine/alpine64",
-        "gentoo": "gentoo/gentoo",
-        "oracle": "oraclelinux/7",
-        "freebsd": "freebsd/FreeBSD-12.1-RELEASE",
-        "windows 10":"gusztavvargadr/windows-10",
-        "windows 11":"gusztavvargadr/windows-11"
-    }
 
-    config = json.loads(config_json)
-    os_type = config["os"].get("detected_distro", "generic").lower()
-    box_name = box_name_map.get(os_type, "generic/ubuntu")  # Fallback
+def generate_vagrantfile_from_file(path):
+    """Render from a config file, loading only the os and hardware sections."""
+    return render_vagrantfile(load_sections(path, VAGRANT_SECTIONS))
 
-    spoofed_cpu_cores = config["hardware"]["cpu"].get("cores", 4)
-    spoofed_memory_gb = float(config["hardware"]["memory"].get("total", "4.0 GB").split()[0])
 
-    actual_cpu_cores = min(2, spoofed_cpu_cores)
-    actual_memory_mb = min(1024, int(spoofed_memory_gb * 1024))  # Max 1GB allocation
+BOX_NAME_MAP = {
+    "arch": "archlinux/archlinux",
+    "ubuntu": "ubuntu/focal64",
+    "debian": "debian/bullseye64",
+    "centos": "centos/7",
+    "fedora": "fedora/34-cloud-base",
+    "opensuse": "opensuse/openSUSE-42.3-x86_64",
+    "alpine": "alpine/alpine64",
+    "gentoo": "gentoo/gentoo",
+    "oracle": "oraclelinux/7",
+    "freebsd": "freebsd/FreeBSD-12.1-RELEASE",
+    "windows 10":"gusztavvargadr/windows-10",
+    "windows 11":"gusztavvargadr/windows-11"
+}
 
-    vagrantfile_content = f'''
+# Parsed once at import; rendering a decoy is a single substitution
+VAGRANTFILE_TEMPLATE = Template('''
 Vagrant.configure("2") do |config|
-    config.vm.box = "{box_name}"
+    config.vm.box = "$box_name"
 
     # Shared network with the host
     config.vm.network "private_network", type: "dhcp"
     config.vm.provider "virtualbox" do |vb|
-        vb.customize ["modifyvm", :id, "--cpus", {actual_cpu_cores}]
-        vb.customize ["modifyvm", :id, "--memory", {actual_memory_mb}]
+        vb.customize ["modifyvm", :id, "--cpus", $actual_cpu_cores]
+        vb.customize ["modifyvm", :id, "--memory", $actual_memory_mb]
     end
 
     config.vm.provider "libvirt" do |lv|
-        lv.cpus = {actual_cpu_cores}
-        lv.memory = {actual_memory_mb}
-        lv.networks << {{ network_name: "default", type: "bridge" }}
+        lv.cpus = $actual_cpu_cores
+        lv.memory = $actual_memory_mb
+        lv.networks << { network_name: "default", type: "bridge" }
         lv.qemuargs = [
             ["-smbios", "type=1,manufacturer=SpoofedVendor,product=SpoofedModel,serial=12345678"],
-            ["-smbios", "type=17,size={int(spoofed_memory_gb * 1024)}"],
-            ["-smbios", "type=4,core={spoofed_cpu_cores}"]
+            ["-smbios", "type=17,size=$spoofed_memory_mb"],
+            ["-smbios", "type=4,core=$spoofed_cpu_cores"]
         ]
     end
 end
-'''
+''')
+
+
+def vagrant_parameters(config):
+    """Template values for a config's os and hardware sections."""
+    os_type = config["os"].get("detected_distro", "generic").lower()
+    box_name = BOX_NAME_MAP.get(os_type, "generic/ubuntu")  # Fallback
+
+    # The analyzer reports None (older versions 0) when it could not read the value; use the defaults then
+    spoofed_cpu_cores = config["hardware"]["cpu"].get("cores") or 4
+    spoofed_memory_gb = float((config["hardware"]["memory"].get("total") or "4.0 GB").split()[0]) or 4.0
+
+    return {
+        "box_name": box_name,
+        "actual_cpu_cores": min(2, spoofed_cpu_cores),
+        "actual_memory_mb": min(1024, int(spoofed_memory_gb * 1024)),  # Max 1GB allocation
+        "spoofed_cpu_cores": spoofed_cpu_cores,
+        "spoofed_memory_mb": int(spoofed_memory_gb * 1024),
+    }
+
 
-    return vagrantfile_content
+def render_vagrantfile(config):
+    return VAGRANTFILE_TEMPLATE.substitute(vagrant_parameters(config))
 
 if __name__ == "__main__":
-    print("""Provide path to the configuration file eg. python3 vagrant_gen.py /path/to/config.json""")
+    print("""Provide path to the configuration file eg. python3 vagrant_gen.py /path/to/config.jsonl""")
     config_file_path = sys.argv[1]
     print(config_file_path)
 
-    with open(config_file_path, 'r') as file:
-        config_json = file.read()
+    # Keep the existing Vagrantfile unless the os or hardware sections changed since it was rendered
+    if not needs_rebuild(config_file_path, VAGRANT_SECTIONS, "Vagrantfile"):
+        print("os and hardware sections unchanged; keeping the existing Vagrantfile.")
+        sys.exit(0)
 
-    contents = generate_vagrantfile(config_json)
+    contents = generate_vagrantfile_from_file(config_file_path)
     with open("Vagrantfile", "w") as file:
         file.write(contents)
+    write_stamp("Vagrantfile", section_fingerprints(config_file_path, VAGRANT_SECTIONS))
     print("Vagrantfile generated successfully!")
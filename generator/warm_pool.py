@@ -0,0 +1,320 @@
+import collections
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+GENERATOR_DIR = os.path.dirname(os.path.abspath(__file__))
+SNAPSHOT_NAME = "decoyhive-clean"
+DEFAULT_POOL_SIZE = 3
+RESTORE_ATTEMPTS = 3
+RETRY_DELAY = 5
+# A failed decoy is booted again after RETRY_DELAY * 2**failures seconds, up to MAX_RETRY_DELAY
+MAX_RETRY_DELAY = 600
+# Attackers that missed are forgotten after this long, whether or not they came back
+WAITING_TTL = 600
+PROVIDER_TIMEOUT = 900
+
+
+class VagrantProvider:
+    """Decoys as Vagrant machines cloned from one Vagrantfile, reset with `vagrant snapshot restore`.
+
+    Each slot gets its own workspace under pool_dir. The first boot saves
+    SNAPSHOT_NAME; later boots and every reset restore it, which takes
+    seconds instead of the minutes a destroy/up cycle does.
+    """
+
+    def __init__(self, vagrantfile=os.path.join(GENERATOR_DIR, "Vagrantfile"),
+                 pool_dir=os.path.join(GENERATOR_DIR, "warm_pool"), vagrant="vagrant", timeout=PROVIDER_TIMEOUT):
+        self.vagrantfile = vagrantfile
+        self.pool_dir = pool_dir
+        self.vagrant = vagrant
+        self.timeout = timeout
+
+    def _run(self, name, *args):
+        return subprocess.run([self.vagrant, *args], cwd=os.path.join(self.pool_dir, name), check=True,
+                              capture_output=True, text=True, timeout=self.timeout).stdout
+
+    def _address(self, name):
+        output = self._run(name, "ssh", "-c", "ip -4 -o addr show eth1")
+        match = re.search(r"inet (\d+\.\d+\.\d+\.\d+)/", output)
+        if not match:
+            raise RuntimeError(f"no eth1 address in the output of vagrant ssh for {name}")
+        return match.group(1)
+
+    def create(self, name):
+        workspace = os.path.join(self.pool_dir, name)
+        os.makedirs(workspace, exist_ok=True)
+        shutil.copyfile(self.vagrantfile, os.path.join(workspace, "Vagrantfile"))
+        self._run(name, "up")
+        if SNAPSHOT_NAME in self._run(name, "snapshot", "list").split():
+            # Left over from a previous run and possibly used by an attacker
+            return self.restore(name)
+        self._run(name, "snapshot", "save", SNAPSHOT_NAME)
+        return self._address(name)
+
+    def restore(self, name):
+        self._run(name, "snapshot", "restore", "--no-provision", SNAPSHOT_NAME)
+        return self._address(name)
+
+    def destroy(self, name):
+        self._run(name, "destroy", "-f")
+
+
+class DockerProvider:
+    """Decoys as containers of an image (e.g. from docker_gen.py); the image is the clean snapshot.
+
+    A reset replaces the container with a new one from the image, so
+    nothing an attacker wrote survives it.
+    """
+
+    def __init__(self, image, docker="docker", network=None, timeout=PROVIDER_TIMEOUT):
+        self.image = image
+        self.docker = docker
+        self.network = network
+        self.timeout = timeout
+
+    def _run(self, *args, check=True):
+        return subprocess.run([self.docker, *args], check=check, capture_output=True, text=True,
+                              timeout=self.timeout).stdout.strip()
+
+    def create(self, name):
+        self._run("rm", "-f", name, check=False)
+        network = ["--network", self.network] if self.network else []
+        self._run("run", "-d", "--name", name, "--label", "decoyhive.warm-pool=1", *network, self.image)
+        address = self._run("inspect", "-f", "{{range .NetworkSettings.Networks}}{{.IPAddress}} {{end}}", name)
+        if not address:
+            raise RuntimeError(f"container {name} has no IP address")
+        return address.split()[0]
+
+    def restore(self, name):
+        return self.create(name)
+
+    def destroy(self, name):
+        self._run("rm", "-f", name, check=False)
+
+
+class StubProvider:
+    """Provider that only sleeps, for exercising the pool without VMs or containers."""
+
+    def __init__(self, boot_seconds=2.0, restore_seconds=0.2, subnet="10.99.0"):
+        self.boot_seconds = boot_seconds
+        self.restore_seconds = restore_seconds
+        self.subnet = subnet
+        self.calls = []
+        self._addresses = {}
+        self._lock = threading.Lock()
+
+    def _address(self, name):
+        with self._lock:
+            return self._addresses.setdefault(name, f"{self.subnet}.{len(self._addresses) + 10}")
+
+    def create(self, name):
+        self.calls.append(("create", name))
+        time.sleep(self.boot_seconds)
+        return self._address(name)
+
+    def restore(self, name):
+        self.calls.append(("restore", name))
+        time.sleep(self.restore_seconds)
+        return self._address(name)
+
+    def destroy(self, name):
+        self.calls.append(("destroy", name))
+
+
+PROVIDERS = {"vagrant": VagrantProvider, "docker": DockerProvider, "stub": StubProvider}
+
+
+def make_provider(settings):
+    """Provider from a config.json "warm_pool" entry, e.g. {"provider": "docker", "image": "decoyhive/decoy:web1"}."""
+    options = {k: v for k, v in settings.items() if k not in ("provider", "size")}
+    return PROVIDERS[settings.get("provider", "vagrant")](**options)
+
+
+class Slot:
+    """One pooled decoy: booting -> ready -> in_use -> restoring -> ready, or failed -> booting."""
+
+    __slots__ = ("name", "state", "ip", "attacker", "since", "failures")
+
+    def __init__(self, name):
+        self.name = name
+        self.state = "booting"
+        self.ip = None
+        self.attacker = None
+        self.since = time.monotonic()
+        self.failures = 0
+
+
+class WarmPool:
+    """Keep size decoys booted from a clean snapshot and give each new attacker its own.
+
+    acquire() hands out a ready decoy at once, and release() resets it
+    from the snapshot on a background thread before it is handed out
+    again. A failed reset is retried as a full boot, and a decoy that still
+    fails after RESTORE_ATTEMPTS is marked failed and booted again in the
+    background with exponential backoff.
+    """
+
+    def __init__(self, provider, size=DEFAULT_POOL_SIZE, prefix="decoy", retry_delay=RETRY_DELAY):
+        self.provider = provider
+        self.retry_delay = retry_delay
+        self.slots = {f"{prefix}{i}": Slot(f"{prefix}{i}") for i in range(size)}
+        self.assignments = {}
+        self._ready = collections.deque()
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="warm-pool")
+        # Seconds from boot or reset start until the decoy was ready again
+        self.boot_times = collections.deque(maxlen=100)
+        self.restore_times = collections.deque(maxlen=100)
+        self.hits = 0
+        # Attackers that found no ready decoy, counted once however often they retry within WAITING_TTL
+        self.misses = 0
+        self._waiting = {}
+        self._retries = {}
+        self._stopped = False
+
+    def start(self):
+        """Boot (or restore) every decoy in the background."""
+        for slot in self.slots.values():
+            self._executor.submit(self._prepare, slot, self.provider.create, self.boot_times)
+
+    def _prepare(self, slot, action, times):
+        start = time.monotonic()
+        for attempt in range(1, RESTORE_ATTEMPTS + 1):
+            try:
+                ip = action(slot.name)
+                break
+            except (subprocess.SubprocessError, OSError, RuntimeError) as e:
+                print(f"[ERROR] Preparing decoy {slot.name} failed (attempt {attempt}/{RESTORE_ATTEMPTS}): {e}")
+                if attempt < RESTORE_ATTEMPTS:
+                    time.sleep(self.retry_delay)
+                action = self.provider.create
+        else:
+            with self._changed:
+                slot.state, slot.since = "failed", time.monotonic()
+                slot.failures += 1
+                delay = min(self.retry_delay * 2 ** slot.failures, MAX_RETRY_DELAY)
+                self._changed.notify_all()
+                if not self._stopped:
+                    timer = self._retries[slot.name] = threading.Timer(delay, self._retry, (slot,))
+                    timer.daemon = True
+                    timer.start()
+            print(f"[ERROR] Decoy {slot.name} failed {slot.failures} time(s); booting it again in {delay:.0f}s.")
+            return
+        with self._changed:
+            slot.state, slot.ip, slot.since, slot.failures = "ready", ip, time.monotonic(), 0
+            times.append(slot.since - start)
+            self._ready.append(slot.name)
+            self._changed.notify_all()
+        print(f"[INFO] Decoy {slot.name} ({ip}) ready in {slot.since - start:.1f}s; {len(self._ready)} warm.")
+
+    def _retry(self, slot):
+        with self._lock:
+            self._retries.pop(slot.name, None)
+            if self._stopped:
+                return
+            slot.state, slot.since = "booting", time.monotonic()
+            self._executor.submit(self._prepare, slot, self.provider.create, self.boot_times)
+
+    def acquire(self, attacker_ip):
+        """IP of the attacker's decoy, handing out a fresh one on first contact; None if none is ready."""
+        with self._lock:
+            name = self.assignments.get(attacker_ip)
+            if name is not None:
+                return self.slots[name].ip
+            if not self._ready:
+                now = time.monotonic()
+                self._waiting = {ip: since for ip, since in self._waiting.items() if now - since < WAITING_TTL}
+                if attacker_ip not in self._waiting:
+                    self._waiting[attacker_ip] = now
+                    self.misses += 1
+                return None
+            self._waiting.pop(attacker_ip, None)
+            slot = self.slots[self._ready.popleft()]
+            slot.state, slot.attacker, slot.since = "in_use", attacker_ip, time.monotonic()
+            self.assignments[attacker_ip] = slot.name
+            self.hits += 1
+            return slot.ip
+
+    def release(self, attacker_ip):
+        """Take an attacker's decoy back and reset it in the background; returns the IP it had."""
+        with self._lock:
+            name = self.assignments.pop(attacker_ip, None)
+            if name is None:
+                return None
+            slot = self.slots[name]
+            ip = slot.ip
+            slot.state, slot.attacker, slot.since = "restoring", None, time.monotonic()
+        self._executor.submit(self._prepare, slot, self.provider.restore, self.restore_times)
+        return ip
+
+    def wait_ready(self, count=1, timeout=None):
+        """Block until at least count decoys are ready; returns whether they are."""
+        with self._changed:
+            return self._changed.wait_for(lambda: len(self._ready) >= count, timeout)
+
+    def stop(self, destroy=False):
+        with self._lock:
+            self._stopped = True
+            for timer in self._retries.values():
+                timer.cancel()
+            self._retries.clear()
+        self._executor.shutdown(wait=False)
+        if destroy:
+            for name in self.slots:
+                self.provider.destroy(name)
+
+    def stats(self):
+        """Occupancy and time-to-ready, for logging or a status endpoint."""
+        def summary(times):
+            if not times:
+                return None
+            ordered = sorted(times)
+            return {"mean": sum(ordered) / len(ordered), "p95": ordered[int(0.95 * (len(ordered) - 1))],
+                    "max": ordered[-1]}
+
+        with self._lock:
+            states = collections.Counter(slot.state for slot in self.slots.values())
+            return {
+                "size": len(self.slots),
+                "states": {state: states.get(state, 0)
+                           for state in ("booting", "ready", "in_use", "restoring", "failed")},
+                "occupancy": states.get("in_use", 0) / len(self.slots) if self.slots else 0.0,
+                "hits": self.hits,
+                "misses": self.misses,
+                "boot_seconds": summary(self.boot_times),
+                "restore_seconds": summary(self.restore_times),
+            }
+
+
+def _benchmark(size=3, attackers=12, boot_seconds=2.0, restore_seconds=0.3, dwell=0.5):
+    """Time-to-decoy for a stream of attackers with a warm pool, against booting a decoy per attacker."""
+    pool = WarmPool(StubProvider(boot_seconds, restore_seconds), size, retry_delay=0)
+    pool.start()
+    pool.wait_ready(size)
+
+    waits = []
+    for i in range(attackers):
+        attacker = f"203.0.113.{i + 1}"
+        start = time.monotonic()
+        while pool.acquire(attacker) is None:
+            pool.wait_ready(1, timeout=0.05)
+        waits.append(time.monotonic() - start)
+        # Each attacker is done with its decoy after dwell seconds
+        threading.Timer(dwell, pool.release, (attacker,)).start()
+        time.sleep(dwell / size)
+
+    pool.wait_ready(size, timeout=boot_seconds * 2)
+    pool.stop()
+    print(f"{attackers} attackers, {size} warm decoys: mean wait {sum(waits) / len(waits):.3f}s, "
+          f"max {max(waits):.3f}s (cold boot per attacker: {boot_seconds:.1f}s)")
+    print(pool.stats())
+
+
+if __name__ == "__main__":
+    _benchmark()
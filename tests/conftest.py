@@ -0,0 +1,9 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The generator scripts import their siblings directly, and the analyzer
+# runs with analyzer/ as its working directory, importing the utils package
+for directory in ("generator", "analyzer"):
+    sys.path.insert(0, os.path.join(ROOT, directory))
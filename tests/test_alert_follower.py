@@ -0,0 +1,64 @@
+import os
+import time
+
+from alert_follower import AlertFollower
+from alert_parser import line_epoch
+
+
+def fast_line(when, src="10.0.0.5"):
+    stamp = time.strftime("%m/%d-%H:%M:%S", time.localtime(when)) + ".000000"
+    return (f"{stamp}  [**] [1:1000001:0] Nmap SYN Scan detected [**] [Priority: 2] "
+            f"{{TCP}} {src}:4321 -> 10.0.0.1:80\n")
+
+
+def test_reads_only_appended_lines(tmp_path):
+    path = tmp_path / "alert"
+    path.write_text("old\n")
+    follower = AlertFollower(str(path), use_inotify=False)
+    assert follower.read_lines() == ["old"]
+    with open(path, "a") as f:
+        f.write("new\npart")
+    assert follower.read_lines() == ["new"]
+    with open(path, "a") as f:
+        f.write("ial\n")
+    assert follower.read_lines() == ["partial"]
+
+
+def test_large_backlog_is_read_in_bounded_chunks(tmp_path):
+    path = tmp_path / "alert"
+    path.write_text("".join(f"line {i:05d}\n" for i in range(10000)))
+    follower = AlertFollower(str(path), use_inotify=False)
+    lines = []
+    reads = 0
+    while True:
+        batch = follower.read_lines(max_bytes=4096)
+        assert sum(len(line) + 1 for line in batch) <= 4096 + 16
+        lines.extend(batch)
+        reads += 1
+        if not follower.backlog():
+            break
+    assert reads > 10
+    assert lines == [f"line {i:05d}" for i in range(10000)]
+
+
+def test_history_skips_alerts_older_than_the_window(tmp_path):
+    now = time.time()
+    path = tmp_path / "alert"
+    old = [fast_line(now - 3600 + i) for i in range(2000)]
+    recent = [fast_line(now - 30 + i / 100, src="10.0.0.9") for i in range(100)]
+    path.write_text("".join(old + recent))
+    follower = AlertFollower(str(path), use_inotify=False, history=60, line_time=line_epoch)
+    lines = follower.read_lines()
+    assert lines == [line.rstrip("\n") for line in recent]
+
+
+def test_rotation_switches_to_the_new_file(tmp_path):
+    path = tmp_path / "alert"
+    path.write_text("a\n")
+    follower = AlertFollower(str(path), use_inotify=False)
+    assert follower.read_lines() == ["a"]
+    with open(path, "a") as f:
+        f.write("b\n")
+    os.rename(path, tmp_path / "alert.1")
+    path.write_text("c\n")
+    assert follower.read_lines() == ["b", "c"]
@@ -0,0 +1,20 @@
+from alert_parser import Alert
+from attacker_state import AttackerTracker
+
+
+def alert(sid, priority=3, src="10.0.0.5"):
+    return Alert(None, 1, sid, 0, "test", None, priority, "TCP", src, 4321, "10.0.0.1", 80)
+
+
+def test_sid_weight_overrides_priority():
+    tracker = AttackerTracker(threshold=10, sid_weights={1000001: 10})
+    assert not tracker.observe(alert(1000002), now=0)
+    assert tracker.score("10.0.0.5", now=0) == 2
+    assert tracker.observe(alert(1000001), now=1)
+
+
+def test_alerts_leave_the_window():
+    tracker = AttackerTracker(threshold=10, window=60)
+    tracker.observe(alert(1, priority=2), now=0)
+    assert not tracker.observe(alert(1, priority=2), now=61)
+    assert tracker.score("10.0.0.5", now=61) == 5
@@ -0,0 +1,81 @@
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from utils.collectors import Collector, run_collectors
+from utils.hw_info import get_hardware_info, read_mounts, statvfs_mounts, unescape_mount_path
+
+hang = threading.Event()
+
+
+def stuck():
+    hang.wait(30)
+
+
+def test_queued_collectors_run_after_every_worker_hangs():
+    jobs = [Collector("a", stuck), Collector("b", stuck), Collector("c", lambda: "c"), Collector("d", lambda: "d")]
+    start = time.monotonic()
+    sections, timings = run_collectors(jobs, timeout=0.2, max_workers=2)
+    assert time.monotonic() - start < 2
+    assert sections == {"c": "c", "d": "d"}
+    assert set(timings) == {"a", "b", "c", "d"}
+
+
+def test_per_collector_timeout_and_failure():
+    def fail():
+        raise ValueError("no such file")
+
+    jobs = [Collector("slow", stuck, timeout=0.1), Collector("broken", fail), Collector("ok", lambda x: x)]
+    sections, _ = run_collectors(jobs, timeout=5, options={"ok": {"x": 1}})
+    assert sections == {"ok": 1}
+
+
+def test_statvfs_does_not_log_every_mount(caplog, tmp_path):
+    with caplog.at_level(logging.INFO):
+        sizes = statvfs_mounts([str(tmp_path), "/definitely/not/mounted"])
+    assert list(sizes) == [str(tmp_path)]
+    assert "took" not in caplog.text
+    assert "statvfs of '/definitely/not/mounted' failed" in caplog.text
+
+
+def test_mount_paths_decode_only_octal_escapes(tmp_path):
+    assert unescape_mount_path(r"/mnt/my\040disk\011x\134y") == "/mnt/my disk\tx\\y"
+    assert unescape_mount_path("/mnt/café\\n") == "/mnt/café\\n"
+
+    (tmp_path / "proc").mkdir()
+    (tmp_path / "proc" / "filesystems").write_text("nodev\tproc\n\text4\n")
+    (tmp_path / "proc" / "self").mkdir()
+    (tmp_path / "proc" / "self" / "mounts").write_text(
+        "proc /proc proc rw 0 0\n/dev/sda1 /srv/dépôt\\040a ext4 rw 0 0\n", encoding="utf-8")
+    assert read_mounts(str(tmp_path)) == [("/dev/sda1", "/srv/dépôt a", "ext4")]
+
+
+def test_unreadable_cpu_and_memory_are_unknown_not_zero(tmp_path):
+    hardware = get_hardware_info(str(tmp_path), seed=1)
+    assert (hardware["cpu"]["cores"], hardware["cpu"]["threads"]) == (None, None)
+    assert hardware["memory"] == {"total": None, "available": None}
+
+    (tmp_path / "proc").mkdir()
+    (tmp_path / "proc" / "cpuinfo").write_text("processor\t: 0\nmodel name\t: Test CPU\n\nprocessor\t: 1\n")
+    (tmp_path / "proc" / "meminfo").write_text("MemTotal:        2097152 kB\n")
+    hardware = get_hardware_info(str(tmp_path), seed=1)
+    assert (hardware["cpu"]["cores"], hardware["cpu"]["threads"]) == (2, 2)
+    assert hardware["memory"] == {"total": "2.00 GB", "available": None}
+
+
+@pytest.mark.parametrize("name", ["logs", "env_vars", "cron_jobs"])
+def test_light_collectors_do_not_import_psutil_or_package_readers(name):
+    analyzer = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "analyzer")
+    code = (f"import sys; from utils.collectors import COLLECTORS; COLLECTORS[{name!r}].func; "
+            "print(sorted(m for m in ('psutil', 'utils.package_db', 'utils.proc_snapshot') if m in sys.modules))")
+    result = subprocess.run([sys.executable, "-c", code], cwd=analyzer, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
+
+
+def teardown_module():
+    hang.set()
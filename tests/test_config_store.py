@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+import config_sections
+from utils import config_store
+from utils.config_store import SectionReader, SectionWriter, load_sections, open_previous
+
+
+def write_store(path, sections, meta=None):
+    with SectionWriter(str(path), meta) as writer:
+        for name, data in sections.items():
+            writer.write_section(name, data, fingerprint=f"fp-{name}")
+
+
+def test_sections_round_trip(tmp_path):
+    path = tmp_path / "config.jsonl"
+    write_store(path, {"os": {"detected_distro": "debian"}, "users": [{"name": "root"}]}, {"host": "web1"})
+    reader = SectionReader(str(path))
+    assert reader.sections() == ["os", "users"]
+    assert reader.read("os") == {"detected_distro": "debian"}
+    assert reader.read("missing", default=1) == 1
+    assert reader.fingerprints == {"os": "fp-os", "users": "fp-users"}
+    assert reader.meta == {"host": "web1"}
+
+
+def test_trailer_larger_than_one_tail_block(tmp_path, monkeypatch):
+    monkeypatch.setattr(config_store, "TAIL_BLOCK", 64)
+    path = tmp_path / "config.jsonl"
+    write_store(path, {f"section{i}": i for i in range(50)})
+    assert SectionReader(str(path)).read("section49") == 49
+
+
+def test_copy_section_keeps_data_and_fingerprint(tmp_path):
+    previous = tmp_path / "old.jsonl"
+    write_store(previous, {"os": {"a": 1}, "users": []})
+    path = tmp_path / "new.jsonl"
+    with SectionWriter(str(path)) as writer:
+        writer.copy_section(SectionReader(str(previous)), "os")
+        writer.write_section("users", ["root"])
+    reader = SectionReader(str(path))
+    assert reader.read_all() == {"os": {"a": 1}, "users": ["root"]}
+    assert reader.fingerprints == {"os": "fp-os"}
+
+
+def test_failed_write_leaves_the_previous_export(tmp_path):
+    path = tmp_path / "config.jsonl"
+    write_store(path, {"os": 1})
+    with pytest.raises(RuntimeError):
+        with SectionWriter(str(path)) as writer:
+            writer.write_section("os", 2)
+            raise RuntimeError("collector crashed")
+    assert SectionReader(str(path)).read("os") == 1
+    assert not (tmp_path / "config.jsonl.tmp").exists()
+
+
+def test_plain_json_and_incomplete_exports(tmp_path):
+    plain = tmp_path / "config.json"
+    plain.write_text(json.dumps({"os": 1, "hardware": 2}))
+    assert load_sections(str(plain), ["os"]) == {"os": 1}
+    assert open_previous(str(plain)) is None
+
+    torn = tmp_path / "torn.jsonl"
+    torn.write_text('{"format": "decoyhive-sections", "version": 1}\n{"section": "os", "data": 1}\n')
+    assert open_previous(str(torn)) is None
+
+
+def test_generator_reads_with_the_same_module(tmp_path):
+    path = tmp_path / "config.jsonl"
+    write_store(path, {"os": {"detected_distro": "fedora"}, "hardware": {}, "logs": {}})
+    assert config_sections.load_sections is load_sections
+    assert config_sections.load_sections(str(path), ["os", "hardware"]) == {
+        "os": {"detected_distro": "fedora"}, "hardware": {}}
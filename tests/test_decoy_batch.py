@@ -0,0 +1,95 @@
+import json
+import os
+
+from decoy_batch import deploy, render_workspace
+from utils.collectors import Collector, collect_to_store
+
+
+def analyzer_run(path, hardware, seed=None):
+    collectors = [Collector("os", lambda: {"detected_distro": "debian"}, fingerprint=lambda: "os-1"),
+                  Collector("hardware", lambda seed=None: hardware, fingerprint=lambda: str(hardware["cpu"])),
+                  Collector("users", lambda: [], fingerprint=lambda: "users-1")]
+    options = {"hardware": {"seed": seed}} if seed is not None else None
+    collect_to_store(collectors, str(path), options=options)
+
+
+def hardware(cores):
+    return {"cpu": {"cores": cores}, "memory": {"total": "2.00 GB"}}
+
+
+def test_changes_between_renders_are_not_lost(tmp_path):
+    config = tmp_path / "web1.jsonl"
+    workspaces = tmp_path / "decoys"
+    analyzer_run(config, hardware(2))
+    assert render_workspace("web1", str(config), str(workspaces))
+    assert not render_workspace("web1", str(config), str(workspaces))
+
+    # Two analyzer runs before the next render: the first changes hardware, the second nothing
+    analyzer_run(config, hardware(8))
+    analyzer_run(config, hardware(8))
+    assert render_workspace("web1", str(config), str(workspaces))
+    assert "--cpus\", 2" in (workspaces / "web1" / "Vagrantfile").read_text()
+    assert "core=8" in (workspaces / "web1" / "Vagrantfile").read_text()
+
+
+def test_collector_options_are_part_of_the_fingerprint(tmp_path):
+    config = tmp_path / "web1.jsonl"
+    workspaces = tmp_path / "decoys"
+    analyzer_run(config, hardware(2), seed="a")
+    render_workspace("web1", str(config), str(workspaces))
+    stamp = (workspaces / "web1" / ".Vagrantfile.fingerprints.json").read_text()
+
+    analyzer_run(config, hardware(2), seed="b")
+    # Same rendered content, so the Vagrantfile is kept but the new fingerprints are recorded
+    assert not render_workspace("web1", str(config), str(workspaces))
+    assert (workspaces / "web1" / ".Vagrantfile.fingerprints.json").read_text() != stamp
+
+
+def test_plain_json_configs_are_always_checked(tmp_path):
+    config = tmp_path / "web1.json"
+    config.write_text('{"os": {"detected_distro": "debian"}, "hardware": {"cpu": {"cores": 2}, "memory": {}}}')
+    workspaces = tmp_path / "decoys"
+    assert render_workspace("web1", str(config), str(workspaces))
+    config.write_text('{"os": {"detected_distro": "fedora"}, "hardware": {"cpu": {"cores": 2}, "memory": {}}}')
+    assert render_workspace("web1", str(config), str(workspaces))
+
+
+def stub_vagrant(tmp_path):
+    """vagrant that fails in any workspace containing a file named fail, and logs where it ran."""
+    stub = tmp_path / "vagrant"
+    stub.write_text(f'#!/bin/sh\necho "$PWD" >> {tmp_path}/calls\n[ ! -e fail ]\n')
+    stub.chmod(0o755)
+    return str(stub)
+
+
+def calls(tmp_path):
+    path = tmp_path / "calls"
+    runs = [os.path.basename(line) for line in path.read_text().split()] if path.exists() else []
+    path.write_text("")
+    return sorted(runs)
+
+
+def test_failed_decoys_are_retried_until_up(tmp_path):
+    configs = tmp_path / "configs"
+    configs.mkdir()
+    for name in ("web1", "db1"):
+        (configs / f"{name}.json").write_text(json.dumps(
+            {"os": {"detected_distro": "debian"}, "hardware": {"cpu": {"cores": 2}, "memory": {}}}))
+    workspaces = tmp_path / "decoys"
+    vagrant = stub_vagrant(tmp_path)
+    (workspaces / "db1").mkdir(parents=True)
+    (workspaces / "db1" / "fail").write_text("")
+
+    results = deploy(str(configs), str(workspaces), vagrant=vagrant)
+    assert {r["name"]: r["ok"] for r in results} == {"web1": True, "db1": False}
+    assert calls(tmp_path) == ["db1", "web1"]
+
+    # Nothing changed, but db1 is not up yet
+    results = deploy(str(configs), str(workspaces), vagrant=vagrant)
+    assert calls(tmp_path) == ["db1"]
+
+    (workspaces / "db1" / "fail").unlink()
+    results = deploy(str(configs), str(workspaces), vagrant=vagrant)
+    assert [r["ok"] for r in results] == [True]
+    assert deploy(str(configs), str(workspaces), vagrant=vagrant) == []
+    assert calls(tmp_path) == ["db1"]
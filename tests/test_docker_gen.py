@@ -0,0 +1,37 @@
+import json
+
+import pytest
+
+from docker_gen import ImageBuilder, container_spec, decoy_tag
+
+
+def test_decoy_tags_follow_the_docker_grammar():
+    assert decoy_tag("Web1") == "decoyhive/decoy:web1"
+    assert decoy_tag("db_1.prod-a") == "decoyhive/decoy:db_1.prod-a"
+    for name in ("", "-web1", "web 1", "web1:latest", "a/b", "x" * 129):
+        with pytest.raises(ValueError):
+            decoy_tag(name)
+
+
+def test_invalid_names_are_reported_without_building(tmp_path):
+    stub = tmp_path / "docker"
+    stub.write_text(f'#!/bin/sh\necho "$@" >> {tmp_path}/calls\n[ "$1" = image ] && exit 1\ncat > /dev/null\n')
+    stub.chmod(0o755)
+    configs = {}
+    for name in ("web1", "web 2", "web3"):
+        path = tmp_path / f"{name}.json"
+        path.write_text(json.dumps({"os": {"detected_distro": "debian"}, "software": [{"name": "nginx"}],
+                                    "services": [{"port": 80, "process_name": "nginx"}]}))
+        configs[name] = str(path)
+
+    builder = ImageBuilder(str(stub), str(tmp_path / "contexts"))
+    images = builder.build_all(configs)
+    assert images == {"web1": "decoyhive/decoy:web1", "web 2": None, "web3": "decoyhive/decoy:web3"}
+    assert (builder.layers_built, builder.layers_reused) == (1, 1)
+    assert "web 2" not in (tmp_path / "calls").read_text()
+
+
+def test_same_packages_share_a_layer_key():
+    a = container_spec({"os": {"detected_distro": "debian"}, "software": [{"name": "b"}, {"name": "a"}]})
+    b = container_spec({"os": {"detected_distro": "Debian"}, "software": [{"name": "a"}, {"name": "b"}]})
+    assert a.layer_key == b.layer_key
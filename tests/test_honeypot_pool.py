@@ -0,0 +1,78 @@
+import socket
+
+import pytest
+
+from honeypot_pool import Backend, HoneypotPool
+
+
+@pytest.fixture
+def endpoint():
+    """A local TCP listener standing in for a decoy's SSH port."""
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+    yield server
+    server.close()
+
+
+def backends(endpoint, *ips):
+    port = endpoint.getsockname()[1]
+    return [Backend(ip, check_port=port) for ip in ips]
+
+
+def test_assignments_are_sticky_and_move_only_from_a_removed_decoy():
+    pool = HoneypotPool([Backend(ip, check_port=None) for ip in ("10.1.0.1", "10.1.0.2", "10.1.0.3")])
+    attackers = [f"203.0.113.{i}" for i in range(60)]
+    first = {a: pool.assign(a) for a in attackers}
+    assert {a: pool.assign(a) for a in attackers} == first
+    assert len(set(first.values())) == 3
+
+    pool.remove_backend("10.1.0.3")
+    moved = {a for a in attackers if pool.assign(a) != first[a]}
+    assert moved == {a for a, ip in first.items() if ip == "10.1.0.3"}
+
+
+def test_least_conn_balances_and_counts_releases():
+    pool = HoneypotPool([Backend("10.1.0.1", check_port=None), Backend("10.1.0.2", check_port=None)],
+                        strategy="least_conn")
+    assert [pool.assign(f"203.0.113.{i}") for i in range(4)] == ["10.1.0.1", "10.1.0.2"] * 2
+    pool.release("203.0.113.0")
+    pool.release("203.0.113.2")
+    assert pool.assign("203.0.113.9") == "10.1.0.1"
+    assert pool.stats()["10.1.0.1"]["active"] == 1
+
+
+def test_health_flip_orphans_attackers(endpoint):
+    # Only 127.0.0.1 has a listener; 127.0.0.2 refuses connections
+    pool = HoneypotPool(backends(endpoint, "127.0.0.1", "127.0.0.2"), check_timeout=0.5)
+    first = {f"203.0.113.{i}": pool.assign(f"203.0.113.{i}") for i in range(20)}
+    assert pool.orphaned() == []
+
+    assert pool.check_health() == {"127.0.0.1": True, "127.0.0.2": False}
+    assert sorted(pool.orphaned()) == sorted(a for a, ip in first.items() if ip == "127.0.0.2")
+    assert {pool.assign(a) for a in first} == {"127.0.0.1"}
+
+    endpoint.close()
+    assert pool.check_health() == {"127.0.0.1": False, "127.0.0.2": False}
+    assert len(pool.orphaned()) == 20
+    assert pool.assign("198.51.100.1") is None
+
+
+def test_draining_keeps_attackers_until_they_leave():
+    pool = HoneypotPool([Backend("10.1.0.1", check_port=None), Backend("10.1.0.2", check_port=None)])
+    attackers = [f"203.0.113.{i}" for i in range(20)]
+    first = {a: pool.assign(a) for a in attackers}
+    on_first = [a for a, ip in first.items() if ip == "10.1.0.1"]
+
+    pool.drain("10.1.0.1")
+    assert not pool.drained("10.1.0.1")
+    # Current attackers stay, new ones go elsewhere
+    assert all(pool.assign(a) == "10.1.0.1" for a in on_first)
+    assert pool.assign("198.51.100.1") == "10.1.0.2"
+    assert pool.orphaned() == []
+
+    for a in on_first:
+        pool.release(a)
+    assert pool.drained("10.1.0.1")
+    pool.undrain("10.1.0.1")
+    assert not pool.drained("10.1.0.1")
@@ -0,0 +1,46 @@
+import json
+
+from utils import net_info
+
+ROUTE = ("Iface\tDestination\tGateway \tFlags\tRefCnt\tUse\tMetric\tMask\t\tMTU\tWindow\tIRTT\n"
+         "eth0\t0000A8C0\t00000000\t0001\t0\t0\t0\t00FFFFFF\t0\t0\t0\n")
+FIB_TRIE = ("Main:\n"
+            "  +-- 192.168.0.0/24 2 0 2\n"
+            "     |-- 192.168.0.10\n"
+            "        /32 host LOCAL\n"
+            "     |-- 127.0.0.1\n"
+            "        /32 host LOCAL\n")
+RULESET = json.dumps({"nftables": [
+    {"chain": {"family": "ip", "table": "nat", "name": "prerouting", "hook": "prerouting", "prio": -100}},
+    {"rule": {"family": "ip", "table": "nat", "chain": "prerouting", "handle": 4, "expr": [{"accept": None}]}},
+]})
+
+
+def fake_root(tmp_path):
+    (tmp_path / "proc" / "net").mkdir(parents=True)
+    (tmp_path / "proc" / "net" / "route").write_text(ROUTE)
+    (tmp_path / "proc" / "net" / "fib_trie").write_text(FIB_TRIE)
+    return str(tmp_path)
+
+
+def test_malformed_ruleset_is_reported_as_empty(caplog):
+    assert net_info.parse_nft_ruleset("nft: not json") == ([], [])
+    assert "Could not parse the nftables ruleset" in caplog.text
+
+
+def test_ruleset_is_parsed_into_chains_and_rules():
+    chains, rules = net_info.parse_nft_ruleset(RULESET)
+    assert [c.name for c in chains] == ["prerouting"]
+    assert [(r.chain, r.handle) for r in rules] == [("prerouting", 4)]
+
+
+def test_rules_keep_a_text_listing():
+    _, rules = net_info.parse_nft_ruleset(RULESET)
+    assert net_info.format_rules(rules) == 'ip nat prerouting handle 4: [{"accept": null}]'
+
+
+def test_network_info_keeps_the_flat_keys(tmp_path):
+    info = net_info.get_network_info(fake_root(tmp_path))
+    assert info["ip_address"] == "192.168.0.10"
+    assert info["firewall_rules"] == ""
+    assert [a["address"] for a in info["addresses"]] == ["192.168.0.10", "127.0.0.1"]
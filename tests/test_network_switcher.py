@@ -0,0 +1,101 @@
+import pytest
+
+pytest.importorskip("netifaces")
+
+import network_switcher
+from iptables_engine import RuleEngine, rule
+from rule_journal import RuleJournal
+from warm_pool import StubProvider, WarmPool
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def switcher(tmp_path, monkeypatch):
+    clock = FakeClock()
+    engine = RuleEngine(command=["false"])
+    monkeypatch.setattr(network_switcher, "rule_journal", RuleJournal(str(tmp_path / "journal"), clock=clock))
+    monkeypatch.setattr(network_switcher, "redirect_engine", engine)
+    monkeypatch.setattr(network_switcher, "active_rules", {})
+    return network_switcher, engine, clock
+
+
+def test_expiry_is_retried_after_a_failed_commit(switcher):
+    ns, engine, clock = switcher
+    dnat = rule("nat", "PREROUTING", "-s", "10.0.0.5", "-j", "DNAT", "--to-destination", "192.168.56.10")
+    engine.installed.add(dnat)
+    ns.active_rules["10.0.0.5"] = [dnat]
+    ns.rule_journal.record_add("10.0.0.5", [dnat], ttl=60, target="192.168.56.10")
+    clock.now += 60
+
+    ns.expire_redirections()
+    assert "10.0.0.5" in ns.active_rules
+    assert "10.0.0.5" in ns.rule_journal.entries
+
+    engine.command = ["true"]
+    clock.now += ns.RETRY_DELAY
+    ns.expire_redirections()
+    assert ns.active_rules == {}
+    assert ns.rule_journal.entries == {}
+    assert dnat not in engine.installed
+
+
+def test_draining_honeypot_is_retired_once_its_attackers_leave(switcher, monkeypatch):
+    ns, engine, _ = switcher
+    engine.command = ["true"]
+    monkeypatch.setattr(ns, "rule_engine", engine)
+    monkeypatch.setattr(ns, "honeypot_pool", ns.HoneypotPool([]))
+    config = {"honeypots": ["10.1.0.1", "10.1.0.2"], "draining": []}
+    ns.apply_honeypot_config(config)
+    engine.installed.add(ns.masquerade_rule("10.1.0.1"))
+    assert ns.honeypot_pool.pin("203.0.113.1", "10.1.0.1")
+
+    config["draining"] = ["10.1.0.1"]
+    ns.apply_honeypot_config(config)
+    ns.retire_drained()
+    assert "10.1.0.1" in ns.honeypot_pool.backends
+    assert ns.honeypot_pool.assign("198.51.100.1") == "10.1.0.2"
+
+    ns.honeypot_pool.release("203.0.113.1")
+    ns.retire_drained()
+    assert list(ns.honeypot_pool.backends) == ["10.1.0.2"]
+    assert ns.masquerade_rule("10.1.0.1") not in engine.installed
+
+    # Newly listed honeypots join on reload
+    config["honeypots"].append("10.1.0.3")
+    ns.apply_honeypot_config(config)
+    assert sorted(ns.honeypot_pool.backends) == ["10.1.0.2", "10.1.0.3"]
+
+
+def test_warm_decoy_rules_are_removed_on_release_and_replay(switcher, monkeypatch):
+    ns, _, _ = switcher
+    engine = RuleEngine(command=["true"], probe_command=["true"])
+    monkeypatch.setattr(ns, "rule_engine", engine)
+    monkeypatch.setattr(ns, "redirect_engine", engine)
+    monkeypatch.setattr(ns, "honeypot_pool", ns.HoneypotPool([]))
+    pool = WarmPool(StubProvider(boot_seconds=0, restore_seconds=0), 1, retry_delay=0)
+    monkeypatch.setattr(ns, "warm_pool", pool)
+    pool.start()
+    try:
+        assert pool.wait_ready(1, timeout=5)
+        decoy_ip = ns.divert_target("203.0.113.1")
+        engine.installed.add(ns.masquerade_rule(decoy_ip))
+        ns.release_decoy("203.0.113.1")
+        assert ns.masquerade_rule(decoy_ip) not in engine.installed
+        assert decoy_ip not in ns.honeypot_pool.backends
+    finally:
+        pool.stop()
+
+    # A journal entry from the last run pointing at a warm decoy that is gone
+    dnat = rule("nat", "PREROUTING", "-s", "10.0.0.5", "-j", "DNAT", "--to-destination", "10.99.0.50")
+    ns.rule_journal.record_add("10.0.0.5", [dnat], ttl=60, target="10.99.0.50")
+    ns.restore_redirections()
+    assert ns.masquerade_rule("10.99.0.50") not in engine.installed
+    assert dnat not in engine.installed
+    assert ns.rule_journal.entries == {}
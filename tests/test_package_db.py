@@ -0,0 +1,36 @@
+import os
+import subprocess
+
+from utils import package_db
+from utils.package_db import file_owners, read_pacman_local
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def test_pacman_owner_name_comes_from_desc(tmp_path):
+    package = tmp_path / "var/lib/pacman/local/python-3to2-1.1.1-1"
+    write(str(package / "desc"), "%NAME%\npython-3to2\n\n%VERSION%\n1.1.1-1\n")
+    write(str(package / "files"), "%FILES%\nusr/\nusr/bin/3to2\n")
+    assert file_owners(["/usr/bin/3to2"], root=str(tmp_path)) == {"/usr/bin/3to2": "python-3to2"}
+    assert [p.name for p in read_pacman_local(str(tmp_path))] == ["python-3to2"]
+
+
+def test_dpkg_owner_matches_usr_merged_path(tmp_path):
+    write(str(tmp_path / "var/lib/dpkg/info/openssh-server.list"), "/usr/sbin/sshd\n")
+    assert file_owners(["/sbin/sshd"], root=str(tmp_path)) == {"/sbin/sshd": "openssh-server"}
+
+
+def test_rpm_owners_are_matched_by_path(monkeypatch):
+    output = ("file /opt/orphan is not owned by any package\n"
+              "/usr/bin/python3\tpython3\n/usr/lib/python3/x.py\tpython3\n"
+              "/usr/sbin/httpd\thttpd\n/usr/sbin/httpd\thttpd-alt\n")
+    monkeypatch.setattr(package_db.glob, "glob", lambda pattern: [])
+    monkeypatch.setattr(package_db.os.path, "exists", lambda path: path == "/bin/rpm")
+    monkeypatch.setattr(package_db.subprocess, "run",
+                        lambda *a, **k: subprocess.CompletedProcess(a, 1, output, ""))
+    owners = file_owners(["/opt/orphan", "/usr/sbin/httpd", "/usr/bin/python3"])
+    assert owners == {"/usr/sbin/httpd": "httpd", "/usr/bin/python3": "python3"}
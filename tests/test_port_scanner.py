@@ -0,0 +1,55 @@
+import asyncio
+import errno
+import socket
+
+import pytest
+
+pytest.importorskip("psutil")
+
+from utils import port_scanner
+from utils.port_scanner import ScanResult, scan
+
+
+def run_scan(ports, protocols=("tcp",), concurrency=2):
+    async def collect():
+        return [result async for result in scan("127.0.0.1", ports, protocols, concurrency, timeout=0.2)]
+
+    return asyncio.run(asyncio.wait_for(collect(), 5))
+
+
+def test_probe_errors_become_results_instead_of_hanging(monkeypatch):
+    async def probe(host, port, timeout, grab_banner):
+        if port % 2:
+            raise OSError(errno.EMFILE, "Too many open files")
+        return ScanResult(port, "tcp", "closed", None, None)
+
+    monkeypatch.setattr(port_scanner, "probe_tcp", probe)
+    results = run_scan(range(1, 11))
+    assert sorted(r.port for r in results) == list(range(1, 11))
+    assert {r.port for r in results if r.state == "error"} == {1, 3, 5, 7, 9}
+
+
+def test_every_worker_failing_still_ends_the_scan(monkeypatch):
+    async def probe(host, port, timeout, grab_banner):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(port_scanner, "probe_tcp", probe)
+    assert {r.state for r in run_scan(range(1, 5), concurrency=4)} == {"error"}
+
+
+def test_udp_icmp_errors_other_than_refused_are_filtered(monkeypatch):
+    class Unreachable(port_scanner._UdpProbe):
+        def __init__(self):
+            super().__init__()
+            self.error_received(OSError(errno.EHOSTUNREACH, "No route to host"))
+
+    monkeypatch.setattr(port_scanner, "_UdpProbe", Unreachable)
+    assert run_scan([9], protocols=("udp",)) == [ScanResult(9, "udp", "filtered", None, None)]
+
+
+def test_closed_tcp_port_on_loopback():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    assert run_scan([port]) == [ScanResult(port, "tcp", "closed", None, None)]
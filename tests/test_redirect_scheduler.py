@@ -0,0 +1,42 @@
+from redirect_scheduler import RedirectScheduler
+
+
+class FakeEngine:
+    def __init__(self):
+        self.installed = set()
+        self.commits = 0
+
+    def add(self, r):
+        self.installed.add(r)
+
+    def delete(self, r):
+        self.installed.discard(r)
+
+    def commit(self):
+        self.commits += 1
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_drop_then_redirect_after_delay():
+    engine, clock = FakeEngine(), FakeClock()
+    scheduler = RedirectScheduler(engine, clock=clock)
+    assert scheduler.submit("10.0.0.5", ["drop"], ["dnat"], delay=5)
+    assert not scheduler.submit("10.0.0.5", ["drop"], ["dnat"], delay=5)
+    assert scheduler.tick() == []
+    assert engine.installed == {"drop"}
+
+    clock.now += 5
+    [entry] = scheduler.tick()
+    assert entry.ip == "10.0.0.5"
+    assert entry.latency == 5
+    assert engine.installed == {"dnat"}
+    assert scheduler.queue_depth() == 0
+    assert not scheduler.is_pending("10.0.0.5")
+    assert scheduler.next_due() is None
@@ -0,0 +1,43 @@
+import os
+
+from utils import rootfs
+from utils.collectors import run_collectors
+from utils.package_db import Package
+
+TCP = ("  sl  local_address rem_address   st tx_queue rx_queue tr tm->when retrnsmt   uid  timeout inode\n"
+       "   0: 00000000:0016 00000000:0000 0A 00000000:00000000 00:00000000 00000000     0        0 999 1\n")
+
+
+def fake_root(tmp_path):
+    (tmp_path / "proc" / "net").mkdir(parents=True)
+    (tmp_path / "proc" / "net" / "tcp").write_text(TCP)
+    fd = tmp_path / "proc" / "123" / "fd"
+    fd.mkdir(parents=True)
+    os.symlink("socket:[999]", fd / "3")
+    (tmp_path / "proc" / "123" / "comm").write_text("sshd\n")
+    return str(tmp_path)
+
+
+def test_snapshot_is_read_from_the_proc_tree(tmp_path):
+    snapshot = rootfs.RootfsSnapshot(fake_root(tmp_path))
+    assert snapshot.listening_ports() == [22]
+    assert snapshot.process_for_port(22)["name"] == "sshd"
+
+
+def test_services_and_software_share_one_snapshot(tmp_path, monkeypatch):
+    root = fake_root(tmp_path)
+    built = []
+
+    class CountingSnapshot(rootfs.RootfsSnapshot):
+        def __init__(self, root):
+            built.append(root)
+            super().__init__(root)
+
+    monkeypatch.setattr(rootfs, "RootfsSnapshot", CountingSnapshot)
+    packages = [Package("openssh-server", "1:9.2p1-2", "amd64", "dpkg")]
+    monkeypatch.setattr(rootfs, "read_installed_packages", lambda root: packages)
+    collectors = [c for c in rootfs.rootfs_collectors(root) if c.name in ("services", "software")]
+    sections, _ = run_collectors(collectors, max_workers=2)
+    assert set(sections) == {"services", "software"}
+    assert [s["process_name"] for s in sections["services"]] == ["sshd"]
+    assert built == [root]
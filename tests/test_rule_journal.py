@@ -0,0 +1,114 @@
+import json
+
+import rule_journal
+from rule_journal import RuleJournal
+
+DNAT = ("nat", "PREROUTING", ("-s", "10.0.0.5", "-j", "DNAT", "--to-destination", "192.168.56.10"))
+DROP = ("filter", "INPUT", ("-s", "10.0.0.5", "-j", "DROP"))
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def records(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_replay_restores_live_entries(tmp_path):
+    path = str(tmp_path / "journal")
+    clock = FakeClock()
+    journal = RuleJournal(path, clock=clock)
+    journal.record_add("10.0.0.5", [DNAT], ttl=60, target="192.168.56.10")
+    journal.record_add("10.0.0.6", [DNAT], ttl=None)
+    journal.record_remove(["10.0.0.6"])
+
+    replayed = RuleJournal(path, clock=clock).replay()
+    assert replayed == {"10.0.0.5": ((DNAT,), 1060.0, "192.168.56.10")}
+
+
+def test_replay_ignores_a_torn_final_record(tmp_path):
+    path = tmp_path / "journal"
+    journal = RuleJournal(str(path))
+    journal.record_add("10.0.0.5", [DNAT])
+    with open(path, "a") as f:
+        f.write('{"op": "add", "ip": "10.0.0.')
+    assert list(RuleJournal(str(path)).replay()) == ["10.0.0.5"]
+
+
+def test_replay_compacts_to_live_entries(tmp_path):
+    path = str(tmp_path / "journal")
+    journal = RuleJournal(path)
+    for i in range(50):
+        journal.record_add(f"10.0.1.{i}", [DNAT])
+        if i % 2:
+            journal.record_remove([f"10.0.1.{i}"])
+    assert len(records(path)) == 75
+
+    journal = RuleJournal(path)
+    assert len(journal.replay()) == 25
+    assert len(records(path)) == 25
+    assert all(r["op"] == "add" for r in records(path))
+
+
+def test_appends_compact_once_slack_is_exceeded(tmp_path, monkeypatch):
+    monkeypatch.setattr(rule_journal, "COMPACT_SLACK", 10)
+    path = str(tmp_path / "journal")
+    journal = RuleJournal(path)
+    for i in range(30):
+        journal.record_add("10.0.0.5", [DNAT])
+    assert len(records(path)) <= 11
+    assert RuleJournal(path).replay() == {"10.0.0.5": ((DNAT,), None, None)}
+
+
+def test_pending_drop_survives_a_crash_until_redirected(tmp_path):
+    path = str(tmp_path / "journal")
+    journal = RuleJournal(path)
+    journal.record_drop("10.0.0.5", [DROP])
+    journal.record_drop("10.0.0.6", [DROP])
+    journal.record_add("10.0.0.6", [DNAT])
+
+    replayed = RuleJournal(path)
+    assert replayed.replay() == {"10.0.0.6": ((DNAT,), None, None)}
+    assert replayed.drops == {"10.0.0.5": (DROP,)}
+
+    replayed.record_remove(["10.0.0.5"])
+    again = RuleJournal(path)
+    assert list(again.replay()) == ["10.0.0.6"]
+    assert again.drops == {}
+
+
+def test_due_returns_expired_entries_oldest_first(tmp_path):
+    clock = FakeClock()
+    journal = RuleJournal(str(tmp_path / "journal"), clock=clock)
+    journal.record_add("10.0.0.7", [DNAT], ttl=20)
+    journal.record_add("10.0.0.5", [DNAT], ttl=10)
+    journal.record_add("10.0.0.6", [DNAT], ttl=10)
+    journal.record_add("10.0.0.6", [DNAT], ttl=30)
+    assert journal.next_due() == 10
+    clock.now += 25
+    assert journal.due() == ["10.0.0.5", "10.0.0.7"]
+    assert journal.next_due() == 5
+
+
+def test_retry_makes_a_failed_expiry_due_again(tmp_path):
+    clock = FakeClock()
+    journal = RuleJournal(str(tmp_path / "journal"), clock=clock)
+    journal.record_add("10.0.0.5", [DNAT], ttl=60)
+    clock.now += 60
+    assert journal.due() == ["10.0.0.5"]
+    assert journal.due() == []
+
+    # The removal commit failed; the entry comes back after the retry delay
+    journal.retry(["10.0.0.5"], 1)
+    assert journal.next_due() == 1
+    assert journal.due() == []
+    clock.now += 1
+    assert journal.due() == ["10.0.0.5"]
+    journal.record_remove(["10.0.0.5"])
+    assert journal.next_due() is None
@@ -0,0 +1,23 @@
+import pytest
+
+from vagrant_gen import vagrant_parameters
+
+
+@pytest.mark.parametrize("cpu, memory", [
+    ({"cores": None}, {"total": None}),
+    ({"cores": 0}, {"total": "0.00 GB"}),
+    ({}, {}),
+])
+def test_unknown_hardware_falls_back_to_the_defaults(cpu, memory):
+    params = vagrant_parameters({"os": {"detected_distro": "debian"}, "hardware": {"cpu": cpu, "memory": memory}})
+    assert params["spoofed_cpu_cores"] == 4
+    assert params["spoofed_memory_mb"] == 4096
+    assert (params["actual_cpu_cores"], params["actual_memory_mb"]) == (2, 1024)
+
+
+def test_known_hardware_is_spoofed_and_capped():
+    params = vagrant_parameters({"os": {"detected_distro": "fedora"},
+                                 "hardware": {"cpu": {"cores": 16}, "memory": {"total": "31.50 GB"}}})
+    assert params["box_name"] == "fedora/34-cloud-base"
+    assert (params["spoofed_cpu_cores"], params["spoofed_memory_mb"]) == (16, 32256)
+    assert (params["actual_cpu_cores"], params["actual_memory_mb"]) == (2, 1024)
@@ -0,0 +1,95 @@
+import time
+
+import warm_pool
+from warm_pool import StubProvider, WarmPool
+
+
+class FlakyProvider(StubProvider):
+    """Stub whose create fails the first failures times."""
+
+    def __init__(self, failures):
+        super().__init__(boot_seconds=0, restore_seconds=0)
+        self.failures = failures
+
+    def create(self, name):
+        if self.failures > 0:
+            self.failures -= 1
+            self.calls.append(("create", name))
+            raise RuntimeError("vagrant up failed")
+        return super().create(name)
+
+
+def started_pool(provider, size=2):
+    pool = WarmPool(provider, size, retry_delay=0)
+    pool.start()
+    return pool
+
+
+def test_acquire_and_release_recycle_a_decoy():
+    provider = StubProvider(boot_seconds=0, restore_seconds=0)
+    pool = started_pool(provider, size=1)
+    try:
+        assert pool.wait_ready(1, timeout=5)
+        ip = pool.acquire("203.0.113.1")
+        assert ip is not None
+        assert pool.acquire("203.0.113.1") == ip
+        assert pool.acquire("203.0.113.2") is None
+        assert pool.acquire("203.0.113.2") is None
+
+        assert pool.release("203.0.113.1") == ip
+        assert pool.release("203.0.113.1") is None
+        assert pool.wait_ready(1, timeout=5)
+        assert pool.acquire("203.0.113.2") == ip
+        assert ("restore", "decoy0") in provider.calls
+        stats = pool.stats()
+        assert (stats["hits"], stats["misses"], stats["states"]["in_use"]) == (2, 1, 1)
+    finally:
+        pool.stop()
+
+
+def test_failed_decoys_are_booted_again_in_the_background():
+    provider = FlakyProvider(failures=warm_pool.RESTORE_ATTEMPTS + 1)
+    pool = started_pool(provider, size=1)
+    try:
+        assert pool.wait_ready(1, timeout=5)
+        assert pool.slots["decoy0"].failures == 0
+        assert provider.calls.count(("create", "decoy0")) == warm_pool.RESTORE_ATTEMPTS + 2
+    finally:
+        pool.stop()
+
+
+def test_stop_cancels_pending_retries():
+    provider = FlakyProvider(failures=1000)
+    pool = WarmPool(provider, 1, retry_delay=0.01)
+    pool.start()
+    with pool._changed:
+        assert pool._changed.wait_for(lambda: pool.slots["decoy0"].state == "failed", 5)
+    pool.stop()
+    time.sleep(0.3)
+    calls = len(provider.calls)
+    time.sleep(0.3)
+    assert len(provider.calls) == calls
+    assert not pool._retries
+
+
+def test_waiting_attackers_are_forgotten_after_the_ttl(monkeypatch):
+    pool = WarmPool(StubProvider(), 1)
+    for i in range(50):
+        pool.acquire(f"203.0.113.{i}")
+    assert pool.misses == 50
+    monkeypatch.setattr(warm_pool, "WAITING_TTL", 0)
+    pool.acquire("198.51.100.1")
+    assert list(pool._waiting) == ["198.51.100.1"]
+    pool.acquire("203.0.113.1")
+    assert pool.misses == 52
+
+
+def test_last_failed_attempt_does_not_wait(monkeypatch):
+    monkeypatch.setattr(warm_pool, "RESTORE_ATTEMPTS", 1)
+    pool = WarmPool(FlakyProvider(failures=1000), 1, retry_delay=30)
+    pool.start()
+    try:
+        with pool._changed:
+            assert pool._changed.wait_for(lambda: pool.slots["decoy0"].state == "failed", 2)
+    finally:
+        pool.stop()